@@ -0,0 +1,39 @@
+"""per-(variant, location) valuation summary
+
+Revision ID: 20261019_0003
+Revises: 20260216_0002
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+from app.models.inventory import InvValuationSummary
+
+revision = "20261019_0003"
+down_revision = "20260216_0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    InvValuationSummary.__table__.create(bind=bind, checkfirst=True)
+    # Seed from the open layer history so existing stock keeps its value.
+    op.execute(
+        sa.text(
+            """
+            INSERT INTO inv_valuation_summary (variant_id, location_id, qty_on_hand, fifo_value, wac_value, updated_at)
+            SELECT variant_id, location_id, SUM(remaining_qty), SUM(remaining_cost), SUM(remaining_cost), now()
+            FROM inv_valuation_layer
+            GROUP BY variant_id, location_id
+            ON CONFLICT ON CONSTRAINT uq_inv_valuation_summary_scope DO NOTHING
+            """
+        )
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("inv_valuation_summary")
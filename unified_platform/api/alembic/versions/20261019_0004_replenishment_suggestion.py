@@ -0,0 +1,26 @@
+"""replenishment suggestions
+
+Revision ID: 20261019_0004
+Revises: 20261019_0003
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+from app.models.inventory import InvReplenishmentSuggestion
+
+revision = "20261019_0004"
+down_revision = "20261019_0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    InvReplenishmentSuggestion.__table__.create(bind=bind, checkfirst=True)
+
+
+def downgrade() -> None:
+    op.drop_table("inv_replenishment_suggestion")
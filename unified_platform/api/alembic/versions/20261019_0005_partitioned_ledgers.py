@@ -0,0 +1,100 @@
+"""monthly range partitions for stock movements, audit events and the sync queue
+
+Revision ID: 20261019_0005
+Revises: 20261019_0004
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from datetime import UTC, datetime
+
+import sqlalchemy as sa
+from alembic import op
+
+from app.db.base import Base
+from app.db.partitions import (
+    MONTHS_AHEAD,
+    PARTITIONED_TABLES,
+    add_months,
+    ensure_monthly_partitions,
+    is_partitioned,
+    month_start,
+)
+from app.models import core, integration, inventory  # noqa: F401
+
+revision = "20261019_0005"
+down_revision = "20261019_0004"
+branch_labels = None
+depends_on = None
+
+# Partitioned parents cannot be FK targets on id alone; these references become plain indexed columns.
+DROPPED_FKS = (
+    ("inv_valuation_layer", "inv_valuation_layer_movement_id_fkey", "movement_id"),
+    ("int_sync_error", "int_sync_error_queue_id_fkey", "queue_id"),
+)
+
+
+def _partition(table: sa.Table, column: str) -> None:
+    bind = op.get_bind()
+    name = table.name
+    if not sa.inspect(bind).has_table(name):
+        table.create(bind=bind)
+        return
+    if is_partitioned(bind, name):
+        return
+
+    legacy = f"{name}_legacy"
+    # Free every relation name the new parent needs: indexes, the pkey index and the id sequence.
+    for index in table.indexes:
+        op.execute(f"DROP INDEX IF EXISTS {index.name}")
+    op.execute(f"ALTER TABLE {name} RENAME TO {legacy}")
+    op.execute(f"ALTER TABLE {legacy} RENAME CONSTRAINT {name}_pkey TO {legacy}_pkey")
+    op.execute(f"ALTER SEQUENCE IF EXISTS {name}_id_seq RENAME TO {legacy}_id_seq")
+
+    table.create(bind=bind)  # after_create adds the default and current monthly partitions
+    oldest = bind.scalar(sa.text(f"SELECT min({column}) FROM {legacy}"))
+    if oldest is not None:
+        this_month = month_start(datetime.now(UTC))
+        ensure_monthly_partitions(bind, name, start=month_start(oldest), end=add_months(this_month, MONTHS_AHEAD))
+
+    columns = ", ".join(col.name for col in table.columns)
+    op.execute(f"INSERT INTO {name} ({columns}) SELECT {columns} FROM {legacy}")
+    op.execute(f"SELECT setval('{name}_id_seq', COALESCE((SELECT max(id) FROM {name}), 0) + 1, false)")
+    op.execute(f"DROP TABLE {legacy}")
+
+
+def upgrade() -> None:
+    for table_name, fk_name, column in DROPPED_FKS:
+        op.execute(f"ALTER TABLE {table_name} DROP CONSTRAINT IF EXISTS {fk_name}")
+        op.execute(f"CREATE INDEX IF NOT EXISTS ix_{table_name}_{column} ON {table_name} ({column})")
+
+    for table_name, column in PARTITIONED_TABLES.items():
+        _partition(Base.metadata.tables[table_name], column)
+
+
+def downgrade() -> None:
+    # Back to plain heap tables; data in detached/archived partitions is not restored.
+    for table_name in PARTITIONED_TABLES:
+        plain = f"{table_name}_plain"
+        op.execute(f"CREATE TABLE {plain} (LIKE {table_name} INCLUDING DEFAULTS)")
+        op.execute(f"INSERT INTO {plain} SELECT * FROM {table_name}")
+        op.execute(f"ALTER SEQUENCE {table_name}_id_seq OWNED BY NONE")
+        op.execute(f"DROP TABLE {table_name}")
+        op.execute(f"ALTER TABLE {plain} RENAME TO {table_name}")
+        op.execute(f"ALTER TABLE {table_name} ADD PRIMARY KEY (id)")
+        op.execute(f"ALTER SEQUENCE {table_name}_id_seq OWNED BY {table_name}.id")
+        for index in Base.metadata.tables[table_name].indexes:
+            columns = ", ".join(col.name for col in index.columns)
+            op.execute(f"CREATE INDEX {index.name} ON {table_name} ({columns})")
+
+    for table_name, _, column in DROPPED_FKS:
+        op.execute(f"DROP INDEX IF EXISTS ix_{table_name}_{column}")
+    op.execute(
+        "ALTER TABLE inv_valuation_layer ADD CONSTRAINT inv_valuation_layer_movement_id_fkey "
+        "FOREIGN KEY (movement_id) REFERENCES inv_stock_movement (id) NOT VALID"
+    )
+    op.execute(
+        "ALTER TABLE int_sync_error ADD CONSTRAINT int_sync_error_queue_id_fkey "
+        "FOREIGN KEY (queue_id) REFERENCES int_sync_queue (id) NOT VALID"
+    )
@@ -0,0 +1,33 @@
+"""daily stock snapshots for as-of queries
+
+Revision ID: 20261019_0006
+Revises: 20261019_0005
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+from app.models.inventory import InvStockSnapshot, InvStockSnapshotRun
+
+revision = "20261019_0006"
+down_revision = "20261019_0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    InvStockSnapshotRun.__table__.create(bind=bind, checkfirst=True)
+    InvStockSnapshot.__table__.create(bind=bind, checkfirst=True)
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_inv_stock_movement_variant_moved_at "
+        "ON inv_stock_movement (variant_id, moved_at)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_inv_stock_movement_variant_moved_at")
+    op.drop_table("inv_stock_snapshot")
+    op.drop_table("inv_stock_snapshot_run")
@@ -0,0 +1,29 @@
+"""client sequence numbers on receiving scans for idempotent batch uploads
+
+Revision ID: 20261019_0007
+Revises: 20261019_0006
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+revision = "20261019_0007"
+down_revision = "20261019_0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 0001/0002 build the schema from the current models, so fresh installs already have both.
+    op.execute("ALTER TABLE inv_receiving_scan_event ADD COLUMN IF NOT EXISTS client_seq BIGINT")
+    op.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_inv_receiving_scan_event_device_seq "
+        "ON inv_receiving_scan_event (shipment_id, device_id, client_seq)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_inv_receiving_scan_event_device_seq", table_name="inv_receiving_scan_event")
+    op.drop_column("inv_receiving_scan_event", "client_seq")
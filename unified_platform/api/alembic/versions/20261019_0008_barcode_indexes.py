@@ -0,0 +1,30 @@
+"""single-column barcode indexes for EAN/GTIN lookups
+
+Revision ID: 20261019_0008
+Revises: 20261019_0007
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+revision = "20261019_0008"
+down_revision = "20261019_0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 0001's create_all already builds these from models/pim.py on fresh installs.
+    op.create_index("ix_pim_product_variant_ean", "pim_product_variant", ["ean"], if_not_exists=True)
+    op.create_index("ix_pim_product_variant_barcode", "pim_product_variant", ["barcode"], if_not_exists=True)
+    op.create_index("ix_pim_product_ean", "pim_product", ["ean"], if_not_exists=True)
+    op.create_index("ix_pim_product_gtin14", "pim_product", ["gtin14"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_pim_product_gtin14", table_name="pim_product", if_exists=True)
+    op.drop_index("ix_pim_product_ean", table_name="pim_product", if_exists=True)
+    op.drop_index("ix_pim_product_variant_barcode", table_name="pim_product_variant", if_exists=True)
+    op.drop_index("ix_pim_product_variant_ean", table_name="pim_product_variant", if_exists=True)
@@ -0,0 +1,44 @@
+"""daily sales rollup per (date, channel, variant) for velocity queries
+
+Revision ID: 20261019_0009
+Revises: 20261019_0008
+Create Date: 2026-10-19
+
+The rollup starts empty. Fill it once after upgrading with a full rebuild
+(see README: "Sales rollup backfill"); the nightly task only covers recent days.
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+revision = "20261019_0009"
+down_revision = "20261019_0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 0001/0002 build the schema from the current models, so fresh installs already have both.
+    op.execute("ALTER TABLE sales_order ADD COLUMN IF NOT EXISTS in_sales_rollup BOOLEAN NOT NULL DEFAULT false")
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS sales_daily_rollup (
+            sales_date DATE NOT NULL,
+            channel_type VARCHAR(32) NOT NULL,
+            variant_id INTEGER NOT NULL,
+            units NUMERIC(14, 2) NOT NULL DEFAULT 0,
+            revenue NUMERIC(14, 2) NOT NULL DEFAULT 0,
+            order_lines INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (sales_date, channel_type, variant_id)
+        )
+        """
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_sales_daily_rollup_variant_date ON sales_daily_rollup (variant_id, sales_date)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS sales_daily_rollup")
+    op.execute("ALTER TABLE sales_order DROP COLUMN IF EXISTS in_sales_rollup")
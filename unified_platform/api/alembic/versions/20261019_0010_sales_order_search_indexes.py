@@ -0,0 +1,35 @@
+"""indexes for order detail loading and order search
+
+Revision ID: 20261019_0010
+Revises: 20261019_0009
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+revision = "20261019_0010"
+down_revision = "20261019_0009"
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ("ix_sales_order_order_number", "sales_order", "order_number"),
+    ("ix_sales_order_external_order_id", "sales_order", "external_order_id"),
+    ("ix_sales_order_customer_id", "sales_order", "customer_id"),
+    ("ix_sales_order_line_order_id", "sales_order_line", "order_id"),
+    ("ix_sales_order_line_sku_snapshot", "sales_order_line", "sku_snapshot"),
+    ("ix_sales_order_event_order_id", "sales_order_event", "order_id"),
+    ("ix_sales_customer_email_lower", "sales_customer", "lower(email)"),
+)
+
+
+def upgrade() -> None:
+    for name, table, expression in INDEXES:
+        op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({expression})")
+
+
+def downgrade() -> None:
+    for name, _, _ in reversed(INDEXES):
+        op.execute(f"DROP INDEX IF EXISTS {name}")
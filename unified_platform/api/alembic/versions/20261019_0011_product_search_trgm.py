@@ -0,0 +1,36 @@
+"""pg_trgm GIN indexes for product search over SKU, EAN, name and brand
+
+Revision ID: 20261019_0011
+Revises: 20261019_0010
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+revision = "20261019_0011"
+down_revision = "20261019_0010"
+branch_labels = None
+depends_on = None
+
+# Kept out of the models: metadata.create_all in 0001 runs before pg_trgm exists.
+TRGM_INDEXES = (
+    ("ix_pim_product_sku_trgm", "pim_product", "sku"),
+    ("ix_pim_product_ean_trgm", "pim_product", "ean"),
+    ("ix_pim_product_variant_sku_trgm", "pim_product_variant", "sku"),
+    ("ix_pim_product_variant_ean_trgm", "pim_product_variant", "ean"),
+    ("ix_pim_product_i18n_name_trgm", "pim_product_i18n", "name"),
+    ("ix_pim_brand_name_trgm", "pim_brand", "name"),
+)
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, table, column in TRGM_INDEXES:
+        op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({column} gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    for name, _, _ in reversed(TRGM_INDEXES):
+        op.execute(f"DROP INDEX IF EXISTS {name}")
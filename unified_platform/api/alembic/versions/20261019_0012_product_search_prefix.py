@@ -0,0 +1,35 @@
+"""lower(column) text_pattern_ops indexes for short product search terms
+
+Revision ID: 20261019_0012
+Revises: 20261019_0011
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+revision = "20261019_0012"
+down_revision = "20261019_0011"
+branch_labels = None
+depends_on = None
+
+# Terms too short for pg_trgm are matched as lower(column) LIKE 'term%' (app.services.product_search).
+PREFIX_INDEXES = (
+    ("ix_pim_product_sku_prefix", "pim_product", "sku"),
+    ("ix_pim_product_ean_prefix", "pim_product", "ean"),
+    ("ix_pim_product_variant_sku_prefix", "pim_product_variant", "sku"),
+    ("ix_pim_product_variant_ean_prefix", "pim_product_variant", "ean"),
+    ("ix_pim_product_i18n_name_prefix", "pim_product_i18n", "name"),
+    ("ix_pim_brand_name_prefix", "pim_brand", "name"),
+)
+
+
+def upgrade() -> None:
+    for name, table, column in PREFIX_INDEXES:
+        op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} (lower({column}) text_pattern_ops)")
+
+
+def downgrade() -> None:
+    for name, _, _ in reversed(PREFIX_INDEXES):
+        op.execute(f"DROP INDEX IF EXISTS {name}")
@@ -0,0 +1,33 @@
+"""transaction ids on stock movements so snapshots replay in commit order
+
+Revision ID: 20261019_0013
+Revises: 20261019_0012
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "20261019_0013"
+down_revision = "20261019_0012"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("inv_stock_snapshot_run", sa.Column("xact_snapshot", sa.Text(), nullable=True))
+    # Added without a default first: a volatile default would rewrite every partition of the ledger.
+    op.add_column("inv_stock_movement", sa.Column("xact_id", sa.BigInteger(), nullable=True))
+    op.execute("ALTER TABLE inv_stock_movement ALTER COLUMN xact_id SET DEFAULT (pg_current_xact_id()::text)::bigint")
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_inv_stock_movement_variant_xact_id "
+        "ON inv_stock_movement (variant_id, xact_id)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_inv_stock_movement_variant_xact_id")
+    op.drop_column("inv_stock_movement", "xact_id")
+    op.drop_column("inv_stock_snapshot_run", "xact_snapshot")
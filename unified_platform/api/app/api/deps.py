@@ -1,14 +1,17 @@
 from __future__ import annotations
 
-from typing import Generator
+from typing import AsyncGenerator, Generator
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.core.permission_cache import Principal, permission_cache
 from app.core.security import decode_access_token
-from app.db.session import SessionLocal
+from app.db.replica import replica_health
+from app.db.session import AsyncSessionLocal, ReadSessionLocal, SessionLocal
 from app.models.core import CorePermission, CoreRolePermission, CoreUser, CoreUserRole
 
 # Swagger UI "Authorize" button uses /token (OAuth2 form flow)
@@ -23,7 +26,36 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> CoreUser:
+def get_read_db() -> Generator[Session, None, None]:
+    """Session for read-only handlers: the replica when configured and within lag, else the primary."""
+    db = ReadSessionLocal() if replica_health.is_usable() else SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def _load_principal(db: Session, user_id: int) -> Principal | None:
+    user = db.get(CoreUser, user_id)
+    if not user:
+        return None
+    stmt = (
+        select(CorePermission.key)
+        .join(CoreRolePermission, CoreRolePermission.permission_id == CorePermission.id)
+        .join(CoreUserRole, CoreUserRole.role_id == CoreRolePermission.role_id)
+        .where(CoreUserRole.user_id == user.id)
+    )
+    permissions = frozenset(db.scalars(stmt).all())
+    db.expunge(user)
+    return Principal(user=user, permissions=permissions)
+
+
+def get_current_principal(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> Principal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -37,26 +69,26 @@ def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_
     except Exception:
         raise credentials_exception
 
-    user = db.get(CoreUser, user_id)
-    if not user:
-        raise credentials_exception
-    return user
+    # Read the stamp before the DB so a concurrent invalidation can only make the entry stale.
+    version = permission_cache.version()
+    principal = permission_cache.get(user_id, version)
+    if principal is None:
+        principal = _load_principal(db, user_id)
+        if principal is None:
+            raise credentials_exception
+        permission_cache.put(user_id, principal, version)
+    return principal
+
+
+def get_current_user(principal: Principal = Depends(get_current_principal)) -> CoreUser:
+    return principal.user
 
 
 def require_permission(permission_key: str):
-    def checker(
-        current_user: CoreUser = Depends(get_current_user),
-        db: Session = Depends(get_db),
-    ) -> CoreUser:
-        stmt = (
-            select(CorePermission.key)
-            .join(CoreRolePermission, CoreRolePermission.permission_id == CorePermission.id)
-            .join(CoreUserRole, CoreUserRole.role_id == CoreRolePermission.role_id)
-            .where(CoreUserRole.user_id == current_user.id)
-        )
-        permissions = set(db.scalars(stmt).all())
+    def checker(principal: Principal = Depends(get_current_principal)) -> CoreUser:
+        permissions = principal.permissions
         if permission_key not in permissions and "rbac.write" not in permissions:
             raise HTTPException(status_code=403, detail=f"Missing permission: {permission_key}")
-        return current_user
+        return principal.user
 
     return checker
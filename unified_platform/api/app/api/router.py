@@ -10,6 +10,7 @@ from app.api.routes import (
     inbound,
     integration,
     inventory,
+    metrics,
     nshift,
     pim_import,
     products,
@@ -38,3 +39,4 @@ api_router.include_router(wgr.router)
 api_router.include_router(nshift.router)
 api_router.include_router(pim_import.router)
 api_router.include_router(dev.router)
+api_router.include_router(metrics.router)
@@ -4,7 +4,7 @@ from fastapi import APIRouter, Depends
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_db, require_permission
+from app.api.deps import get_read_db, require_permission
 from app.models.core import CoreAuditEvent, CoreUser
 
 router = APIRouter(prefix="/audit", tags=["audit"])
@@ -16,7 +16,7 @@ def list_audit_events(
     entity_id: str | None = None,
     correlation_id: str | None = None,
     limit: int = 200,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _: CoreUser = Depends(require_permission("rbac.read")),
 ) -> list[dict]:
     stmt = select(CoreAuditEvent)
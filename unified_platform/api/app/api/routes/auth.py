@@ -3,19 +3,26 @@ from __future__ import annotations
 from datetime import UTC, datetime
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy import select
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_current_user, get_db
+from app.api.deps import get_async_db, get_current_user, get_db
+from app.core import login_throttle
+from app.core.permission_cache import invalidate_permissions
 from app.core.security import (
+    PasswordHasherBusy,
     create_access_token,
     create_refresh_token,
     decode_refresh_token,
     hash_password,
-    verify_password,
+    hash_password_async,
+    password_needs_rehash,
+    verify_password_async,
 )
+from app.db.session import AsyncSessionLocal
 from app.models.core import (
     CoreCompany,
     CoreLocation,
@@ -44,14 +51,57 @@ _ALL_PERMISSIONS = [
 ]
 
 
-def _authenticate(email: str, password: str, db: Session) -> TokenResponse:
-    user = db.scalar(select(CoreUser).where(CoreUser.email == email))
-    if not user or not verify_password(password, user.password_hash):
+async def _rehash_password(user_id: int, old_hash: str, password: str) -> None:
+    """Upgrade a hash made with outdated cost parameters, unless the password changed meanwhile."""
+    try:
+        new_hash = await hash_password_async(password)
+    except PasswordHasherBusy:
+        return  # next login retries
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(CoreUser)
+            .where(CoreUser.id == user_id, CoreUser.password_hash == old_hash)
+            .values(password_hash=new_hash)
+        )
+        await db.commit()
+
+
+async def _authenticate(
+    email: str,
+    password: str,
+    db: AsyncSession,
+    request: Request,
+    background_tasks: BackgroundTasks,
+) -> TokenResponse:
+    ip = request.client.host if request.client else None
+    wait = await login_throttle.retry_after(email, ip)
+    if wait is not None:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many failed logins, try again later",
+            headers={"Retry-After": str(wait)},
+        )
+
+    user = await db.scalar(select(CoreUser).where(CoreUser.email == email))
+    try:
+        valid = await verify_password_async(password, user.password_hash if user else None)
+    except PasswordHasherBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Login service busy, retry shortly",
+            headers={"Retry-After": "1"},
+        )
+    if not user or not valid:
+        await login_throttle.record_failure(email, ip)
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
     if user.status != "active":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User disabled")
+
+    await login_throttle.reset_account(email)
+    if password_needs_rehash(user.password_hash):
+        background_tasks.add_task(_rehash_password, user.id, user.password_hash, password)
     user.last_login_at = datetime.now(UTC)
-    db.commit()
+    await db.commit()
     return TokenResponse(
         access_token=create_access_token(str(user.id)),
         refresh_token=create_refresh_token(str(user.id)),
@@ -63,8 +113,13 @@ def _authenticate(email: str, password: str, db: Session) -> TokenResponse:
 # ---------------------------------------------------------------------------
 
 @router.post("/login", response_model=TokenResponse)
-def login(payload: LoginRequest, db: Session = Depends(get_db)) -> TokenResponse:
-    return _authenticate(payload.email, payload.password, db)
+async def login(
+    payload: LoginRequest,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+) -> TokenResponse:
+    return await _authenticate(payload.email, payload.password, db, request, background_tasks)
 
 
 # ---------------------------------------------------------------------------
@@ -73,12 +128,14 @@ def login(payload: LoginRequest, db: Session = Depends(get_db)) -> TokenResponse
 # ---------------------------------------------------------------------------
 
 @router.post("/token", response_model=TokenResponse, include_in_schema=False)
-def token(
+async def token(
     form: Annotated[OAuth2PasswordRequestForm, Depends()],
-    db: Session = Depends(get_db),
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
 ) -> TokenResponse:
     """OAuth2 password flow endpoint — Swagger UI Authorize dialog uses this."""
-    return _authenticate(form.username, form.password, db)
+    return await _authenticate(form.username, form.password, db, request, background_tasks)
 
 
 # ---------------------------------------------------------------------------
@@ -158,6 +215,7 @@ def setup(db: Session = Depends(get_db)) -> dict:
     db.flush()
     db.add(CoreUserRole(user_id=user.id, role_id=role.id))
     db.commit()
+    invalidate_permissions()
 
     return {
         "message": "Setup complete. Change the password immediately.",
@@ -237,6 +295,7 @@ def seed_viewer(
         db.add(CoreUserRole(user_id=viewer.id, role_id=role.id))
 
     db.commit()
+    invalidate_permissions()
     return {"message": "Viewer user ready.", "email": "viewer@snushallen.cloud", "password": "viewer123"}
 
 
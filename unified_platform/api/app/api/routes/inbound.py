@@ -1,10 +1,17 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
+import codecs
+from collections import Counter
+from collections.abc import AsyncIterator
+from datetime import UTC, datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_db, require_permission
+from app.api.deps import get_async_db, get_db, require_permission
 from app.models.core import CoreUser
 from app.models.inventory import (
     InvDiscrepancyReport,
@@ -13,13 +20,22 @@ from app.models.inventory import (
     InvReceivingScanEvent,
 )
 from app.schemas.supply import (
+    AsnImportResponse,
     InboundShipmentLineCreate,
     InboundShipmentCreate,
     InboundShipmentResponse,
     ShipmentDiscrepancyCreate,
+    ShipmentScanBatchItem,
+    ShipmentScanBatchRequest,
+    ShipmentScanBatchResponse,
     ShipmentScanRequest,
 )
+from app.services.asn_import import ASN_BATCH_SIZE, AsnImporter, AsnImportResult, AsnParser, AsnRow, AsnRowError
 from app.services.audit import enqueue_outbox_event, log_audit_event
+from app.services.barcode import barcode_index
+from app.services.receipt import classify_scan, post_receipt
+from app.services.reservation import enqueue_stock_pushes
+from app.ws.inventory_feed import publish_stock_levels
 from app.ws.manager import ws_manager
 
 router = APIRouter(prefix="/inbound-shipments", tags=["inbound-shipments"])
@@ -59,56 +75,146 @@ def create_shipment(
 @router.post("/{shipment_id}/start-receiving")
 async def start_receiving(
     shipment_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: CoreUser = Depends(require_permission("purchase.write")),
 ) -> dict:
-    shipment = db.get(InvInboundShipment, shipment_id)
+    shipment = await db.get(InvInboundShipment, shipment_id)
     if not shipment:
         raise HTTPException(status_code=404, detail="Shipment not found")
     shipment.status = "in_progress"
     shipment.receiver_user_id = user.id
-    db.commit()
+    await db.commit()
     await ws_manager.broadcast(f"receiving:{shipment_id}", {"event": "receiving_started", "shipment_id": shipment_id})
     return {"status": shipment.status}
 
 
+async def _line_ids_by_variant(db: AsyncSession, shipment_id: int) -> dict[int, int]:
+    rows = await db.execute(
+        select(InvInboundShipmentLine.variant_id, InvInboundShipmentLine.id)
+        .where(InvInboundShipmentLine.shipment_id == shipment_id)
+        .order_by(InvInboundShipmentLine.id.desc())
+    )
+    return dict(rows.all())  # first line per variant wins
+
+
 @router.post("/{shipment_id}/scan")
 async def scan_receiving(
     shipment_id: int,
     payload: ShipmentScanRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: CoreUser = Depends(require_permission("purchase.write")),
 ) -> dict:
-    shipment = db.get(InvInboundShipment, shipment_id)
+    shipment = await db.get(InvInboundShipment, shipment_id)
     if not shipment:
         raise HTTPException(status_code=404, detail="Shipment not found")
     event = InvReceivingScanEvent(shipment_id=shipment_id, user_id=user.id, **payload.model_dump())
+    match = await db.run_sync(barcode_index.lookup, payload.scanned_code)
+    line_ids = await _line_ids_by_variant(db, shipment_id) if match is not None and event.shipment_line_id is None else {}
+    event.shipment_line_id, event.scan_result = classify_scan(match, event.shipment_line_id, event.scan_result, line_ids)
     db.add(event)
-    db.commit()
+    await db.commit()
     await ws_manager.broadcast(
         f"receiving:{shipment_id}",
         {
             "event": "scan",
             "shipment_id": shipment_id,
             "scanned_code": payload.scanned_code,
-            "result": payload.scan_result,
+            "result": event.scan_result,
             "device_id": payload.device_id,
         },
     )
     return {"scan_event_id": event.id}
 
 
+@router.post("/{shipment_id}/scan-batch", response_model=ShipmentScanBatchResponse)
+async def scan_receiving_batch(
+    shipment_id: int,
+    payload: ShipmentScanBatchRequest,
+    db: AsyncSession = Depends(get_async_db),
+    user: CoreUser = Depends(require_permission("purchase.write")),
+) -> ShipmentScanBatchResponse:
+    """
+    Idempotent bulk upload of scans buffered on a device. (device_id, client_seq) identifies
+    a scan, so a device can resend its whole buffer after a dropped connection.
+    """
+    shipment = await db.get(InvInboundShipment, shipment_id)
+    if not shipment:
+        raise HTTPException(status_code=404, detail="Shipment not found")
+
+    scans = {scan.client_seq: scan for scan in payload.scans}  # last copy wins within one upload
+    line_ids = await _line_ids_by_variant(db, shipment_id)
+    # Codes the index has not seen yet are looked up together, in one query.
+    matches = await db.run_sync(barcode_index.lookup_many, [scan.scanned_code for scan in scans.values()])
+
+    def classify(scan: ShipmentScanBatchItem) -> tuple[int | None, str]:
+        return classify_scan(matches.get(scan.scanned_code), scan.shipment_line_id, scan.scan_result, line_ids)
+
+    now = datetime.now(UTC)
+    classified = {client_seq: classify(scan) for client_seq, scan in scans.items()}
+    stmt = (
+        pg_insert(InvReceivingScanEvent)
+        .values(
+            [
+                {
+                    "shipment_id": shipment_id,
+                    "shipment_line_id": classified[client_seq][0],
+                    "scanned_code": scan.scanned_code,
+                    "code_type": scan.code_type,
+                    "scan_result": classified[client_seq][1],
+                    "user_id": user.id,
+                    "device_id": payload.device_id,
+                    "client_seq": client_seq,
+                    "scanned_at": scan.scanned_at or now,
+                }
+                for client_seq, scan in scans.items()
+            ]
+        )
+        .on_conflict_do_nothing(index_elements=["shipment_id", "device_id", "client_seq"])
+        .returning(InvReceivingScanEvent.client_seq)
+    )
+    accepted = (await db.scalars(stmt)).all()
+    total = await db.scalar(
+        select(func.count()).select_from(InvReceivingScanEvent).where(InvReceivingScanEvent.shipment_id == shipment_id)
+    )
+    await db.commit()
+
+    results = Counter(classified[client_seq][1] for client_seq in accepted)
+    await ws_manager.broadcast(
+        f"receiving:{shipment_id}",
+        {
+            "event": "scan_batch",
+            "shipment_id": shipment_id,
+            "device_id": payload.device_id,
+            "accepted": len(accepted),
+            "duplicates": len(payload.scans) - len(accepted),
+            "results": dict(results),
+            "total_scans": total,
+        },
+    )
+    return ShipmentScanBatchResponse(
+        accepted=len(accepted),
+        duplicates=len(payload.scans) - len(accepted),
+        acked_through=max(scans),
+    )
+
+
 @router.post("/{shipment_id}/confirm-receipt")
 async def confirm_receipt(
     shipment_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: CoreUser = Depends(require_permission("purchase.write")),
 ) -> dict:
-    shipment = db.get(InvInboundShipment, shipment_id)
+    """Post the shipment's received quantities to stock, valuation and its purchase order."""
+    shipment = await db.get(InvInboundShipment, shipment_id, with_for_update=True)
     if not shipment:
         raise HTTPException(status_code=404, detail="Shipment not found")
+    if shipment.status == "received":
+        raise HTTPException(status_code=409, detail="Shipment already received")
     old_status = shipment.status
+    result = await db.run_sync(post_receipt, shipment, user_id=user.id)
+    await db.run_sync(enqueue_stock_pushes, result.variant_ids)
     shipment.status = "received"
+    shipment.arrived_at = shipment.arrived_at or datetime.now(UTC)
     log_audit_event(
         db,
         actor_user_id=user.id,
@@ -116,18 +222,28 @@ async def confirm_receipt(
         entity_id=str(shipment.id),
         action="confirm_receipt",
         before={"status": old_status},
-        after={"status": shipment.status},
+        after={"status": shipment.status, "received_qty": str(result.received_qty), "discrepancies": result.discrepancies},
     )
     enqueue_outbox_event(
         db,
         event_name="inbound.received",
         aggregate_type="shipment",
         aggregate_id=str(shipment.id),
-        payload={"shipment_id": shipment.id, "status": shipment.status},
+        payload={"shipment_id": shipment.id, "status": shipment.status, "movement_count": len(result.movement_ids)},
     )
-    db.commit()
-    await ws_manager.broadcast(f"receiving:{shipment_id}", {"event": "receipt_confirmed", "shipment_id": shipment_id})
-    return {"status": shipment.status}
+    await db.commit()
+    await publish_stock_levels(db, result.touched)
+    await ws_manager.broadcast(
+        f"receiving:{shipment_id}",
+        {"event": "receipt_confirmed", "shipment_id": shipment_id, "discrepancies": result.discrepancies},
+    )
+    return {
+        "status": shipment.status,
+        "lines": result.lines,
+        "received_qty": float(result.received_qty),
+        "movements": len(result.movement_ids),
+        "discrepancies": result.discrepancies,
+    }
 
 
 @router.post("/{shipment_id}/discrepancies")
@@ -171,3 +287,66 @@ def create_shipment_line(
     db.add(record)
     db.commit()
     return {"id": record.id}
+
+
+async def _stream_lines(request: Request) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    async for chunk in request.stream():
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+@router.post("/{shipment_id}/asn-import", response_model=AsnImportResponse)
+async def import_asn(
+    shipment_id: int,
+    request: Request,
+    fmt: str | None = Query(default=None, alias="format", pattern="^(csv|jsonl)$"),
+    db: AsyncSession = Depends(get_async_db),
+    user: CoreUser = Depends(require_permission("purchase.write")),
+) -> dict:
+    """
+    Stream a supplier ASN / packing list (CSV with header, or JSON lines) into shipment lines.
+    Valid rows are imported in one transaction; every rejected row is reported with its line number.
+    The format defaults from the Content-Type.
+    """
+    shipment = await db.get(InvInboundShipment, shipment_id)
+    if not shipment:
+        raise HTTPException(status_code=404, detail="Shipment not found")
+    if shipment.status == "received":
+        raise HTTPException(status_code=409, detail="Shipment already received")
+
+    parser = AsnParser(fmt or ("jsonl" if "json" in request.headers.get("content-type", "") else "csv"))
+    importer = await db.run_sync(AsnImporter, shipment)
+    result = AsnImportResult()
+    batch: list[AsnRow] = []
+    async for line in _stream_lines(request):
+        try:
+            row = parser.parse(line)
+        except AsnRowError as exc:
+            result.add_error(exc.row, str(exc))
+            continue
+        if row is None:
+            continue
+        batch.append(row)
+        if len(batch) >= ASN_BATCH_SIZE:
+            await db.run_sync(importer.write_batch, batch, result)
+            batch = []
+    await db.run_sync(importer.write_batch, batch, result)
+
+    log_audit_event(
+        db,
+        actor_user_id=user.id,
+        entity_type="inv_inbound_shipment",
+        entity_id=str(shipment.id),
+        action="asn_import",
+        before=None,
+        after={"imported": result.imported, "errors": result.error_count},
+    )
+    await db.commit()
+    return {"imported": result.imported, "error_count": result.error_count, "errors": result.errors}
@@ -4,19 +4,20 @@ from datetime import UTC, datetime
 from decimal import Decimal
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import delete, func, select
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_db, require_permission
+from app.api.deps import get_async_db, get_db, get_read_db, require_permission
 from app.models.core import CoreUser
 from app.models.inventory import (
     InvCountLine,
     InvCountSession,
     InvReplenishmentRule,
+    InvReplenishmentSuggestion,
     InvStockAlert,
     InvStockBalance,
     InvStockMovement,
-    InvValuationLayer,
 )
 from app.models.pim import PimBrand, PimPriceListItem, PimProduct, PimProductI18n, PimProductVariant
 from app.schemas.inventory import (
@@ -28,10 +29,19 @@ from app.schemas.inventory import (
     StockMovementResponse,
 )
 from app.services.audit import enqueue_outbox_event, log_audit_event
-from app.ws.manager import ws_manager
+from app.services.stock_alerts import evaluate_touched
+from app.services.stock_count import close_count_session as apply_count_session
+from app.services.stock_count import upsert_count_lines
+from app.services.stock_snapshot import stock_as_of
+from app.services.valuation import ValuationMove, apply_valuation, stock_value
+from app.worker import celery_app
+from app.ws.inventory_feed import publish_stock_levels
 
 router = APIRouter(prefix="/inventory", tags=["inventory"])
 
+# Count sessions above this many lines are closed by a Celery task with progress reporting.
+BACKGROUND_CLOSE_THRESHOLD = 5000
+
 
 def _upsert_stock_balance(
     db: Session,
@@ -75,7 +85,7 @@ def _upsert_stock_balance(
 def stock(
     location_id: int | None = None,
     variant_id: int | None = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _: CoreUser = Depends(require_permission("inventory.read")),
 ) -> list[InvStockBalance]:
     stmt = select(InvStockBalance)
@@ -124,10 +134,25 @@ def stock(
     return result
 
 
+@router.get("/stock/as-of")
+def stock_at(
+    variant_id: int,
+    at: datetime,
+    location_id: int | None = None,
+    db: Session = Depends(get_read_db),
+    _: CoreUser = Depends(require_permission("inventory.read")),
+) -> dict:
+    if at.tzinfo is None:
+        at = at.replace(tzinfo=UTC)
+    if at > datetime.now(UTC):
+        raise HTTPException(status_code=400, detail="at must not be in the future")
+    return stock_as_of(db, variant_id=variant_id, at=at, location_id=location_id)
+
+
 @router.get("/movements", response_model=list[StockMovementResponse])
 def movements(
     location_id: int | None = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _: CoreUser = Depends(require_permission("inventory.read")),
 ) -> list[InvStockMovement]:
     stmt = select(InvStockMovement)
@@ -139,19 +164,11 @@ def movements(
     return db.scalars(stmt.order_by(InvStockMovement.id.desc()).limit(1000)).all()
 
 
-@router.post("/transfers", response_model=StockMovementResponse)
-async def transfer(
-    payload: StockMovementCreate,
-    db: Session = Depends(get_db),
-    user: CoreUser = Depends(require_permission("inventory.write")),
-) -> InvStockMovement:
-    if payload.source_location_id is None or payload.dest_location_id is None:
-        raise HTTPException(status_code=400, detail="source_location_id and dest_location_id required")
-
+def _post_transfer(db: Session, payload: StockMovementCreate, user_id: int) -> InvStockMovement:
     movement = InvStockMovement(
-        **payload.model_dump(),
+        **payload.model_dump(exclude={"movement_type", "unit_cost"}),
         movement_type="transfer",
-        moved_by=user.id,
+        moved_by=user_id,
         moved_at=datetime.now(UTC),
     )
     db.add(movement)
@@ -174,6 +191,18 @@ async def transfer(
         container_id=payload.container_id,
         qty_delta=payload.qty,
     )
+    (unit_cost,) = apply_valuation(
+        db,
+        [ValuationMove(movement.id, payload.variant_id, payload.source_location_id, -payload.qty)],
+    )
+    apply_valuation(
+        db,
+        [ValuationMove(movement.id, payload.variant_id, payload.dest_location_id, payload.qty, unit_cost)],
+    )
+    evaluate_touched(
+        db,
+        [(payload.source_location_id, payload.variant_id), (payload.dest_location_id, payload.variant_id)],
+    )
     enqueue_outbox_event(
         db,
         event_name="stock.changed",
@@ -181,27 +210,37 @@ async def transfer(
         aggregate_id=str(movement.id),
         payload={"movement_id": movement.id, "type": movement.movement_type},
     )
-    db.commit()
-    db.refresh(movement)
-    await ws_manager.broadcast(f"inventory:{payload.source_location_id}", {"event": "stock_changed", "movement_id": movement.id})
-    await ws_manager.broadcast(f"inventory:{payload.dest_location_id}", {"event": "stock_changed", "movement_id": movement.id})
     return movement
 
 
-@router.post("/adjustments", response_model=StockMovementResponse)
-async def adjustment(
+@router.post("/transfers", response_model=StockMovementResponse)
+async def transfer(
     payload: StockMovementCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user: CoreUser = Depends(require_permission("inventory.write")),
 ) -> InvStockMovement:
-    target_location = payload.dest_location_id or payload.source_location_id
-    if target_location is None:
-        raise HTTPException(status_code=400, detail="source_location_id or dest_location_id required")
+    if payload.source_location_id is None or payload.dest_location_id is None:
+        raise HTTPException(status_code=400, detail="source_location_id and dest_location_id required")
 
+    movement = await db.run_sync(_post_transfer, payload, user.id)
+    await db.commit()
+    await db.refresh(movement)
+    await publish_stock_levels(
+        db,
+        [(payload.source_location_id, payload.variant_id), (payload.dest_location_id, payload.variant_id)],
+        movement_id=movement.id,
+    )
+    return movement
+
+
+def _post_adjustment(db: Session, payload: StockMovementCreate, target_location: int, user_id: int) -> InvStockMovement:
+    # Stored as a signed delta on dest_location_id only, so ledger replay (dest +qty,
+    # source -qty) reproduces the balance change.
     movement = InvStockMovement(
-        **payload.model_dump(),
+        **payload.model_dump(exclude={"movement_type", "unit_cost", "source_location_id", "dest_location_id"}),
+        dest_location_id=target_location,
         movement_type="adjustment",
-        moved_by=user.id,
+        moved_by=user_id,
         moved_at=datetime.now(UTC),
     )
     db.add(movement)
@@ -215,49 +254,53 @@ async def adjustment(
         container_id=payload.container_id,
         qty_delta=payload.qty,
     )
-    db.add(
-        InvValuationLayer(
-            movement_id=movement.id,
-            variant_id=payload.variant_id,
-            location_id=target_location,
-            method="wac",
-            qty_in=payload.qty if payload.qty > 0 else 0,
-            qty_out=abs(payload.qty) if payload.qty < 0 else 0,
-            unit_cost=0,
-            total_cost=0,
-            remaining_qty=payload.qty if payload.qty > 0 else 0,
-            remaining_cost=0,
-        )
+    apply_valuation(
+        db,
+        [ValuationMove(movement.id, payload.variant_id, target_location, payload.qty, payload.unit_cost)],
     )
+    evaluate_touched(db, [(target_location, payload.variant_id)])
     log_audit_event(
         db,
-        actor_user_id=user.id,
+        actor_user_id=user_id,
         entity_type="inv_stock_movement",
         entity_id=str(movement.id),
         action="adjustment",
         before=None,
         after=payload.model_dump(mode="json"),
     )
-    db.commit()
-    db.refresh(movement)
-    await ws_manager.broadcast(f"inventory:{target_location}", {"event": "stock_changed", "movement_id": movement.id})
+    return movement
+
+
+@router.post("/adjustments", response_model=StockMovementResponse)
+async def adjustment(
+    payload: StockMovementCreate,
+    db: AsyncSession = Depends(get_async_db),
+    user: CoreUser = Depends(require_permission("inventory.write")),
+) -> InvStockMovement:
+    target_location = payload.dest_location_id or payload.source_location_id
+    if target_location is None:
+        raise HTTPException(status_code=400, detail="source_location_id or dest_location_id required")
+
+    movement = await db.run_sync(_post_adjustment, payload, target_location, user.id)
+    await db.commit()
+    await db.refresh(movement)
+    await publish_stock_levels(db, [(target_location, payload.variant_id)], movement_id=movement.id)
     return movement
 
 
 @router.get("/valuation")
 def valuation(
     method: str = Query(default="fifo", pattern="^(fifo|wac)$"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _: CoreUser = Depends(require_permission("inventory.read")),
 ) -> dict:
-    total = db.scalar(select(func.coalesce(func.sum(InvValuationLayer.remaining_cost), 0)).where(InvValuationLayer.method == method))
-    return {"method": method, "stock_value": float(total or 0)}
+    return {"method": method, "stock_value": stock_value(db, method=method)}
 
 
 @router.get("/alerts")
 def alerts(
     status: str = "open",
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _: CoreUser = Depends(require_permission("inventory.read")),
 ) -> list[dict]:
     rows = db.scalars(select(InvStockAlert).where(InvStockAlert.status == status).order_by(InvStockAlert.id.desc())).all()
@@ -303,6 +346,45 @@ def create_replenishment_rule(
     return {"id": rule.id, "updated": False}
 
 
+@router.get("/replenishment/suggestions")
+def replenishment_suggestions(
+    location_id: int | None = None,
+    supplier_id: int | None = None,
+    limit: int = Query(default=500, ge=1, le=5000),
+    db: Session = Depends(get_read_db),
+    _: CoreUser = Depends(require_permission("inventory.read")),
+) -> list[dict]:
+    stmt = select(InvReplenishmentSuggestion).order_by(InvReplenishmentSuggestion.suggested_qty.desc()).limit(limit)
+    if location_id:
+        stmt = stmt.where(InvReplenishmentSuggestion.location_id == location_id)
+    if supplier_id:
+        stmt = stmt.where(InvReplenishmentSuggestion.supplier_id == supplier_id)
+    return [
+        {
+            "rule_id": row.rule_id,
+            "location_id": row.location_id,
+            "variant_id": row.variant_id,
+            "supplier_id": row.supplier_id,
+            "on_hand_qty": float(row.on_hand_qty),
+            "incoming_qty": float(row.incoming_qty),
+            "lead_time_demand": float(row.lead_time_demand),
+            "suggested_qty": float(row.suggested_qty),
+            "computed_at": row.computed_at.isoformat(),
+        }
+        for row in db.scalars(stmt).all()
+    ]
+
+
+@router.post("/replenishment/run")
+def run_replenishment(
+    _: CoreUser = Depends(require_permission("inventory.write")),
+) -> dict:
+    from app.tasks.inventory import run_replenishment as replenishment_task  # avoid circular at module load
+
+    task = replenishment_task.apply_async()
+    return {"status": "queued", "task_id": task.id}
+
+
 @router.post("/count-sessions")
 def create_count_session(
     payload: CountSessionCreate,
@@ -331,22 +413,11 @@ def add_count_lines(
     session = db.get(InvCountSession, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Count session not found")
-    db.execute(delete(InvCountLine).where(InvCountLine.session_id == session_id))
-    for line in payload:
-        diff = line.counted_qty - line.expected_qty
-        db.add(
-            InvCountLine(
-                session_id=session_id,
-                variant_id=line.variant_id,
-                lot_id=line.lot_id,
-                expected_qty=line.expected_qty,
-                counted_qty=line.counted_qty,
-                diff_qty=diff,
-                reason_code=line.reason_code,
-            )
-        )
+    if session.status != "in_progress":
+        raise HTTPException(status_code=409, detail=f"Count session is {session.status}")
+    result = upsert_count_lines(db, session_id=session_id, lines=payload)
     db.commit()
-    return {"session_id": session_id, "lines_saved": len(payload)}
+    return {"session_id": session_id, "lines_saved": len(payload), **result}
 
 
 @router.post("/count-sessions/{session_id}/close")
@@ -358,23 +429,48 @@ def close_count_session(
     session = db.get(InvCountSession, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Count session not found")
+    if session.status != "in_progress":
+        raise HTTPException(status_code=409, detail=f"Count session is {session.status}")
 
-    lines = db.scalars(select(InvCountLine).where(InvCountLine.session_id == session_id)).all()
-    for line in lines:
-        balance = db.scalar(
-            select(InvStockBalance).where(
-                InvStockBalance.company_id == session.company_id,
-                InvStockBalance.location_id == session.location_id,
-                InvStockBalance.variant_id == line.variant_id,
-                InvStockBalance.lot_id == line.lot_id,
-            )
-        )
-        if balance:
-            balance.on_hand_qty = line.counted_qty
-            balance.available_qty = Decimal(balance.on_hand_qty) - Decimal(balance.reserved_qty)
+    line_count = db.scalar(select(func.count(InvCountLine.id)).where(InvCountLine.session_id == session_id)) or 0
+    if line_count > BACKGROUND_CLOSE_THRESHOLD:
+        from app.tasks.inventory import close_count_session as close_task  # avoid circular at module load
+
+        session.status = "closing"
+        db.commit()
+        task = close_task.apply_async(args=[session_id, user.id])
+        return {"status": session.status, "lines": int(line_count), "task_id": task.id}
 
-    session.status = "closed"
-    session.closed_by = user.id
-    session.closed_at = datetime.now(UTC)
+    result = apply_count_session(db, session=session, user_id=user.id)
+    log_audit_event(
+        db,
+        actor_user_id=user.id,
+        entity_type="inv_count_session",
+        entity_id=str(session.id),
+        action="close",
+        before={"status": "in_progress"},
+        after={"status": session.status, **result},
+    )
     db.commit()
-    return {"status": session.status}
+    return {"status": session.status, **result}
+
+
+@router.get("/count-sessions/{session_id}/close-progress/{task_id}")
+def close_count_session_progress(
+    session_id: int,
+    task_id: str,
+    db: Session = Depends(get_db),
+    _: CoreUser = Depends(require_permission("inventory.read")),
+) -> dict:
+    session = db.get(InvCountSession, session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Count session not found")
+    result = celery_app.AsyncResult(task_id)
+    info = result.info if isinstance(result.info, dict) else {}
+    return {
+        "session_id": session_id,
+        "session_status": session.status,
+        "task_state": result.state,
+        "processed": info.get("processed"),
+        "total": info.get("total"),
+    }
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends
+
+from app.api.deps import require_permission
+from app.db.pool import pool_metrics
+from app.models.core import CoreUser
+from app.services.product_cache import product_cache
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("/db-pool")
+def db_pool(_: CoreUser = Depends(require_permission("metrics.read"))) -> dict[str, dict]:
+    """
+    Connection pool usage for this process. DB-free itself, and the caller's permissions
+    come from the permission cache once seen, so it still answers when the pool is exhausted.
+    """
+    return pool_metrics()
+
+
+@router.get("/product-cache")
+def product_cache_metrics(_: CoreUser = Depends(require_permission("metrics.read"))) -> dict:
+    """Hit rate, size and invalidations of this process's product read cache."""
+    return product_cache.stats()
@@ -14,6 +14,7 @@ from app.api.deps import get_db, require_permission
 from app.models.core import CoreUser
 from app.models.sales import SalesOrder, SalesOrderLine
 from app.services.nshift import NShiftClient
+from app.services.reservation import consume_orders, enqueue_stock_pushes
 
 logger = logging.getLogger(__name__)
 
@@ -53,7 +54,7 @@ def ship_order(
     order_id: int,
     body: ShipRequest,
     db: Session = Depends(get_db),
-    _: CoreUser = Depends(require_permission("sync.write")),
+    user: CoreUser = Depends(require_permission("sync.write")),
 ) -> dict[str, Any]:
     """
     Immediately create a nShift shipment and print a label for the given order.
@@ -79,6 +80,7 @@ def ship_order(
     # Update order status
     order.status = "shipped"
     order.shipped_at = datetime.now(tz=UTC)
+    enqueue_stock_pushes(db, consume_orders(db, [order.id], user_id=user.id))
     db.commit()
 
     return result
@@ -1,16 +1,14 @@
 from __future__ import annotations
 
-from collections import defaultdict
 from datetime import UTC, datetime
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import func, or_, select
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_db, require_permission
+from app.api.deps import get_db, get_read_db, require_permission
 from app.models.core import CoreUser
 from app.models.pim import (
-    PimBrand,
     PimMediaAsset,
     PimPriceListItem,
     PimProduct,
@@ -19,10 +17,12 @@ from app.models.pim import (
     PimRevision,
 )
 from app.schemas.pim import (
+    BarcodeLookupResponse,
     PriceBulkUpsertRequest,
     ProductCreate,
     ProductMediaCreate,
     ProductResponse,
+    ProductSearchHit,
     ProductUpdate,
     ProductVariantCreate,
     ProductVariantResponse,
@@ -30,105 +30,30 @@ from app.schemas.pim import (
     RevisionResponse,
 )
 from app.services.audit import enqueue_outbox_event, log_audit_event
+from app.services.barcode import barcode_index
+from app.services.product_cache import product_cache, serialize_products
+from app.services.product_search import search_products
 
 router = APIRouter(tags=["pim"])
 
 
-def _serialize_products(db: Session, products: list[PimProduct]) -> list[dict]:
-    if not products:
-        return []
-
-    product_ids = [product.id for product in products]
-    product_id_set = set(product_ids)
-
-    names: dict[int, str] = {}
-    for translation in db.scalars(
-        select(PimProductI18n)
-        .where(PimProductI18n.product_id.in_(product_ids))
-        .order_by(PimProductI18n.id.asc())
-    ):
-        if translation.product_id in product_id_set and translation.name and translation.product_id not in names:
-            names[translation.product_id] = translation.name
-
-    for translation in db.scalars(
-        select(PimProductI18n).where(
-            PimProductI18n.product_id.in_(product_ids),
-            PimProductI18n.language_code == "sv-SE",
-        )
-    ):
-        if translation.product_id in product_id_set and translation.name:
-            names[translation.product_id] = translation.name
-
-    brand_names: dict[int, str] = {}
-    brand_ids = [product.brand_id for product in products if product.brand_id]
-    if brand_ids:
-        for brand in db.scalars(select(PimBrand).where(PimBrand.id.in_(brand_ids))):
-            brand_names[brand.id] = brand.name
-
-    variant_counts: dict[int, int] = defaultdict(int)
-    variant_to_product: dict[int, int] = {}
-    variant_ids: list[int] = []
-    for variant_id, product_id in db.execute(
-        select(PimProductVariant.id, PimProductVariant.product_id).where(
-            PimProductVariant.product_id.in_(product_ids)
-        )
-    ):
-        variant_to_product[variant_id] = product_id
-        variant_counts[product_id] += 1
-        variant_ids.append(variant_id)
-
-    default_prices: dict[int, object] = {}
-    if variant_ids:
-        for variant_id, unit_price in db.execute(
-            select(PimPriceListItem.variant_id, PimPriceListItem.unit_price)
-            .where(
-                PimPriceListItem.variant_id.in_(variant_ids),
-                PimPriceListItem.min_qty == 1,
-            )
-            .order_by(PimPriceListItem.id.desc())
-        ):
-            product_id = variant_to_product.get(variant_id)
-            if product_id and product_id not in default_prices:
-                default_prices[product_id] = unit_price
-
-    payloads: list[dict] = []
-    for product in products:
-        payloads.append(
-            {
-                "id": product.id,
-                "company_id": product.company_id,
-                "sku": product.sku,
-                "ean": product.ean,
-                "brand_id": product.brand_id,
-                "status": product.status,
-                "product_type": product.product_type,
-                "is_tobacco": product.is_tobacco,
-                "name": names.get(product.id),
-                "brand": brand_names.get(product.brand_id) if product.brand_id else None,
-                "default_price": default_prices.get(product.id),
-                "variant_count": variant_counts.get(product.id, 0),
-            }
-        )
-    return payloads
-
-
 @router.get("/products", response_model=list[ProductResponse])
 def list_products(
     sku: str | None = None,
     ean: str | None = None,
     status: str | None = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _: CoreUser = Depends(require_permission("pim.read")),
 ) -> list[dict]:
-    stmt = select(PimProduct)
+    stmt = select(PimProduct.id)
     if sku:
         stmt = stmt.where(PimProduct.sku.ilike(f"%{sku}%"))
     if ean:
         stmt = stmt.where(PimProduct.ean == ean)
     if status:
         stmt = stmt.where(PimProduct.status == status)
-    products = db.scalars(stmt.order_by(PimProduct.id.desc()).limit(500)).all()
-    return _serialize_products(db, products)
+    product_ids = db.scalars(stmt.order_by(PimProduct.id.desc()).limit(500)).all()
+    return product_cache.get_many(db, product_ids)
 
 
 @router.post("/products", response_model=ProductResponse)
@@ -175,8 +100,45 @@ def create_product(
         payload={"product_id": product.id, "sku": product.sku, "action": "create"},
     )
     db.commit()
+    product_cache.invalidate([product.id])
     db.refresh(product)
-    return _serialize_products(db, [product])[0]
+    return serialize_products(db, [product])[0]
+
+
+@router.get("/products/barcode/{code}", response_model=BarcodeLookupResponse)
+def lookup_barcode(
+    code: str,
+    db: Session = Depends(get_db),
+    _: CoreUser = Depends(require_permission("pim.read")),
+) -> BarcodeLookupResponse:
+    """Resolve an EAN-8/13, UPC-A, GTIN-14 (including case GTINs) or SKU to its variant."""
+    match = barcode_index.lookup(db, code)
+    if match is None:
+        raise HTTPException(status_code=404, detail="Unknown barcode")
+    return BarcodeLookupResponse(
+        code=code,
+        variant_id=match.variant_id,
+        product_id=match.product_id,
+        sku=match.sku,
+        source=match.source,
+        pack_indicator=match.pack_indicator,
+    )
+
+
+@router.get("/products/search", response_model=list[ProductSearchHit])
+def search_product_catalog(
+    q: str = Query(..., min_length=2),
+    limit: int = Query(default=25, ge=1, le=100),
+    db: Session = Depends(get_read_db),
+    _: CoreUser = Depends(require_permission("pim.read")),
+) -> list[dict]:
+    """Ranked search-as-you-type over SKU, EAN, variant SKU/EAN, product name and brand.
+
+    Exact matches rank first, then prefix matches, then by trigram similarity.
+    """
+    ranked = search_products(db, q, limit=limit)
+    payloads = {payload["id"]: payload for payload in product_cache.get_many(db, [product_id for product_id, _ in ranked])}
+    return [{**payloads[product_id], "score": score} for product_id, score in ranked if product_id in payloads]
 
 
 @router.get("/products/{product_id}", response_model=ProductResponse)
@@ -185,10 +147,10 @@ def get_product(
     db: Session = Depends(get_db),
     _: CoreUser = Depends(require_permission("pim.read")),
 ) -> dict:
-    product = db.get(PimProduct, product_id)
-    if not product:
+    payloads = product_cache.get_many(db, [product_id])
+    if not payloads:
         raise HTTPException(status_code=404, detail="Product not found")
-    return _serialize_products(db, [product])[0]
+    return payloads[0]
 
 
 @router.patch("/products/{product_id}", response_model=ProductResponse)
@@ -258,8 +220,9 @@ def patch_product(
         payload={"product_id": product.id, "sku": product.sku, "action": "update"},
     )
     db.commit()
+    product_cache.invalidate([product.id])
     db.refresh(product)
-    return _serialize_products(db, [product])[0]
+    return serialize_products(db, [product])[0]
 
 
 @router.post("/products/{product_id}/variants", response_model=ProductVariantResponse)
@@ -292,6 +255,7 @@ def create_product_variant(
         payload={"product_id": product.id, "variant_id": variant.id, "sku": variant.sku},
     )
     db.commit()
+    product_cache.invalidate([product.id])
     db.refresh(variant)
     return variant
 
@@ -374,23 +338,39 @@ def bulk_upsert_prices(
         else:
             db.add(PimPriceListItem(**item.model_dump()))
         upserted += 1
+    # Default prices are part of the product read model: announce the change like other product writes.
+    product_ids = set(
+        db.scalars(
+            select(PimProductVariant.product_id).where(
+                PimProductVariant.id.in_({item.variant_id for item in payload.items})
+            )
+        )
+    )
+    for product_id in sorted(product_ids):
+        enqueue_outbox_event(
+            db,
+            event_name="product.updated",
+            aggregate_type="product",
+            aggregate_id=str(product_id),
+            payload={"product_id": product_id, "action": "prices"},
+        )
     db.commit()
+    product_cache.invalidate(product_ids)
     return {"upserted": upserted}
 
 
 @router.get("/catalog/search")
 def search_catalog(
     q: str = Query(..., min_length=2),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _: CoreUser = Depends(require_permission("pim.read")),
 ) -> list[dict]:
-    stmt = (
-        select(PimProduct.id, PimProduct.sku, PimProduct.ean)
-        .where(or_(PimProduct.sku.ilike(f"%{q}%"), PimProduct.ean.ilike(f"%{q}%")))
-        .order_by(PimProduct.id.desc())
-        .limit(25)
-    )
-    return [{"id": row.id, "sku": row.sku, "ean": row.ean} for row in db.execute(stmt)]
+    ranked = [product_id for product_id, _ in search_products(db, q)]
+    rows = {
+        row.id: {"id": row.id, "sku": row.sku, "ean": row.ean}
+        for row in db.execute(select(PimProduct.id, PimProduct.sku, PimProduct.ean).where(PimProduct.id.in_(ranked)))
+    }
+    return [rows[product_id] for product_id in ranked if product_id in rows]
 
 
 @router.get("/revisions/{entity_type}/{entity_id}", response_model=list[RevisionResponse])
@@ -5,6 +5,7 @@ from sqlalchemy import delete, select
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_db, require_permission
+from app.core.permission_cache import invalidate_permissions
 from app.models.core import (
     CoreLocation,
     CorePermission,
@@ -51,6 +52,7 @@ def patch_user_roles(
             raise HTTPException(status_code=400, detail=f"Role {role_id} not found")
         db.add(CoreUserRole(user_id=user_id, role_id=role_id))
     db.commit()
+    invalidate_permissions()
     return MessageResponse(message="User roles updated")
 
 
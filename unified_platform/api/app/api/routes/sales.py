@@ -3,11 +3,11 @@ from __future__ import annotations
 from datetime import UTC, datetime
 from decimal import Decimal
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_db, require_permission
+from app.api.deps import get_db, get_read_db, require_permission
 from app.models.core import CoreUser
 from app.models.sales import (
     SalesCustomer,
@@ -23,13 +23,25 @@ from app.schemas.sales import (
     CustomerResponse,
     CustomerTierAssignRequest,
     CustomerUpdate,
+    OrderBulkTransitionRequest,
+    OrderBulkTransitionResponse,
     OrderLifecycleAction,
     RefundCreate,
     ReturnCreate,
     SalesOrderCreate,
+    SalesOrderDetailResponse,
+    SalesOrderListItem,
     SalesOrderResponse,
+    VariantVelocity,
+    WavePlanRequest,
+    WavePlanResponse,
 )
 from app.services.audit import enqueue_outbox_event, log_audit_event
+from app.services.order_search import get_order_detail, search_orders
+from app.services.order_transitions import transition_orders
+from app.services.reservation import consume_orders, enqueue_stock_pushes, release_orders, reserve_orders
+from app.services.sales_rollup import sync_sales_rollup, velocity
+from app.services.wave_planner import load_wave, plan_wave, serialize_plan
 
 router = APIRouter(prefix="/sales", tags=["sales"])
 
@@ -130,21 +142,25 @@ def assign_customer_tier(
     return {"customer_id": customer.id, "tier_id": customer.tier_id}
 
 
-@router.get("/orders", response_model=list[SalesOrderResponse])
+@router.get("/orders", response_model=list[SalesOrderListItem])
 def list_orders(
-    db: Session = Depends(get_db),
+    q: str | None = Query(default=None, description="Exact order number, external id, customer e-mail or line SKU"),
+    status: str | None = None,
+    limit: int = Query(default=100, ge=1, le=500),
+    offset: int = Query(default=0, ge=0),
+    db: Session = Depends(get_read_db),
     _: CoreUser = Depends(require_permission("sales.read")),
 ) -> list[SalesOrder]:
-    return db.scalars(select(SalesOrder).order_by(SalesOrder.id.desc()).limit(500)).all()
+    return search_orders(db, q=q, status=status, limit=limit, offset=offset)
 
 
-@router.get("/orders/{order_id}", response_model=SalesOrderResponse)
+@router.get("/orders/{order_id}", response_model=SalesOrderDetailResponse)
 def get_order(
     order_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _: CoreUser = Depends(require_permission("sales.read")),
 ) -> SalesOrder:
-    order = db.get(SalesOrder, order_id)
+    order = get_order_detail(db, order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     return order
@@ -211,6 +227,7 @@ def create_order(
                 line_total=line_subtotal + line_tax,
             )
         )
+    sync_sales_rollup(db, [order.id])
 
     _add_event(db, order_id=order.id, event_type="created", user_id=user.id, payload={"status": order.status})
     log_audit_event(
@@ -260,6 +277,21 @@ def _transition_order(
     elif to_status == "delivered":
         order.delivered_at = now
 
+    # Stock follows the order: reserve on confirm, consume on ship, release on cancel.
+    if to_status == "confirmed":
+        reservation = reserve_orders(db, [order.id])
+        touched_variants = reservation.variant_ids
+        if reservation.short:
+            payload = {**(payload or {}), "short_qty": str(reservation.short[order.id])}
+    elif to_status == "shipped":
+        touched_variants = consume_orders(db, [order.id], user_id=user.id)
+    elif to_status == "cancelled":
+        touched_variants = release_orders(db, [order.id])
+    else:
+        touched_variants = set()
+    enqueue_stock_pushes(db, touched_variants)
+    sync_sales_rollup(db, [order.id])
+
     _add_event(db, order_id=order.id, event_type=event_type, user_id=user.id, payload=payload)
     log_audit_event(
         db,
@@ -275,6 +307,72 @@ def _transition_order(
     return order
 
 
+@router.post("/orders/bulk-transition", response_model=OrderBulkTransitionResponse)
+def bulk_transition_orders(
+    payload: OrderBulkTransitionRequest,
+    db: Session = Depends(get_db),
+    user: CoreUser = Depends(require_permission("sales.write")),
+) -> dict:
+    """Pick, pack or ship a wave of orders in one transaction; orders that cannot move are reported, not fatal."""
+    results = transition_orders(
+        db,
+        payload.order_ids,
+        payload.action,
+        user_id=user.id,
+        payload=payload.model_dump(include={"note", "carrier_name"}),
+    )
+    db.commit()
+    succeeded = sum(1 for result in results if result["ok"])
+    return {"succeeded": succeeded, "failed": len(results) - succeeded, "results": results}
+
+
+@router.post("/waves", response_model=WavePlanResponse)
+def plan_pick_wave(
+    payload: WavePlanRequest,
+    db: Session = Depends(get_db),
+    user: CoreUser = Depends(require_permission("sales.write")),
+) -> dict:
+    """Pick list along the location path plus put-wall slots for a wave of confirmed orders."""
+    if payload.put_wall_size is not None and len(set(payload.order_ids)) > payload.put_wall_size:
+        raise HTTPException(status_code=400, detail=f"Wave has more orders than the {payload.put_wall_size}-slot put wall")
+    lines, stock, held, rejected = load_wave(db, payload.order_ids)
+    plan = plan_wave(lines, stock, held)
+    if payload.start_picking and plan.slots:
+        transition_orders(
+            db,
+            list(plan.slots),
+            "pick",
+            user_id=user.id,
+            payload={"wave_size": len(plan.slots)},
+            short=plan.shortages,
+        )
+        db.commit()
+    return {**serialize_plan(db, plan), "rejected_order_ids": rejected}
+
+
+@router.get("/velocity", response_model=list[VariantVelocity])
+def sales_velocity(
+    variant_ids: list[int] | None = Query(default=None),
+    channel: str | None = None,
+    db: Session = Depends(get_read_db),
+    _: CoreUser = Depends(require_permission("sales.read")),
+) -> list[dict]:
+    """Units sold and units per day over the last 7, 30 and 90 days, from the daily sales rollup."""
+    return velocity(db, variant_ids=variant_ids, channel=channel)
+
+
+@router.post("/velocity/rebuild")
+def rebuild_velocity(
+    days: int | None = Query(default=None, ge=1),
+    _: CoreUser = Depends(require_permission("sales.write")),
+) -> dict:
+    """Queue a rebuild of the daily sales rollup; the whole history when days is omitted."""
+    from app.tasks.maintenance import rebuild_sales_rollup  # avoid circular at module load
+
+    task = rebuild_sales_rollup.apply_async(kwargs={"days": days})
+    return {"status": "queued", "task_id": task.id}
+
+
 @router.post("/orders/{order_id}/confirm", response_model=SalesOrderResponse)
 def confirm_order(
     order_id: int,
@@ -336,6 +434,21 @@ def deliver_order(
     return _transition_order(db, order_id=order_id, to_status="delivered", event_type="delivered", user=user, payload=payload.model_dump())
 
 
+@router.post("/orders/{order_id}/cancel", response_model=SalesOrderResponse)
+def cancel_order(
+    order_id: int,
+    payload: OrderLifecycleAction,
+    db: Session = Depends(get_db),
+    user: CoreUser = Depends(require_permission("sales.write")),
+) -> SalesOrder:
+    order = db.get(SalesOrder, order_id)
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    if order.status in ("shipped", "delivered", "cancelled"):
+        raise HTTPException(status_code=409, detail=f"Order is {order.status}")
+    return _transition_order(db, order_id=order_id, to_status="cancelled", event_type="cancelled", user=user, payload=payload.model_dump())
+
+
 @router.post("/orders/{order_id}/returns")
 def create_return(
     order_id: int,
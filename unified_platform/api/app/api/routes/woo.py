@@ -10,9 +10,10 @@ from decimal import Decimal
 from fastapi import APIRouter, Depends, Header, HTTPException, Request
 from sqlalchemy import func, select
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_db, require_permission
+from app.api.deps import get_async_db, get_db, require_permission
 from app.models.core import CoreCompany, CoreUser
 from app.models.integration import (
     IntStoreChannel,
@@ -35,6 +36,8 @@ from app.schemas.woo import (
     WooWebhookOrderPayload,
 )
 from app.services.audit import enqueue_outbox_event, log_audit_event
+from app.services.reservation import WOO_STATUS_ACTIONS, apply_status_action, enqueue_stock_pushes
+from app.services.sales_rollup import sync_sales_rollup
 from app.ws.manager import ws_manager
 
 router = APIRouter(prefix="/integration/woo", tags=["woo-integration"])
@@ -174,23 +177,22 @@ def _validate_woo_signature(webhook_secret: str | None, body: bytes, signature_h
     return hmac.compare_digest(expected, signature_header)
 
 
-@router.post("/webhooks/{connection_id}/orders")
-async def ingest_order_webhook(
+def _ingest_order(
+    db: Session,
     connection_id: int,
-    request: Request,
-    x_wc_webhook_signature: str | None = Header(default=None),
-    x_wc_webhook_delivery_id: str | None = Header(default=None),
-    db: Session = Depends(get_db),
-    user: CoreUser = Depends(require_permission("sync.write")),
+    raw_body: bytes,
+    signature_header: str | None,
+    delivery_id: str | None,
+    user_id: int,
 ) -> dict:
+    """Webhook body processing; runs on the request's AsyncSession via run_sync. The caller commits."""
     connection = db.get(IntStoreConnection, connection_id)
     if not connection:
         raise HTTPException(status_code=404, detail="Connection not found")
 
-    raw_body = await request.body()
     payload_json = json.loads(raw_body.decode("utf-8"))
     payload = WooWebhookOrderPayload.model_validate(payload_json)
-    external_event_id = x_wc_webhook_delivery_id or f"woo-{payload.id}-{payload.status}"
+    external_event_id = delivery_id or f"woo-{payload.id}-{payload.status}"
 
     existing_event = db.scalar(
         select(IntWebhookEvent).where(
@@ -201,7 +203,7 @@ async def ingest_order_webhook(
     if existing_event:
         return {"status": "ignored_duplicate", "event_id": existing_event.id}
 
-    signature_valid = _validate_woo_signature(connection.webhook_secret, raw_body, x_wc_webhook_signature)
+    signature_valid = _validate_woo_signature(connection.webhook_secret, raw_body, signature_header)
     webhook_event = IntWebhookEvent(
         store_connection_id=connection_id,
         provider="woocommerce",
@@ -240,6 +242,7 @@ async def ingest_order_webhook(
             SalesOrder.order_number == order_number,
         )
     )
+    status_changed = existing_order is None or existing_order.status != payload.status
     if existing_order:
         existing_order.status = payload.status
         existing_order.total = payload.total or existing_order.total
@@ -259,7 +262,7 @@ async def ingest_order_webhook(
             tax_total=Decimal("0"),
             shipping_total=payload.shipping_total or Decimal("0"),
             total=payload.total or Decimal("0"),
-            created_by=user.id,
+            created_by=user_id,
         )
         db.add(order)
         db.flush()
@@ -288,11 +291,18 @@ async def ingest_order_webhook(
         if not payload.total:
             order.total = subtotal + (payload.shipping_total or Decimal("0"))
 
+    if status_changed:
+        touched_variants = apply_status_action(
+            db, [order.id], WOO_STATUS_ACTIONS.get(payload.status), user_id=user_id
+        )
+        enqueue_stock_pushes(db, touched_variants)
+        sync_sales_rollup(db, [order.id])
+
     db.add(
         SalesOrderEvent(
             order_id=order.id,
             event_type="woo_webhook_ingested",
-            created_by=user.id,
+            created_by=user_id,
             payload={"external_order_id": payload.id, "status": payload.status},
         )
     )
@@ -308,19 +318,37 @@ async def ingest_order_webhook(
     )
     log_audit_event(
         db,
-        actor_user_id=user.id,
+        actor_user_id=user_id,
         entity_type="int_webhook_event",
         entity_id=str(webhook_event.id),
         action="processed",
         before=None,
         after={"provider": "woocommerce", "external_event_id": external_event_id, "order_id": order.id},
     )
-    db.commit()
-
-    await ws_manager.broadcast("sync-status", {"event": "woo_webhook_processed", "connection_id": connection_id, "order_id": order.id})
     return {"status": "processed", "order_id": order.id, "signature_valid": signature_valid}
 
 
+@router.post("/webhooks/{connection_id}/orders")
+async def ingest_order_webhook(
+    connection_id: int,
+    request: Request,
+    x_wc_webhook_signature: str | None = Header(default=None),
+    x_wc_webhook_delivery_id: str | None = Header(default=None),
+    db: AsyncSession = Depends(get_async_db),
+    user: CoreUser = Depends(require_permission("sync.write")),
+) -> dict:
+    raw_body = await request.body()
+    result = await db.run_sync(
+        _ingest_order, connection_id, raw_body, x_wc_webhook_signature, x_wc_webhook_delivery_id, user.id
+    )
+    if result["status"] != "processed":
+        return result
+    await db.commit()
+
+    await ws_manager.broadcast("sync-status", {"event": "woo_webhook_processed", "connection_id": connection_id, "order_id": result["order_id"]})
+    return result
+
+
 @router.post("/products/bulk-visibility")
 def bulk_visibility(
     payload: WooBulkVisibilityRequest,
@@ -19,6 +19,14 @@ class Settings(BaseSettings):
     postgres_host: str = Field(default="postgres", alias="POSTGRES_HOST")
     postgres_port: int = Field(default=5432, alias="POSTGRES_PORT")
     database_url_override: str | None = Field(default=None, alias="DATABASE_URL")
+    # Per process: every Uvicorn worker, Celery worker and beat opens its own pool.
+    db_pool_size: int = Field(default=5, alias="DB_POOL_SIZE")
+    db_max_overflow: int = Field(default=5, alias="DB_MAX_OVERFLOW")
+    db_pool_timeout: int = Field(default=30, alias="DB_POOL_TIMEOUT")
+    db_pool_recycle: int = Field(default=1800, alias="DB_POOL_RECYCLE")
+    db_pgbouncer_mode: bool = Field(default=False, alias="DB_PGBOUNCER_MODE")
+    database_replica_url: str | None = Field(default=None, alias="DATABASE_REPLICA_URL")
+    replica_max_lag_seconds: float = Field(default=5.0, alias="REPLICA_MAX_LAG_SECONDS")
 
     redis_url: str = Field(default="redis://redis:6379/0", alias="REDIS_URL")
 
@@ -27,17 +35,49 @@ class Settings(BaseSettings):
     wgr_api_pass: str = Field(default="", alias="WGR_API_PASS")
     wgr_location_id: int = Field(default=1, alias="WGR_LOCATION_ID")
     wgr_company_id: int = Field(default=1, alias="WGR_COMPANY_ID")
+    wgr_push_batch_size: int = Field(default=50, alias="WGR_PUSH_BATCH_SIZE")
     woo_push_batch_size: int = Field(default=50, alias="WOO_PUSH_BATCH_SIZE")
     nshift_api_url: str = Field(default="https://api.unifaun.com/rs-extapi/v1", alias="NSHIFT_API_URL")
     nshift_developer_id: str = Field(default="", alias="NSHIFT_DEVELOPER_ID")
     nshift_api_key: str = Field(default="", alias="NSHIFT_API_KEY")
     nshift_printer_id: str = Field(default="", alias="NSHIFT_PRINTER_ID")
     nshift_sender_quick_id: str = Field(default="SNUSHALLEN", alias="NSHIFT_SENDER_QUICK_ID")
+    replenishment_velocity_days: int = Field(default=28, alias="REPLENISHMENT_VELOCITY_DAYS")
+    sales_rollup_timezone: str = Field(default="Europe/Stockholm", alias="SALES_ROLLUP_TIMEZONE")
+    replenishment_default_lead_time_days: int = Field(default=7, alias="REPLENISHMENT_DEFAULT_LEAD_TIME_DAYS")
+    partition_retention_months: int = Field(default=12, alias="PARTITION_RETENTION_MONTHS")
+    archive_dir: str = Field(default="/var/lib/unified-erp/archive", alias="ARCHIVE_DIR")
+    ws_redis_bridge: bool = Field(default=True, alias="WS_REDIS_BRIDGE")
+    ws_send_queue_size: int = Field(default=100, alias="WS_SEND_QUEUE_SIZE")
+    ws_send_timeout_seconds: float = Field(default=5.0, alias="WS_SEND_TIMEOUT_SECONDS")
+    ws_inventory_buffer_size: int = Field(default=1000, alias="WS_INVENTORY_BUFFER_SIZE")
+    barcode_index_poll_seconds: float = Field(default=2.0, alias="BARCODE_INDEX_POLL_SECONDS")
+    barcode_index_reload_seconds: float = Field(default=900.0, alias="BARCODE_INDEX_RELOAD_SECONDS")
+    product_cache_max_entries: int = Field(default=20000, alias="PRODUCT_CACHE_MAX_ENTRIES")
+    product_cache_ttl_seconds: float = Field(default=300.0, alias="PRODUCT_CACHE_TTL_SECONDS")
+    product_cache_poll_seconds: float = Field(default=2.0, alias="PRODUCT_CACHE_POLL_SECONDS")
 
     jwt_secret_key: str = Field(default="change-me-in-production", alias="JWT_SECRET_KEY")
     jwt_refresh_secret_key: str = Field(default="change-me-refresh-key", alias="JWT_REFRESH_SECRET_KEY")
     access_token_expire_minutes: int = Field(default=30, alias="ACCESS_TOKEN_EXPIRE_MINUTES")
     refresh_token_expire_minutes: int = Field(default=10080, alias="REFRESH_TOKEN_EXPIRE_MINUTES")
+    permission_cache_ttl_seconds: int = Field(default=300, alias="PERMISSION_CACHE_TTL_SECONDS")
+    permission_version_poll_seconds: float = Field(default=1.0, alias="PERMISSION_VERSION_POLL_SECONDS")
+    permission_version_backoff_seconds: float = Field(default=10.0, alias="PERMISSION_VERSION_BACKOFF_SECONDS")
+    bcrypt_rounds: int = Field(default=12, alias="BCRYPT_ROUNDS")
+    password_hash_workers: int = Field(default=4, alias="PASSWORD_HASH_WORKERS")
+    password_hash_queue: int = Field(default=64, alias="PASSWORD_HASH_QUEUE")
+    login_max_failures_per_account: int = Field(default=5, alias="LOGIN_MAX_FAILURES_PER_ACCOUNT")
+    login_max_failures_per_ip: int = Field(default=50, alias="LOGIN_MAX_FAILURES_PER_IP")
+    login_failure_window_seconds: int = Field(default=900, alias="LOGIN_FAILURE_WINDOW_SECONDS")
+
+    @staticmethod
+    def _with_sslmode(url: str) -> str:
+        # psycopg3 defaults to requiring SSL; disable when server doesn't support it
+        if "sslmode" not in url:
+            sep = "&" if "?" in url else "?"
+            url = f"{url}{sep}sslmode=disable"
+        return url
 
     @property
     def database_url(self) -> str:
@@ -48,11 +88,11 @@ class Settings(BaseSettings):
                 f"postgresql+psycopg://{self.postgres_user}:{self.postgres_password}"
                 f"@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}"
             )
-        # psycopg3 defaults to requiring SSL; disable when server doesn't support it
-        if "sslmode" not in url:
-            sep = "&" if "?" in url else "?"
-            url = f"{url}{sep}sslmode=disable"
-        return url
+        return self._with_sslmode(url)
+
+    @property
+    def replica_database_url(self) -> str | None:
+        return self._with_sslmode(self.database_replica_url) if self.database_replica_url else None
 
 
 settings = Settings()
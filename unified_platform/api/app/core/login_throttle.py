@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import logging
+
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_client: aioredis.Redis | None = None
+
+
+def _redis() -> aioredis.Redis:
+    global _client
+    if _client is None:
+        _client = aioredis.Redis.from_url(settings.redis_url, socket_timeout=0.5, socket_connect_timeout=0.5)
+    return _client
+
+
+def _keys(email: str, ip: str | None) -> list[tuple[str, int]]:
+    keys = [(f"login:fail:acct:{email.strip().lower()}", settings.login_max_failures_per_account)]
+    if ip:
+        keys.append((f"login:fail:ip:{ip}", settings.login_max_failures_per_ip))
+    return keys
+
+
+async def retry_after(email: str, ip: str | None) -> int | None:
+    """
+    Seconds until the account or IP may try again, or None when not throttled.
+    Failures are counted in a fixed window; Redis being down fails open.
+    """
+    client = _redis()
+    try:
+        for key, limit in _keys(email, ip):
+            failures = await client.get(key)
+            if failures is not None and int(failures) >= limit:
+                return max(await client.ttl(key), 1)
+    except RedisError as exc:
+        logger.warning("Login throttle lookup failed: %s", exc)
+    return None
+
+
+async def record_failure(email: str, ip: str | None) -> None:
+    client = _redis()
+    try:
+        async with client.pipeline(transaction=False) as pipe:
+            for key, _ in _keys(email, ip):
+                pipe.incr(key)
+                pipe.expire(key, settings.login_failure_window_seconds, nx=True)
+            await pipe.execute()
+    except RedisError as exc:
+        logger.warning("Login throttle update failed: %s", exc)
+
+
+async def reset_account(email: str) -> None:
+    try:
+        await _redis().delete(_keys(email, None)[0][0])
+    except RedisError as exc:
+        logger.warning("Login throttle reset failed: %s", exc)
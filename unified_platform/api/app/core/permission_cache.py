@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Protocol
+
+import redis
+
+from app.core.config import settings
+from app.models.core import CoreUser
+
+logger = logging.getLogger(__name__)
+
+RBAC_VERSION_KEY = "rbac:version"
+
+
+class VersionStore(Protocol):
+    def current(self) -> int | None: ...
+
+    def bump(self) -> None: ...
+
+
+class RedisVersionStore:
+    """
+    Cluster-wide RBAC version stamp. None when Redis is unreachable, which disables caching.
+    The stamp read from Redis is reused for poll_seconds, so a change made in another
+    process is seen within that interval; after a failed read Redis is left alone for
+    backoff_seconds instead of costing every request a connect timeout.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        *,
+        poll_seconds: float,
+        backoff_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self.poll_seconds = poll_seconds
+        self.backoff_seconds = backoff_seconds
+        self._clock = clock
+        # (version, valid until); version None while backing off after a failure.
+        self._cached: tuple[int | None, float] = (None, 0.0)
+
+    def current(self) -> int | None:
+        version, valid_until = self._cached
+        now = self._clock()
+        if now < valid_until:
+            return version
+        try:
+            version = int(self.client.get(RBAC_VERSION_KEY) or 0)
+        except redis.RedisError as exc:
+            logger.warning(
+                "RBAC version lookup failed, bypassing permission cache for %.0fs: %s", self.backoff_seconds, exc
+            )
+            self._cached = (None, now + self.backoff_seconds)
+            return None
+        self._cached = (version, now + self.poll_seconds)
+        return version
+
+    def bump(self) -> None:
+        try:
+            version = int(self.client.incr(RBAC_VERSION_KEY))
+        except redis.RedisError as exc:
+            logger.warning("RBAC version bump failed: %s", exc)
+            return
+        # This process sees its own change at once; the others on their next poll.
+        self._cached = (version, self._clock() + self.poll_seconds)
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    user: CoreUser  # detached from its session; only column attributes are safe to read
+    permissions: frozenset[str]
+
+
+@dataclass(frozen=True, slots=True)
+class _Entry:
+    principal: Principal
+    version: int
+    expires_at: float
+
+
+class PermissionCache:
+    """
+    Per-process user + permission cache.
+    An entry is valid while its TTL lasts and the shared version stamp is unchanged;
+    any role or role-permission change bumps the stamp and every process drops its
+    entries once it next reads the stamp (see RedisVersionStore.poll_seconds).
+    """
+
+    def __init__(self, store: VersionStore, ttl_seconds: float) -> None:
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self._entries: dict[int, _Entry] = {}
+        self._lock = threading.Lock()
+
+    def version(self) -> int | None:
+        return self.store.current()
+
+    def get(self, user_id: int, version: int | None) -> Principal | None:
+        if version is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(user_id)
+        if entry is None or entry.version != version or entry.expires_at < time.monotonic():
+            return None
+        return entry.principal
+
+    def put(self, user_id: int, principal: Principal, version: int | None) -> None:
+        if version is None:
+            return
+        with self._lock:
+            self._entries[user_id] = _Entry(principal, version, time.monotonic() + self.ttl_seconds)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        self.store.bump()
+
+
+permission_cache = PermissionCache(
+    RedisVersionStore(
+        settings.redis_url,
+        poll_seconds=settings.permission_version_poll_seconds,
+        backoff_seconds=settings.permission_version_backoff_seconds,
+    ),
+    settings.permission_cache_ttl_seconds,
+)
+
+
+def invalidate_permissions() -> None:
+    """Call after committing any change to user roles or role permissions."""
+    permission_cache.invalidate()
@@ -1,14 +1,29 @@
 from __future__ import annotations
 
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import UTC, datetime, timedelta
-from typing import Any
+from typing import Any, Callable, TypeVar
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+T = TypeVar("T")
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
+
+# bcrypt releases the GIL, so a small dedicated pool runs hashes in parallel without
+# occupying the threads that serve ordinary sync endpoints. Work beyond the pool plus
+# its queue is refused rather than queued behind a login storm.
+_password_executor = ThreadPoolExecutor(max_workers=settings.password_hash_workers, thread_name_prefix="bcrypt")
+_password_slots = threading.BoundedSemaphore(settings.password_hash_workers + settings.password_hash_queue)
+
+
+class PasswordHasherBusy(RuntimeError):
+    pass
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -19,6 +34,32 @@ def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True when the hash was made with other cost parameters than the current BCRYPT_ROUNDS."""
+    return pwd_context.needs_update(hashed_password)
+
+
+async def _run_bounded(fn: Callable[..., T], *args: Any) -> T:
+    if not _password_slots.acquire(blocking=False):
+        raise PasswordHasherBusy("password hashing pool is saturated")
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_password_executor, fn, *args)
+    finally:
+        _password_slots.release()
+
+
+async def verify_password_async(plain_password: str, hashed_password: str | None) -> bool:
+    """Verify on the bcrypt pool. A missing hash still burns one verification so unknown accounts take as long."""
+    if hashed_password is None:
+        await _run_bounded(pwd_context.dummy_verify)
+        return False
+    return await _run_bounded(pwd_context.verify, plain_password, hashed_password)
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_bounded(pwd_context.hash, password)
+
+
 def create_access_token(subject: str, expires_delta: timedelta | None = None) -> str:
     expire = datetime.now(UTC) + (expires_delta or timedelta(minutes=settings.access_token_expire_minutes))
     payload: dict[str, Any] = {"sub": subject, "type": "access", "exp": expire}
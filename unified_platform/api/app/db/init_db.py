@@ -28,6 +28,7 @@ DEFAULT_PERMISSIONS = [
     "sync.read",
     "sync.write",
     "dashboard.read",
+    "metrics.read",
     "rbac.read",
     "rbac.write",
 ]
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from datetime import UTC, date, datetime
+
+from sqlalchemy import Table, event, text
+from sqlalchemy.engine import Connection
+
+# Monthly range-partitioned tables and their partition key column.
+PARTITIONED_TABLES: dict[str, str] = {
+    "inv_stock_movement": "moved_at",
+    "core_audit_event": "created_at",
+    "int_sync_queue": "created_at",
+}
+
+# Months created ahead of "now" so inserts never land in the default partition.
+MONTHS_AHEAD = 2
+
+_BOUND_RE = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+@dataclass(slots=True)
+class MonthPartition:
+    name: str
+    start: date
+    end: date
+
+
+def month_start(value: date | datetime) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def ensure_monthly_partitions(conn: Connection, table: str, *, start: date, end: date) -> list[str]:
+    """Create the default partition and one partition per month in [start, end]. Idempotent.
+
+    A month whose rows already landed in the default partition cannot be created next to
+    them; the default is detached, the month created, its rows moved over and the default
+    re-attached, all in the caller's transaction.
+    """
+    default = f"{table}_default"
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {default} PARTITION OF {table} DEFAULT"))
+    column = PARTITIONED_TABLES[table]
+    created: list[str] = []
+    month = month_start(start)
+    while month <= end:
+        name = partition_name(table, month)
+        bounds = {"start": month, "end": add_months(month, 1)}
+        create = text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        )
+        in_month = f"{column} >= :start AND {column} < :end"
+        stranded = conn.scalar(text("SELECT to_regclass(:name) IS NULL"), {"name": name}) and conn.scalar(
+            text(f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {in_month})"), bounds
+        )
+        if stranded:
+            conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {default}"))
+            conn.execute(create)
+            conn.execute(text(f"INSERT INTO {table} SELECT * FROM {default} WHERE {in_month}"), bounds)
+            conn.execute(text(f"DELETE FROM {default} WHERE {in_month}"), bounds)
+            conn.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT"))
+        else:
+            conn.execute(create)
+        created.append(name)
+        month = add_months(month, 1)
+    return created
+
+
+def ensure_current_partitions(conn: Connection, table: str) -> list[str]:
+    this_month = month_start(datetime.now(UTC))
+    return ensure_monthly_partitions(conn, table, start=this_month, end=add_months(this_month, MONTHS_AHEAD))
+
+
+def list_month_partitions(conn: Connection, table: str) -> list[MonthPartition]:
+    """Attached monthly partitions of table, oldest first (the default partition is skipped)."""
+    rows = conn.execute(
+        text(
+            """
+            SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = :table
+            """
+        ),
+        {"table": table},
+    )
+    partitions: list[MonthPartition] = []
+    for name, bound in rows:
+        match = _BOUND_RE.search(bound or "")
+        if not match:
+            continue
+        partitions.append(
+            MonthPartition(
+                name=name,
+                start=date.fromisoformat(match.group(1)[:10]),
+                end=date.fromisoformat(match.group(2)[:10]),
+            )
+        )
+    return sorted(partitions, key=lambda partition: partition.start)
+
+
+def is_partitioned(conn: Connection, table: str) -> bool:
+    return bool(
+        conn.scalar(
+            text(
+                "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = :table"
+            ),
+            {"table": table},
+        )
+    )
+
+
+def register_partitioned_table(table: Table) -> None:
+    """Create default + current monthly partitions whenever the parent is created on PostgreSQL."""
+
+    @event.listens_for(table, "after_create")
+    def _create_partitions(target: Table, connection: Connection, **_: object) -> None:
+        if connection.dialect.name == "postgresql":
+            ensure_current_partitions(connection, target.name)
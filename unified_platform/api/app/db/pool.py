@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.config import settings
+
+
+@dataclass
+class CheckoutStats:
+    checkouts: int = 0
+    timeouts: int = 0
+    wait_total_s: float = 0.0
+    wait_max_s: float = 0.0
+
+    def observe(self, wait_s: float, *, timed_out: bool = False) -> None:
+        self.checkouts += 1
+        self.timeouts += int(timed_out)
+        self.wait_total_s += wait_s
+        self.wait_max_s = max(self.wait_max_s, wait_s)
+
+
+_lock = threading.Lock()
+# label -> (stats, latest pool instance); pools are replaced on dispose()/recreate().
+_registry: dict[str, tuple[CheckoutStats, QueuePool | None]] = {}
+
+
+class _InstrumentedPool:
+    """Times every checkout, i.e. how long a caller waited for a free connection."""
+
+    label = "default"
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        with _lock:
+            stats, _ = _registry.get(self.label, (CheckoutStats(), None))
+            _registry[self.label] = (stats, self)
+
+    def _do_get(self):
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            timed_out = True
+            raise
+        finally:
+            with _lock:
+                _registry[self.label][0].observe(time.perf_counter() - started, timed_out=timed_out)
+
+
+def instrumented_pool(base: type[QueuePool], label: str) -> type[QueuePool]:
+    return type(f"Instrumented{base.__name__}", (_InstrumentedPool, base), {"label": label})
+
+
+def engine_options(label: str, *, is_async: bool = False) -> dict:
+    """create_engine/create_async_engine kwargs for a pool driven by Settings."""
+    options: dict = {
+        "poolclass": instrumented_pool(AsyncAdaptedQueuePool if is_async else QueuePool, label),
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": True,
+    }
+    if settings.db_pgbouncer_mode:
+        # Transaction pooling hands each transaction a different server backend, so
+        # psycopg must never prepare statements server-side.
+        options["connect_args"] = {"prepare_threshold": None}
+    return options
+
+
+def pool_metrics() -> dict[str, dict]:
+    """Point-in-time usage and cumulative checkout waits per instrumented pool."""
+    with _lock:
+        entries = list(_registry.items())
+    metrics: dict[str, dict] = {}
+    for label, (stats, pool) in entries:
+        metrics[label] = {
+            "size": pool.size() if pool else 0,
+            "checked_out": pool.checkedout() if pool else 0,
+            "checked_in": pool.checkedin() if pool else 0,
+            "overflow": max(pool.overflow(), 0) if pool else 0,
+            "checkouts": stats.checkouts,
+            "timeouts": stats.timeouts,
+            "wait_avg_ms": round(stats.wait_total_s / stats.checkouts * 1000, 3) if stats.checkouts else 0.0,
+            "wait_max_ms": round(stats.wait_max_s * 1000, 3),
+        }
+    return metrics
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.db.session import read_engine
+
+logger = logging.getLogger(__name__)
+
+# Lag is probed at most this often per process; requests in between reuse the verdict.
+LAG_CHECK_INTERVAL_SECONDS = 5.0
+
+# An idle primary makes now() - pg_last_xact_replay_timestamp() grow without real lag,
+# so a replica that has replayed everything it received counts as zero lag.
+LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class ReplicaHealth:
+    def __init__(self, bind: Engine | None, max_lag_seconds: float, interval: float = LAG_CHECK_INTERVAL_SECONDS) -> None:
+        self.bind = bind
+        self.max_lag_seconds = max_lag_seconds
+        self.interval = interval
+        self.healthy = False
+        self.lag_seconds: float | None = None
+        self.checked_at = float("-inf")
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def probe(self) -> float | None:
+        """Current replay lag in seconds, or None when the replica cannot be reached."""
+        try:
+            with self.bind.connect() as conn:
+                return float(conn.scalar(LAG_QUERY))
+        except Exception as exc:
+            logger.warning("Replica lag probe failed: %s", exc)
+            return None
+
+    def is_usable(self) -> bool:
+        """Last verdict while it is fresh; otherwise one caller probes, outside the lock,
+        and the others keep using the last verdict until the probe is in."""
+        if self.bind is None:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            if self._probing or now - self.checked_at < self.interval:
+                return self.healthy
+            self._probing = True
+            self.checked_at = now
+        lag_seconds = None
+        try:
+            lag_seconds = self.probe()
+        finally:
+            healthy = lag_seconds is not None and lag_seconds <= self.max_lag_seconds
+            with self._lock:
+                self._probing = False
+                self.lag_seconds = lag_seconds
+                if healthy != self.healthy:
+                    logger.info("Read replica %s (lag=%s s)", "enabled" if healthy else "bypassed", lag_seconds)
+                self.healthy = healthy
+        return healthy
+
+
+replica_health = ReplicaHealth(read_engine, settings.replica_max_lag_seconds)
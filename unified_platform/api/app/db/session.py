@@ -1,9 +1,24 @@
 from __future__ import annotations
 
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
+from app.db.pool import engine_options
 
-engine = create_engine(settings.database_url, future=True, pool_pre_ping=True)
+engine = create_engine(settings.database_url, future=True, **engine_options("sync"))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Optional streaming replica for GET handlers and reports; see app.db.replica for the lag fallback.
+read_engine = (
+    create_engine(settings.replica_database_url, future=True, **engine_options("read"))
+    if settings.replica_database_url
+    else None
+)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine) if read_engine else None
+
+# Used by the async route handlers so DB round-trips yield to the event loop.
+# Objects stay loaded after commit: lazy refreshes are not possible outside the greenlet bridge.
+async_engine = create_async_engine(settings.database_url, **engine_options("async", is_async=True))
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
@@ -1,15 +1,23 @@
 from __future__ import annotations
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+import logging
+
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, status
 from fastapi.middleware.cors import CORSMiddleware
+
 from app.api.router import api_router
 from app.core.config import settings
 from app.db.base import Base
 from app.db.init_db import seed_defaults
 from app.db.session import SessionLocal, engine
 from app.models import core, integration, inventory, mdm, pim, procurement, sales  # noqa: F401
+from app.services.barcode import barcode_index
+from app.services.product_cache import product_cache
+from app.ws.inventory_feed import inventory_feed
 from app.ws.manager import ws_manager
 
+logger = logging.getLogger(__name__)
+
 app = FastAPI(title=settings.app_name, openapi_url=f"{settings.api_v1_prefix}/openapi.json")
 
 app.add_middleware(
@@ -34,6 +42,38 @@ def startup() -> None:
         db.close()
 
 
+@app.on_event("startup")
+async def start_ws_bridge() -> None:
+    if ws_manager.bridge is not None:
+        await ws_manager.bridge.start_or_retry()
+
+
+@app.on_event("shutdown")
+async def stop_ws_bridge() -> None:
+    if ws_manager.bridge is not None:
+        await ws_manager.bridge.stop()
+
+
+@app.on_event("startup")
+async def start_barcode_index() -> None:
+    await barcode_index.start()
+
+
+@app.on_event("shutdown")
+async def stop_barcode_index() -> None:
+    await barcode_index.stop()
+
+
+@app.on_event("startup")
+async def start_product_cache() -> None:
+    await product_cache.start()
+
+
+@app.on_event("shutdown")
+async def stop_product_cache() -> None:
+    await product_cache.stop()
+
+
 @app.get("/")
 def root() -> dict[str, str]:
     return {"service": settings.app_name, "status": "ok"}
@@ -51,14 +91,43 @@ async def ws_dashboard(websocket: WebSocket) -> None:
 
 
 @app.websocket("/api/v1/ws/inventory/{location_id}")
-async def ws_inventory(websocket: WebSocket, location_id: int) -> None:
+async def ws_inventory(websocket: WebSocket, location_id: int, since: int | None = None) -> None:
+    """
+    Streams `stock_delta` payloads with a per-location `seq`.
+    On a gap, a client sends {"action": "resync", "since": <last seq>} and gets the
+    missed deltas replayed, or `resync_required` when it must reload from REST.
+    """
     channel = f"inventory:{location_id}"
     await ws_manager.connect(channel, websocket)
     try:
+        await ws_manager.send(channel, websocket, {"event": "hello", "location_id": location_id, "seq": inventory_feed.current_seq(location_id)})
+        if since is not None:
+            await _replay_inventory(channel, websocket, location_id, since)
         while True:
-            await websocket.receive_text()
+            message = await websocket.receive_json()
+            if isinstance(message, dict) and message.get("action") == "resync":
+                await _replay_inventory(channel, websocket, location_id, int(message.get("since") or 0))
     except WebSocketDisconnect:
         ws_manager.disconnect(channel, websocket)
+    except (ValueError, TypeError):
+        # Not JSON, or a resync whose `since` is not a number.
+        try:
+            await websocket.close(code=status.WS_1003_UNSUPPORTED_DATA)
+        finally:
+            ws_manager.disconnect(channel, websocket)
+
+
+async def _replay_inventory(channel: str, websocket: WebSocket, location_id: int, since: int) -> None:
+    missed = inventory_feed.since(location_id, since)
+    if missed is None:
+        await ws_manager.send(
+            channel,
+            websocket,
+            {"event": "resync_required", "location_id": location_id, "seq": inventory_feed.current_seq(location_id)},
+        )
+        return
+    for payload in missed:
+        await ws_manager.send(channel, websocket, payload)
 
 
 @app.websocket("/api/v1/ws/receiving/{shipment_id}")
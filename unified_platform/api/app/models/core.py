@@ -17,6 +17,7 @@ from sqlalchemy import (
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
+from app.db.partitions import register_partitioned_table
 from app.models.base import TimestampMixin
 
 
@@ -122,10 +123,13 @@ class CoreUserLocationScope(Base):
 
 
 class CoreAuditEvent(Base):
+    """Range-partitioned by month on created_at (see app.db.partitions)."""
+
     __tablename__ = "core_audit_event"
     __table_args__ = (
         Index("ix_core_audit_event_entity", "entity_type", "entity_id"),
-        Index("ix_core_audit_event_created_at", "created_at"),
+        Index("ix_core_audit_event_created_at", "created_at", postgresql_using="brin"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
     )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
@@ -137,4 +141,11 @@ class CoreAuditEvent(Base):
     after_jsonb: Mapped[dict | None] = mapped_column(JSON)
     correlation_id: Mapped[str | None] = mapped_column(String(128))
     ip: Mapped[str | None] = mapped_column(String(64))
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), primary_key=True, server_default=func.now(), nullable=False
+    )
+
+    __mapper_args__ = {"primary_key": [id]}
+
+
+register_partitioned_table(CoreAuditEvent.__table__)
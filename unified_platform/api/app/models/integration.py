@@ -5,6 +5,7 @@ from sqlalchemy import (
     Boolean,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     Numeric,
     String,
@@ -15,6 +16,7 @@ from sqlalchemy import (
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.base import Base
+from app.db.partitions import register_partitioned_table
 
 
 class IntOutboxEvent(Base):
@@ -96,7 +98,13 @@ class IntSyncJob(Base):
 
 
 class IntSyncQueue(Base):
+    """Range-partitioned by month on created_at (see app.db.partitions)."""
+
     __tablename__ = "int_sync_queue"
+    __table_args__ = (
+        Index("ix_int_sync_queue_created_at", "created_at", postgresql_using="brin"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     job_id: Mapped[int | None] = mapped_column(ForeignKey("int_sync_job.id"))
@@ -108,16 +116,24 @@ class IntSyncQueue(Base):
     retry_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
     available_at: Mapped[str] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     last_error: Mapped[str | None] = mapped_column(Text)
-    created_at: Mapped[str] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    created_at: Mapped[str] = mapped_column(
+        DateTime(timezone=True), primary_key=True, server_default=func.now(), nullable=False
+    )
     processed_at: Mapped[str | None] = mapped_column(DateTime(timezone=True))
 
+    __mapper_args__ = {"primary_key": [id]}
+
+
+register_partitioned_table(IntSyncQueue.__table__)
+
 
 class IntSyncError(Base):
     __tablename__ = "int_sync_error"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     job_id: Mapped[int | None] = mapped_column(ForeignKey("int_sync_job.id"))
-    queue_id: Mapped[int | None] = mapped_column(ForeignKey("int_sync_queue.id"))
+    # No FK: int_sync_queue is partitioned and its id alone is not a unique key.
+    queue_id: Mapped[int | None] = mapped_column(Integer, index=True)
     error_code: Mapped[str | None] = mapped_column(String(64))
     error_message: Mapped[str] = mapped_column(Text, nullable=False)
     payload: Mapped[dict | None] = mapped_column(JSON)
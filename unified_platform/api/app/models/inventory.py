@@ -3,6 +3,7 @@ from __future__ import annotations
 from datetime import datetime
 
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     DateTime,
     ForeignKey,
@@ -13,10 +14,12 @@ from sqlalchemy import (
     Text,
     UniqueConstraint,
     func,
+    text,
 )
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.base import Base
+from app.db.partitions import register_partitioned_table
 from app.models.base import TimestampMixin
 
 
@@ -102,8 +105,15 @@ class InvStockBalance(Base, TimestampMixin):
 
 
 class InvStockMovement(Base):
+    """Append-only stock ledger, range-partitioned by month on moved_at (see app.db.partitions)."""
+
     __tablename__ = "inv_stock_movement"
-    __table_args__ = (Index("ix_inv_stock_movement_moved_at", "moved_at"),)
+    __table_args__ = (
+        Index("ix_inv_stock_movement_moved_at", "moved_at", postgresql_using="brin"),
+        Index("ix_inv_stock_movement_variant_moved_at", "variant_id", "moved_at"),
+        Index("ix_inv_stock_movement_variant_xact_id", "variant_id", "xact_id"),
+        {"postgresql_partition_by": "RANGE (moved_at)"},
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     company_id: Mapped[int] = mapped_column(ForeignKey("core_company.id"), nullable=False)
@@ -119,7 +129,40 @@ class InvStockMovement(Base):
     source_doc_type: Mapped[str | None] = mapped_column(String(64))
     source_doc_id: Mapped[str | None] = mapped_column(String(64))
     moved_by: Mapped[int | None] = mapped_column(ForeignKey("core_user.id"))
-    moved_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    moved_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), primary_key=True, server_default=func.now(), nullable=False
+    )
+    # Writing transaction, so snapshots can tell which movements they did not see (NULL: before 20261019_0013).
+    xact_id: Mapped[int | None] = mapped_column(BigInteger, server_default=text("(pg_current_xact_id()::text)::bigint"))
+
+    # The partition key has to be part of the table's primary key; rows are still identified by id.
+    __mapper_args__ = {"primary_key": [id]}
+
+
+register_partitioned_table(InvStockMovement.__table__)
+
+
+class InvStockSnapshotRun(Base):
+    __tablename__ = "inv_stock_snapshot_run"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    snapshot_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, unique=True)
+    # pg_current_snapshot() of the copying transaction, "xmin:xmax:xip,..."; NULL for backfills.
+    xact_snapshot: Mapped[str | None] = mapped_column(Text)
+    row_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+
+class InvStockSnapshot(Base):
+    """On-hand per (variant, location) at a run's snapshot_at. Zero balances are not stored."""
+
+    __tablename__ = "inv_stock_snapshot"
+
+    run_id: Mapped[int] = mapped_column(
+        ForeignKey("inv_stock_snapshot_run.id", ondelete="CASCADE"), primary_key=True
+    )
+    variant_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    location_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    on_hand_qty: Mapped[float] = mapped_column(Numeric(14, 2), nullable=False)
 
 
 class InvValuationLayer(Base, TimestampMixin):
@@ -127,7 +170,8 @@ class InvValuationLayer(Base, TimestampMixin):
     __table_args__ = (Index("ix_inv_valuation_layer_variant", "variant_id"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    movement_id: Mapped[int] = mapped_column(ForeignKey("inv_stock_movement.id"), nullable=False)
+    # No FK: inv_stock_movement is partitioned and its id alone is not a unique key.
+    movement_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
     variant_id: Mapped[int] = mapped_column(ForeignKey("pim_product_variant.id"), nullable=False)
     location_id: Mapped[int] = mapped_column(ForeignKey("core_location.id"), nullable=False)
     method: Mapped[str] = mapped_column(String(16), nullable=False)
@@ -139,9 +183,27 @@ class InvValuationLayer(Base, TimestampMixin):
     remaining_cost: Mapped[float] = mapped_column(Numeric(14, 4), default=0, nullable=False)
 
 
+class InvValuationSummary(Base):
+    __tablename__ = "inv_valuation_summary"
+    __table_args__ = (UniqueConstraint("variant_id", "location_id", name="uq_inv_valuation_summary_scope"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    variant_id: Mapped[int] = mapped_column(ForeignKey("pim_product_variant.id"), nullable=False)
+    location_id: Mapped[int] = mapped_column(ForeignKey("core_location.id"), nullable=False)
+    qty_on_hand: Mapped[float] = mapped_column(Numeric(14, 2), default=0, nullable=False)
+    fifo_value: Mapped[float] = mapped_column(Numeric(16, 4), default=0, nullable=False)
+    wac_value: Mapped[float] = mapped_column(Numeric(16, 4), default=0, nullable=False)
+    last_unit_cost: Mapped[float | None] = mapped_column(Numeric(14, 4))
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
 class InvReceivingScanEvent(Base):
     __tablename__ = "inv_receiving_scan_event"
-    __table_args__ = (Index("ix_inv_receiving_scan_event_scanned_at", "scanned_at"),)
+    __table_args__ = (
+        Index("ix_inv_receiving_scan_event_scanned_at", "scanned_at"),
+        # Replay guard for buffered device uploads; rows without device_id/client_seq never conflict.
+        Index("uq_inv_receiving_scan_event_device_seq", "shipment_id", "device_id", "client_seq", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     shipment_id: Mapped[int] = mapped_column(ForeignKey("inv_inbound_shipment.id"), nullable=False)
@@ -151,6 +213,7 @@ class InvReceivingScanEvent(Base):
     scan_result: Mapped[str] = mapped_column(String(32), nullable=False)
     user_id: Mapped[int | None] = mapped_column(ForeignKey("core_user.id"))
     device_id: Mapped[str | None] = mapped_column(String(128))
+    client_seq: Mapped[int | None] = mapped_column(BigInteger)
     scanned_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
 
@@ -187,6 +250,23 @@ class InvReplenishmentRule(Base, TimestampMixin):
     lead_time_days_override: Mapped[int | None] = mapped_column(Integer)
 
 
+class InvReplenishmentSuggestion(Base):
+    __tablename__ = "inv_replenishment_suggestion"
+    __table_args__ = (Index("ix_inv_replenishment_suggestion_scope", "location_id", "variant_id"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    rule_id: Mapped[int] = mapped_column(ForeignKey("inv_replenishment_rule.id", ondelete="CASCADE"), nullable=False)
+    company_id: Mapped[int] = mapped_column(ForeignKey("core_company.id"), nullable=False)
+    location_id: Mapped[int] = mapped_column(ForeignKey("core_location.id"), nullable=False)
+    variant_id: Mapped[int] = mapped_column(ForeignKey("pim_product_variant.id"), nullable=False)
+    supplier_id: Mapped[int | None] = mapped_column(ForeignKey("mdm_partner.id"))
+    on_hand_qty: Mapped[float] = mapped_column(Numeric(14, 2), nullable=False)
+    incoming_qty: Mapped[float] = mapped_column(Numeric(14, 2), nullable=False)
+    lead_time_demand: Mapped[float] = mapped_column(Numeric(14, 2), nullable=False)
+    suggested_qty: Mapped[float] = mapped_column(Numeric(14, 2), nullable=False)
+    computed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
 class InvStockAlert(Base):
     __tablename__ = "inv_stock_alert"
     __table_args__ = (Index("ix_inv_stock_alert_status", "status"),)
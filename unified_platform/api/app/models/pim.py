@@ -45,6 +45,8 @@ class PimProduct(Base, TimestampMixin):
     __table_args__ = (
         UniqueConstraint("company_id", "sku", name="uq_pim_product_company_sku"),
         Index("ix_pim_product_lookup", "company_id", "sku", "ean"),
+        Index("ix_pim_product_ean", "ean"),
+        Index("ix_pim_product_gtin14", "gtin14"),
     )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
@@ -81,6 +83,8 @@ class PimProductVariant(Base, TimestampMixin):
     __table_args__ = (
         UniqueConstraint("product_id", "sku", name="uq_pim_product_variant_product_sku"),
         Index("ix_pim_product_variant_sku_ean", "sku", "ean"),
+        Index("ix_pim_product_variant_ean", "ean"),
+        Index("ix_pim_product_variant_barcode", "barcode"),
     )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
@@ -1,18 +1,23 @@
 from __future__ import annotations
 
+from datetime import date
+
 from sqlalchemy import (
     JSON,
     Boolean,
+    Date,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     Numeric,
     String,
     Text,
     UniqueConstraint,
     func,
+    text,
 )
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
 from app.models.base import TimestampMixin
@@ -20,7 +25,11 @@ from app.models.base import TimestampMixin
 
 class SalesCustomer(Base, TimestampMixin):
     __tablename__ = "sales_customer"
-    __table_args__ = (UniqueConstraint("email", name="uq_sales_customer_email"),)
+    __table_args__ = (
+        UniqueConstraint("email", name="uq_sales_customer_email"),
+        # Order search matches customer e-mail case-insensitively.
+        Index("ix_sales_customer_email_lower", text("lower(email)")),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     customer_type: Mapped[str] = mapped_column(String(16), default="b2c", nullable=False)
@@ -66,7 +75,12 @@ class SalesCustomerTier(Base, TimestampMixin):
 
 class SalesOrder(Base, TimestampMixin):
     __tablename__ = "sales_order"
-    __table_args__ = (UniqueConstraint("company_id", "order_number", name="uq_sales_order_company_number"),)
+    __table_args__ = (
+        UniqueConstraint("company_id", "order_number", name="uq_sales_order_company_number"),
+        Index("ix_sales_order_order_number", "order_number"),
+        Index("ix_sales_order_external_order_id", "external_order_id"),
+        Index("ix_sales_order_customer_id", "customer_id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     company_id: Mapped[int] = mapped_column(ForeignKey("core_company.id"), nullable=False)
@@ -88,10 +102,24 @@ class SalesOrder(Base, TimestampMixin):
     packed_at: Mapped[str | None] = mapped_column(DateTime(timezone=True))
     shipped_at: Mapped[str | None] = mapped_column(DateTime(timezone=True))
     delivered_at: Mapped[str | None] = mapped_column(DateTime(timezone=True))
+    # Whether the order's lines are currently counted in sales_daily_rollup (see app.services.sales_rollup).
+    in_sales_rollup: Mapped[bool] = mapped_column(Boolean, default=False, server_default="false", nullable=False)
+
+    customer: Mapped[SalesCustomer | None] = relationship()
+    lines: Mapped[list["SalesOrderLine"]] = relationship(
+        back_populates="order", cascade="all, delete-orphan", order_by="SalesOrderLine.id"
+    )
+    events: Mapped[list["SalesOrderEvent"]] = relationship(
+        back_populates="order", cascade="all, delete-orphan", order_by="SalesOrderEvent.id"
+    )
 
 
 class SalesOrderLine(Base, TimestampMixin):
     __tablename__ = "sales_order_line"
+    __table_args__ = (
+        Index("ix_sales_order_line_order_id", "order_id"),
+        Index("ix_sales_order_line_sku_snapshot", "sku_snapshot"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     order_id: Mapped[int] = mapped_column(ForeignKey("sales_order.id"), nullable=False)
@@ -107,9 +135,12 @@ class SalesOrderLine(Base, TimestampMixin):
     picked_qty: Mapped[float] = mapped_column(Numeric(12, 2), default=0, nullable=False)
     shipped_qty: Mapped[float] = mapped_column(Numeric(12, 2), default=0, nullable=False)
 
+    order: Mapped[SalesOrder] = relationship(back_populates="lines")
+
 
 class SalesOrderEvent(Base):
     __tablename__ = "sales_order_event"
+    __table_args__ = (Index("ix_sales_order_event_order_id", "order_id"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     order_id: Mapped[int] = mapped_column(ForeignKey("sales_order.id"), nullable=False)
@@ -118,6 +149,8 @@ class SalesOrderEvent(Base):
     created_by: Mapped[int | None] = mapped_column(ForeignKey("core_user.id"))
     created_at: Mapped[str] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
+    order: Mapped[SalesOrder] = relationship(back_populates="events")
+
 
 class SalesShipment(Base, TimestampMixin):
     __tablename__ = "sales_shipment"
@@ -182,3 +215,17 @@ class SalesRefund(Base, TimestampMixin):
     reason: Mapped[str | None] = mapped_column(Text)
     status: Mapped[str] = mapped_column(String(32), default="requested", nullable=False)
     processed_at: Mapped[str | None] = mapped_column(DateTime(timezone=True))
+
+
+class SalesDailyRollup(Base):
+    """Units and revenue sold per (day, channel, variant), maintained incrementally from orders."""
+
+    __tablename__ = "sales_daily_rollup"
+    __table_args__ = (Index("ix_sales_daily_rollup_variant_date", "variant_id", "sales_date"),)
+
+    sales_date: Mapped[date] = mapped_column(Date, primary_key=True)
+    channel_type: Mapped[str] = mapped_column(String(32), primary_key=True)
+    variant_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    units: Mapped[float] = mapped_column(Numeric(14, 2), default=0, nullable=False)
+    revenue: Mapped[float] = mapped_column(Numeric(14, 2), default=0, nullable=False)
+    order_lines: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
@@ -12,3 +12,5 @@ class DashboardKpiResponse(BaseModel):
     low_stock_alerts_open: int
     stock_value_fifo: float
     stock_value_wac: float
+    units_sold_7d: float
+    units_sold_30d: float
@@ -33,6 +33,8 @@ class StockMovementCreate(BaseModel):
     reason_code: str | None = None
     source_doc_type: str | None = None
     source_doc_id: str | None = None
+    # Inbound adjustments only; defaults to the current WAC or latest PO cost.
+    unit_cost: Decimal | None = None
 
 
 class StockMovementResponse(ORMModel):
@@ -74,6 +74,10 @@ class ProductResponse(ORMModel):
     variant_count: int = 0
 
 
+class ProductSearchHit(ProductResponse):
+    score: float
+
+
 class ProductVariantResponse(ORMModel):
     id: int
     product_id: int
@@ -83,6 +87,15 @@ class ProductVariantResponse(ORMModel):
     active: bool
 
 
+class BarcodeLookupResponse(BaseModel):
+    code: str
+    variant_id: int
+    product_id: int
+    sku: str
+    source: str
+    pack_indicator: int | None = None
+
+
 class ProductMediaCreate(BaseModel):
     company_id: int
     product_id: int | None = None
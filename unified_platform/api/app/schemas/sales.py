@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+from datetime import datetime
 from decimal import Decimal
+from typing import Literal
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from app.schemas.common import ORMModel
 
@@ -76,12 +78,130 @@ class SalesOrderResponse(ORMModel):
     customer_id: int | None = None
 
 
+class SalesOrderLineResponse(ORMModel):
+    id: int
+    variant_id: int | None = None
+    sku_snapshot: str | None = None
+    name_snapshot: str
+    quantity: Decimal
+    unit_price: Decimal
+    discount: Decimal
+    line_total: Decimal
+    reserved_qty: Decimal
+    picked_qty: Decimal
+    shipped_qty: Decimal
+
+
+class SalesOrderEventResponse(ORMModel):
+    id: int
+    event_type: str
+    payload: dict | None = None
+    created_by: int | None = None
+    created_at: datetime
+
+
+class SalesOrderListItem(SalesOrderResponse):
+    external_order_id: str | None = None
+    currency_code: str
+    created_at: datetime
+    customer: CustomerResponse | None = None
+    lines: list[SalesOrderLineResponse]
+
+
+class SalesOrderDetailResponse(SalesOrderListItem):
+    store_connection_id: int | None = None
+    warehouse_location_id: int | None = None
+    subtotal: Decimal
+    tax_total: Decimal
+    shipping_total: Decimal
+    confirmed_at: datetime | None = None
+    picked_at: datetime | None = None
+    packed_at: datetime | None = None
+    shipped_at: datetime | None = None
+    delivered_at: datetime | None = None
+    events: list[SalesOrderEventResponse]
+
+
 class OrderLifecycleAction(BaseModel):
     note: str | None = None
     tracking_number: str | None = None
     carrier_name: str | None = None
 
 
+class OrderBulkTransitionRequest(BaseModel):
+    action: Literal["pick", "pack", "ship"]
+    order_ids: list[int] = Field(min_length=1, max_length=1000)
+    note: str | None = None
+    carrier_name: str | None = None
+
+
+class OrderTransitionOutcome(BaseModel):
+    order_id: int
+    ok: bool
+    status: str | None = None
+    error: str | None = None
+
+
+class OrderBulkTransitionResponse(BaseModel):
+    succeeded: int
+    failed: int
+    results: list[OrderTransitionOutcome]
+
+
+class WavePlanRequest(BaseModel):
+    order_ids: list[int] = Field(min_length=1, max_length=1000)
+    put_wall_size: int | None = Field(default=None, ge=1)
+    # Move the planned orders to `picking` in the same transaction.
+    start_picking: bool = False
+
+
+class WaveSlot(BaseModel):
+    order_id: int
+    slot: int
+
+
+class WavePut(BaseModel):
+    slot: int
+    qty: Decimal
+
+
+class WavePick(BaseModel):
+    sequence: int
+    location_id: int
+    location_code: str
+    variant_id: int
+    sku: str | None = None
+    lot_id: int | None = None
+    qty: Decimal
+    puts: list[WavePut]
+
+
+class WaveShortage(BaseModel):
+    order_id: int
+    variant_id: int
+    sku: str | None = None
+    qty: Decimal
+
+
+class WavePlanResponse(BaseModel):
+    slots: list[WaveSlot]
+    picks: list[WavePick]
+    shortages: list[WaveShortage]
+    # Requested orders that are not in a pickable status.
+    rejected_order_ids: list[int]
+
+
+class VelocityWindow(BaseModel):
+    days: int
+    units: float
+    per_day: float
+
+
+class VariantVelocity(BaseModel):
+    variant_id: int
+    windows: list[VelocityWindow]
+
+
 class ReturnCreate(BaseModel):
     reason: str | None = None
     return_number: str | None = None
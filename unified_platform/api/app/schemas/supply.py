@@ -1,11 +1,18 @@
 from __future__ import annotations
 
+from datetime import datetime
 from decimal import Decimal
+from typing import Literal
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from app.schemas.common import ORMModel
 
+# What a receiving scan found. ok/match/matched count one unit towards the scan's line
+# (app.services.receipt.RECEIVED_SCAN_RESULTS); case_gtin is set by the server for
+# case barcodes, which cannot be counted as units.
+ScanResult = Literal["ok", "match", "matched", "mismatch", "unknown", "damaged", "duplicate", "case_gtin"]
+
 
 class SupplierCreate(BaseModel):
     legal_name: str
@@ -78,10 +85,43 @@ class ShipmentScanRequest(BaseModel):
     shipment_line_id: int | None = None
     scanned_code: str
     code_type: str
-    scan_result: str
+    scan_result: ScanResult
     device_id: str | None = None
 
 
+class ShipmentScanBatchItem(BaseModel):
+    client_seq: int
+    shipment_line_id: int | None = None
+    scanned_code: str
+    code_type: str
+    scan_result: ScanResult
+    scanned_at: datetime | None = None
+
+
+class ShipmentScanBatchRequest(BaseModel):
+    device_id: str = Field(min_length=1, max_length=128)
+    scans: list[ShipmentScanBatchItem] = Field(min_length=1, max_length=5000)
+
+
+class ShipmentScanBatchResponse(BaseModel):
+    accepted: int
+    duplicates: int
+    # Highest client_seq the device may drop from its buffer.
+    acked_through: int
+
+
+class AsnImportError(BaseModel):
+    row: int
+    error: str
+
+
+class AsnImportResponse(BaseModel):
+    imported: int
+    error_count: int
+    # The first MAX_REPORTED_ERRORS row errors.
+    errors: list[AsnImportError]
+
+
 class ShipmentDiscrepancyCreate(BaseModel):
     shipment_line_id: int | None = None
     issue_type: str
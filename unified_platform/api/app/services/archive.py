@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import gzip
+import os
+from datetime import UTC, datetime
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.db.partitions import PARTITIONED_TABLES, MonthPartition, add_months, list_month_partitions, month_start
+
+# Partitions still holding rows that match these predicates are kept attached.
+ARCHIVE_GUARDS: dict[str, str] = {
+    "int_sync_queue": "status = 'pending'",
+}
+
+
+def expired_partitions(db: Session, *, retention_months: int) -> list[tuple[str, MonthPartition]]:
+    """Monthly partitions whose whole range is older than the retention window, oldest first."""
+    cutoff = add_months(month_start(datetime.now(UTC)), -retention_months)
+    conn = db.connection()
+    return [
+        (table, partition)
+        for table in PARTITIONED_TABLES
+        for partition in list_month_partitions(conn, table)
+        if partition.end <= cutoff
+    ]
+
+
+def archive_partition(db: Session, table: str, partition: MonthPartition, archive_dir: Path) -> Path | None:
+    """
+    Detach one partition, COPY it to <archive_dir>/<table>/<partition>.csv.gz and drop it.
+    Returns None when a guard keeps the partition attached. The caller commits; until then
+    the detach and drop roll back together if anything fails.
+    """
+    guard = ARCHIVE_GUARDS.get(table)
+    if guard and db.scalar(text(f"SELECT 1 FROM {partition.name} WHERE {guard} LIMIT 1")):
+        return None
+
+    db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {partition.name}"))
+
+    target = archive_dir / table / f"{partition.name}.csv.gz"
+    target.parent.mkdir(parents=True, exist_ok=True)
+    partial = target.with_name(target.name + ".partial")
+    raw = db.connection().connection.driver_connection
+    with gzip.open(partial, "wb") as out, raw.cursor() as cursor:
+        with cursor.copy(f"COPY {partition.name} TO STDOUT WITH (FORMAT csv, HEADER)") as copy:
+            for chunk in copy:
+                out.write(chunk)
+    os.replace(partial, target)
+
+    db.execute(text(f"DROP TABLE {partition.name}"))
+    return target
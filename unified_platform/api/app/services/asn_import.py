@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import csv
+import json
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.models.inventory import InvInboundShipment, InvInboundShipmentLine
+from app.models.procurement import ProcPurchaseOrderLine
+from app.services.barcode import barcode_index
+
+# Rows are resolved and inserted in batches of this size while the upload streams in;
+# it also bounds the bind parameters of the bulk code lookup.
+ASN_BATCH_SIZE = 1000
+# Only the first errors are returned in full; the count covers all of them.
+MAX_REPORTED_ERRORS = 500
+
+_CODE_COLUMNS = ("code", "sku", "ean", "gtin", "barcode")
+_QTY_COLUMNS = ("expected_qty", "qty", "quantity")
+
+
+class AsnRowError(ValueError):
+    def __init__(self, row: int, message: str) -> None:
+        super().__init__(message)
+        self.row = row
+
+
+@dataclass(slots=True)
+class AsnRow:
+    row: int
+    code: str
+    expected_qty: Decimal
+    po_line_id: int | None = None
+
+
+@dataclass(slots=True)
+class AsnImportResult:
+    imported: int = 0
+    error_count: int = 0
+    errors: list[dict] = field(default_factory=list)
+
+    def add_error(self, row: int, message: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "error": message})
+
+
+def _first(record: dict, columns: tuple[str, ...]) -> object | None:
+    for column in columns:
+        value = record.get(column)
+        if value is not None and str(value).strip() != "":
+            return value
+    return None
+
+
+def parse_record(row: int, record: dict) -> AsnRow:
+    """One ASN row from a CSV or JSON record: a code column, a quantity and an optional po_line_id."""
+    code = _first(record, _CODE_COLUMNS)
+    if code is None:
+        raise AsnRowError(row, f"missing code (one of {', '.join(_CODE_COLUMNS)})")
+    raw_qty = _first(record, _QTY_COLUMNS)
+    try:
+        qty = Decimal(str(raw_qty).replace(",", ".").strip()) if raw_qty is not None else None
+    except InvalidOperation:
+        qty = None
+    if qty is None or not qty.is_finite() or qty <= 0:
+        raise AsnRowError(row, f"invalid quantity {raw_qty!r}")
+    po_line_id = record.get("po_line_id")
+    if po_line_id is not None and str(po_line_id).strip() != "":
+        try:
+            po_line_id = int(po_line_id)
+        except (TypeError, ValueError):
+            raise AsnRowError(row, f"invalid po_line_id {po_line_id!r}") from None
+    else:
+        po_line_id = None
+    return AsnRow(row, str(code).strip(), qty, po_line_id)
+
+
+class AsnParser:
+    """
+    Line-at-a-time parser for streamed uploads. CSV needs a header row and may use
+    ',' or ';' as separator; JSON lines are one object per line. Rows are numbered
+    from 1 by line, the CSV header included.
+    """
+
+    def __init__(self, fmt: str) -> None:
+        self.fmt = fmt
+        self.line_no = 0
+        self.header: list[str] | None = None
+        self.delimiter = ","
+
+    def parse(self, line: str) -> AsnRow | None:
+        """The row on this line, None for blank and header lines; raises AsnRowError."""
+        self.line_no += 1
+        line = line.rstrip("\r\n")
+        if not line.strip():
+            return None
+        if self.fmt == "jsonl":
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as exc:
+                raise AsnRowError(self.line_no, f"invalid JSON: {exc.msg}") from None
+            if not isinstance(record, dict):
+                raise AsnRowError(self.line_no, "expected a JSON object")
+            return parse_record(self.line_no, record)
+        if self.header is None:
+            self.delimiter = ";" if line.count(";") > line.count(",") else ","
+            self.header = [column.strip().lower() for column in next(csv.reader([line], delimiter=self.delimiter))]
+            return None
+        values = next(csv.reader([line], delimiter=self.delimiter))
+        return parse_record(self.line_no, dict(zip(self.header, values)))
+
+
+class AsnImporter:
+    """Resolves codes to variants in bulk and inserts one batch of shipment lines per call."""
+
+    def __init__(self, db: Session, shipment: InvInboundShipment) -> None:
+        self.shipment_id = shipment.id
+        self.po_lines: dict[int, int] = {}  # po_line_id -> variant_id
+        self.po_line_by_variant: dict[int, int] = {}
+        if shipment.po_id is not None:
+            for line_id, variant_id in db.execute(
+                select(ProcPurchaseOrderLine.id, ProcPurchaseOrderLine.variant_id)
+                .where(ProcPurchaseOrderLine.po_id == shipment.po_id)
+                .order_by(ProcPurchaseOrderLine.id.desc())
+            ):
+                self.po_lines[line_id] = variant_id
+                self.po_line_by_variant[variant_id] = line_id  # first PO line per variant wins
+
+    def write_batch(self, db: Session, rows: list[AsnRow], result: AsnImportResult) -> None:
+        if not rows:
+            return
+        matches = barcode_index.lookup_many(db, [row.code for row in rows])
+        now = datetime.now(UTC)
+        values: list[dict] = []
+        for row in rows:
+            match = matches.get(row.code)
+            if match is None:
+                result.add_error(row.row, f"unknown SKU/EAN {row.code!r}")
+                continue
+            if match.pack_indicator is not None:
+                # The PIM has no pack sizes, so a case GTIN cannot be turned into units.
+                result.add_error(row.row, f"{row.code!r} is a case GTIN; announce the consumer-unit EAN instead")
+                continue
+            po_line_id = row.po_line_id
+            if po_line_id is not None and self.po_lines.get(po_line_id) != match.variant_id:
+                result.add_error(row.row, f"po_line_id {po_line_id} is not a line for {row.code!r} on this shipment's PO")
+                continue
+            if po_line_id is None:
+                po_line_id = self.po_line_by_variant.get(match.variant_id)
+            values.append(
+                {
+                    "shipment_id": self.shipment_id,
+                    "po_line_id": po_line_id,
+                    "variant_id": match.variant_id,
+                    "expected_qty": row.expected_qty,
+                    "received_qty": Decimal("0"),
+                    "discrepancy_qty": Decimal("0"),
+                    "created_at": now,
+                    "updated_at": now,
+                }
+            )
+        if values:
+            db.execute(insert(InvInboundShipmentLine), values)
+            result.imported += len(values)
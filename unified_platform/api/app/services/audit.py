@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from datetime import UTC, datetime
 
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.models.core import CoreAuditEvent
@@ -9,7 +10,7 @@ from app.models.integration import IntOutboxEvent
 
 
 def log_audit_event(
-    db: Session,
+    db: Session | AsyncSession,
     *,
     actor_user_id: int | None,
     entity_type: str,
@@ -35,7 +36,7 @@ def log_audit_event(
 
 
 def enqueue_outbox_event(
-    db: Session,
+    db: Session | AsyncSession,
     *,
     event_name: str,
     aggregate_type: str,
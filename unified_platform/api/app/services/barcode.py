@@ -0,0 +1,293 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass, replace
+from typing import NamedTuple
+
+from sqlalchemy import Row, or_, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.pim import PimProduct, PimProductVariant
+from app.services.outbox_follower import CATALOG_EVENT, PRODUCT_EVENT, OutboxFollower, outbox_end
+
+logger = logging.getLogger(__name__)
+
+GTIN_LENGTHS = (8, 12, 13, 14)
+
+
+def gtin_check_digit(body: str) -> int:
+    """GS1 mod-10 check digit for the digits preceding it."""
+    total = sum(int(digit) * (3 if index % 2 == 0 else 1) for index, digit in enumerate(reversed(body)))
+    return (10 - total % 10) % 10
+
+
+def normalize_gtin(code: str) -> str | None:
+    """EAN-8, UPC-A, EAN-13 or GTIN-14 with a valid check digit as a zero-padded GTIN-14, else None."""
+    code = code.strip()
+    if len(code) not in GTIN_LENGTHS or not code.isdigit():
+        return None
+    if gtin_check_digit(code[:-1]) != int(code[-1]):
+        return None
+    return code.zfill(14)
+
+
+def pack_base(gtin14: str) -> tuple[str, int] | None:
+    """
+    Consumer-unit GTIN and indicator digit for a case/pack GTIN-14 (indicator 1-8),
+    so a carton barcode resolves to the variant it contains.
+    """
+    indicator = gtin14[0]
+    if indicator not in "12345678":
+        return None
+    body = "0" + gtin14[1:13]
+    return body + str(gtin_check_digit(body)), int(indicator)
+
+
+def normalize_code(code: str) -> str:
+    """Index key for a scanned or stored code: GTIN-14 for valid GTINs, else the upper-cased code."""
+    return normalize_gtin(code) or code.strip().upper()
+
+
+def _stored_forms(key: str) -> list[str]:
+    """The ways a normalized code may have been stored: GTIN-14 key -> 14/13/12/8-digit forms."""
+    if not (len(key) == 14 and key.isdigit()):
+        return [key]
+    return [key[-length:] for length in GTIN_LENGTHS if not key[: 14 - length].strip("0")]
+
+
+@dataclass(frozen=True, slots=True)
+class BarcodeMatch:
+    variant_id: int
+    product_id: int
+    sku: str
+    source: str  # variant_ean | variant_barcode | product_ean | product_gtin14 | sku
+    pack_indicator: int | None = None
+
+
+class CodeRow(NamedTuple):
+    variant_id: int
+    product_id: int
+    sku: str
+    variant_ean: str | None
+    variant_barcode: str | None
+    product_ean: str | None
+    product_gtin14: str | None
+
+
+def index_entries(rows: Iterable[CodeRow]) -> list[tuple[str, BarcodeMatch]]:
+    """
+    Index keys for active variants, strongest source first. Product-level EAN/GTIN-14
+    only name a variant when the product has exactly one.
+    """
+    rows = list(rows)
+    per_product: dict[int, int] = defaultdict(int)
+    for row in rows:
+        per_product[row.product_id] += 1
+
+    ranked: list[tuple[int, str, BarcodeMatch]] = []
+    for row in rows:
+        sources = [("variant_ean", row.variant_ean), ("variant_barcode", row.variant_barcode)]
+        if per_product[row.product_id] == 1:
+            sources += [("product_ean", row.product_ean), ("product_gtin14", row.product_gtin14)]
+        sources.append(("sku", row.sku))
+        for rank, (source, code) in enumerate(sources):
+            if code and code.strip():
+                ranked.append((rank, normalize_code(code), BarcodeMatch(row.variant_id, row.product_id, row.sku, source)))
+    ranked.sort(key=lambda item: item[0])
+    return [(key, match) for _, key, match in ranked]
+
+
+def _code_rows(db: Session, *conditions) -> list[CodeRow]:
+    stmt = (
+        select(
+            PimProductVariant.id,
+            PimProductVariant.product_id,
+            PimProductVariant.sku,
+            PimProductVariant.ean,
+            PimProductVariant.barcode,
+            PimProduct.ean,
+            PimProduct.gtin14,
+        )
+        .join(PimProduct, PimProduct.id == PimProductVariant.product_id)
+        .where(PimProductVariant.active.is_(True), *conditions)
+    )
+    return [CodeRow(*row) for row in db.execute(stmt)]
+
+
+class BarcodeIndex:
+    """
+    Per-process code -> variant map for scanner lookups.
+    Warmed at startup, kept current by following `product.updated` outbox events (a
+    `catalog.imported` event reloads everything) and a periodic full reload; a miss falls
+    back to an indexed database lookup and caches it.
+    """
+
+    def __init__(self) -> None:
+        self._codes: dict[str, BarcodeMatch] = {}
+        self._keys_by_product: dict[int, set[str]] = defaultdict(set)
+        self._lock = threading.Lock()
+        self._outbox = OutboxFollower((PRODUCT_EVENT, CATALOG_EVENT))
+        self._task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def resolve(self, code: str) -> BarcodeMatch | None:
+        """In-memory lookup only; also resolves case/pack GTIN-14s to their consumer unit."""
+        key = normalize_code(code)
+        match = self._codes.get(key)
+        if match is not None:
+            return match
+        base = pack_base(key) if len(key) == 14 and key.isdigit() else None
+        if base is not None and (match := self._codes.get(base[0])) is not None:
+            return replace(match, pack_indicator=base[1])
+        return None
+
+    def lookup(self, db: Session, code: str) -> BarcodeMatch | None:
+        """resolve() with a database fallback for codes the index has not seen yet."""
+        return self.lookup_many(db, [code]).get(code)
+
+    def lookup_many(self, db: Session, codes: Iterable[str]) -> dict[str, BarcodeMatch]:
+        """Bulk lookup: in-memory first, then one database query for all misses. Unknown codes are omitted."""
+        found: dict[str, BarcodeMatch] = {}
+        forms: set[str] = set()
+        misses: list[str] = []
+        for code in set(codes):
+            match = self.resolve(code)
+            if match is not None:
+                found[code] = match
+                continue
+            misses.append(code)
+            key = normalize_code(code)
+            forms.update(_stored_forms(key))
+            base = pack_base(key) if len(key) == 14 and key.isdigit() else None
+            if base is not None:
+                forms.update(_stored_forms(base[0]))
+            forms.add(code.strip())
+        if not misses:
+            return found
+        product_ids = db.scalars(
+            select(PimProductVariant.product_id)
+            .join(PimProduct, PimProduct.id == PimProductVariant.product_id)
+            .where(
+                or_(
+                    PimProductVariant.ean.in_(forms),
+                    PimProductVariant.barcode.in_(forms),
+                    PimProductVariant.sku.in_(forms),
+                    PimProduct.ean.in_(forms),
+                    PimProduct.gtin14.in_(forms),
+                )
+            )
+            .distinct()
+        ).all()
+        if product_ids:
+            self.refresh_products(db, product_ids)
+            for code in misses:
+                match = self.resolve(code)
+                if match is not None:
+                    found[code] = match
+        return found
+
+    def load(self, db: Session) -> None:
+        """Rebuild the whole index and start following the outbox from its current end."""
+        cursor = outbox_end(db)
+        codes: dict[str, BarcodeMatch] = {}
+        keys_by_product: dict[int, set[str]] = defaultdict(set)
+        for key, match in index_entries(_code_rows(db)):
+            if codes.setdefault(key, match) is match:
+                keys_by_product[match.product_id].add(key)
+        with self._lock:
+            self._codes = codes
+            self._keys_by_product = keys_by_product
+        self._outbox.reset(max(self._outbox.cursor or 0, cursor))
+        logger.info("Barcode index loaded with %d codes", len(codes))
+
+    def refresh_products(self, db: Session, product_ids: Iterable[int]) -> None:
+        """Re-read the codes of the given products, dropping the ones they no longer carry."""
+        product_ids = set(product_ids)
+        if not product_ids:
+            return
+        entries = index_entries(_code_rows(db, PimProductVariant.product_id.in_(product_ids)))
+        with self._lock:
+            codes = dict(self._codes)
+            for product_id in product_ids:
+                for key in self._keys_by_product.pop(product_id, set()):
+                    if codes.get(key) is not None and codes[key].product_id == product_id:
+                        del codes[key]
+            for key, match in entries:
+                if codes.setdefault(key, match) is match:
+                    self._keys_by_product[match.product_id].add(key)
+            self._codes = codes
+
+    def follow_outbox(self, db: Session, *, batch_size: int = 1000) -> int:
+        """Apply product events written since the last call; returns how many products were refreshed.
+
+        Before the first load, or on a catalogue import, the whole index is rebuilt instead.
+        """
+        if self._outbox.cursor is None:
+            self.load(db)
+            return len(self._keys_by_product)
+        refreshed = 0
+
+        def apply(events: list[Row]) -> None:
+            nonlocal refreshed
+            if any(event.event_name == CATALOG_EVENT for event in events):
+                self.load(db)
+                refreshed = len(self._keys_by_product)
+                return
+            product_ids = {
+                int(event.payload["product_id"]) for event in events if event.payload.get("product_id") is not None
+            }
+            self.refresh_products(db, product_ids)
+            refreshed = len(product_ids)
+
+        self._outbox.follow(db, apply, batch_size=batch_size)
+        return refreshed
+
+    async def start(self) -> None:
+        """Warm the index, then keep it current in the background; a failed warm-up is retried there."""
+        try:
+            await asyncio.to_thread(self._with_session, self.load)
+            warmed = True
+        except SQLAlchemyError as exc:
+            logger.warning("Barcode index not warmed, scans resolve from the database until it is: %s", exc)
+            warmed = False
+        self._task = asyncio.create_task(self._run(reload_first=not warmed))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self, *, reload_first: bool) -> None:
+        loop = asyncio.get_running_loop()
+        next_reload = loop.time() + (0 if reload_first else settings.barcode_index_reload_seconds)
+        while True:
+            await asyncio.sleep(settings.barcode_index_poll_seconds)
+            try:
+                if loop.time() >= next_reload:
+                    await asyncio.to_thread(self._with_session, self.load)
+                    next_reload = loop.time() + settings.barcode_index_reload_seconds
+                else:
+                    await asyncio.to_thread(self._with_session, self.follow_outbox)
+            except SQLAlchemyError as exc:
+                logger.warning("Barcode index refresh failed: %s", exc)
+
+    @staticmethod
+    def _with_session(fn) -> None:
+        db = SessionLocal()
+        try:
+            fn(db)
+        finally:
+            db.close()
+
+
+barcode_index = BarcodeIndex()
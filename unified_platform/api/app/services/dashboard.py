@@ -5,11 +5,12 @@ from decimal import Decimal
 from sqlalchemy import Select, func, select
 from sqlalchemy.orm import Session
 
-from app.models.inventory import InvInboundShipment, InvStockAlert, InvValuationLayer
+from app.models.inventory import InvInboundShipment, InvStockAlert, InvValuationSummary
 from app.models.mdm import MdmPartner
 from app.models.pim import PimProduct, PimProductVariant
 from app.models.procurement import ProcPurchaseOrder
 from app.schemas.dashboard import DashboardKpiResponse
+from app.services.sales_rollup import total_units
 
 
 def scalar_int(db: Session, stmt: Select) -> int:
@@ -39,8 +40,10 @@ def get_dashboard_kpis(db: Session) -> DashboardKpiResponse:
     low_stock_alerts_open = scalar_int(
         db, select(func.count(InvStockAlert.id)).where(InvStockAlert.alert_type == "low_stock", InvStockAlert.status == "open")
     )
-    stock_value_fifo = scalar_float(db, select(func.sum(InvValuationLayer.remaining_cost)).where(InvValuationLayer.method == "fifo"))
-    stock_value_wac = scalar_float(db, select(func.sum(InvValuationLayer.remaining_cost)).where(InvValuationLayer.method == "wac"))
+    stock_value_fifo = scalar_float(db, select(func.sum(InvValuationSummary.fifo_value)))
+    stock_value_wac = scalar_float(db, select(func.sum(InvValuationSummary.wac_value)))
+    units_sold_7d = total_units(db, 7)
+    units_sold_30d = total_units(db, 30)
 
     return DashboardKpiResponse(
         products_total=products_total,
@@ -51,4 +54,6 @@ def get_dashboard_kpis(db: Session) -> DashboardKpiResponse:
         low_stock_alerts_open=low_stock_alerts_open,
         stock_value_fifo=stock_value_fifo,
         stock_value_wac=stock_value_wac,
+        units_sold_7d=units_sold_7d,
+        units_sold_30d=units_sold_30d,
     )
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from sqlalchemy import func, select, union
+from sqlalchemy.orm import Session, raiseload, selectinload
+
+from app.models.sales import SalesCustomer, SalesOrder, SalesOrderLine
+
+
+def matching_order_ids(q: str):
+    """Ids of orders whose number, external id, customer e-mail or a line SKU equals q.
+
+    One indexed lookup per field, combined with UNION so each branch keeps its index.
+    """
+    term = q.strip()
+    return union(
+        select(SalesOrder.id).where(SalesOrder.order_number == term),
+        select(SalesOrder.id).where(SalesOrder.external_order_id == term),
+        select(SalesOrder.id)
+        .join(SalesCustomer, SalesCustomer.id == SalesOrder.customer_id)
+        .where(func.lower(SalesCustomer.email) == term.lower()),
+        select(SalesOrderLine.order_id).where(SalesOrderLine.sku_snapshot == term),
+    )
+
+
+def search_orders(
+    db: Session,
+    *,
+    q: str | None = None,
+    status: str | None = None,
+    limit: int = 100,
+    offset: int = 0,
+) -> list[SalesOrder]:
+    """Newest orders first with lines and customer loaded: three queries whatever the page size."""
+    stmt = (
+        select(SalesOrder)
+        .options(selectinload(SalesOrder.lines), selectinload(SalesOrder.customer), raiseload("*"))
+        .order_by(SalesOrder.id.desc())
+        .limit(limit)
+        .offset(offset)
+    )
+    if q and q.strip():
+        stmt = stmt.where(SalesOrder.id.in_(matching_order_ids(q)))
+    if status:
+        stmt = stmt.where(SalesOrder.status == status)
+    return list(db.scalars(stmt))
+
+
+def get_order_detail(db: Session, order_id: int) -> SalesOrder | None:
+    """One order with its lines, events and customer, loaded up front."""
+    return db.scalar(
+        select(SalesOrder)
+        .where(SalesOrder.id == order_id)
+        .options(
+            selectinload(SalesOrder.lines),
+            selectinload(SalesOrder.events),
+            selectinload(SalesOrder.customer),
+            raiseload("*"),
+        )
+    )
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from decimal import Decimal
+
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.models.core import CoreAuditEvent
+from app.models.sales import SalesOrder, SalesOrderEvent, SalesOrderLine, SalesShipment
+from app.services.reservation import consume_orders, enqueue_stock_pushes
+from app.services.sales_rollup import sync_sales_rollup
+
+
+@dataclass(frozen=True, slots=True)
+class Transition:
+    to_status: str
+    event_type: str
+    timestamp_column: str
+    from_statuses: frozenset[str]
+
+
+# Warehouse wave actions and the statuses each may start from. Woo's
+# processing / on-hold orders are already reserved and can be picked directly.
+WAVE_TRANSITIONS: dict[str, Transition] = {
+    "pick": Transition("picking", "picked", "picked_at", frozenset({"confirmed", "processing", "on-hold"})),
+    "pack": Transition("packed", "packed", "packed_at", frozenset({"picking"})),
+    "ship": Transition("shipped", "shipped", "shipped_at", frozenset({"packed"})),
+}
+
+
+def plan_transitions(
+    current: dict[int, str], order_ids: list[int], transition: Transition
+) -> tuple[list[int], list[dict]]:
+    """Split the requested orders into the ones allowed to move and per-order outcomes, in request order."""
+    allowed: list[int] = []
+    outcomes: list[dict] = []
+    for order_id in dict.fromkeys(order_ids):
+        status = current.get(order_id)
+        if status is None:
+            outcomes.append({"order_id": order_id, "ok": False, "status": None, "error": "not_found"})
+        elif status not in transition.from_statuses:
+            outcomes.append({"order_id": order_id, "ok": False, "status": status, "error": f"{status} -> {transition.to_status} not allowed"})
+        else:
+            allowed.append(order_id)
+            outcomes.append({"order_id": order_id, "ok": True, "status": transition.to_status, "error": None})
+    return allowed, outcomes
+
+
+def _record_picks(db: Session, order_ids: list[int], short: dict[tuple[int, int], Decimal]) -> None:
+    """Set picked_qty on the stock lines of picked orders: the full quantity, less what
+    the pick was short of for that (order, variant), taken off its last lines first."""
+    lines = SalesOrderLine.__table__
+    left = dict(short)
+    updates = []
+    for line_id, order_id, variant_id, quantity in db.execute(
+        select(lines.c.id, lines.c.order_id, lines.c.variant_id, lines.c.quantity)
+        .where(lines.c.order_id.in_(order_ids), lines.c.variant_id.is_not(None))
+        .order_by(lines.c.id.desc())
+    ):
+        missing = min(left.get((order_id, variant_id), Decimal("0")), Decimal(quantity))
+        if missing:
+            left[(order_id, variant_id)] -= missing
+        updates.append({"l_id": line_id, "l_qty": Decimal(quantity) - missing})
+    if updates:
+        db.execute(update(lines).where(lines.c.id == bindparam("l_id")).values(picked_qty=bindparam("l_qty")), updates)
+
+
+def transition_orders(
+    db: Session,
+    order_ids: list[int],
+    action: str,
+    *,
+    user_id: int | None,
+    payload: dict | None = None,
+    short: dict[tuple[int, int], Decimal] | None = None,
+) -> list[dict]:
+    """Move many orders through one wave step with set-based writes; the caller commits.
+
+    The orders are locked, checked against WAVE_TRANSITIONS, updated with one UPDATE,
+    and their events and audit rows are bulk-inserted. Picking records picked_qty on
+    the lines, less the (order_id, variant_id) quantities in `short` that the wave could
+    not allocate. Shipping also consumes stock and opens one SalesShipment per order.
+    The sales rollup is synced for the moved orders, as for a single status change.
+    """
+    transition = WAVE_TRANSITIONS[action]
+    current = dict(
+        db.execute(
+            select(SalesOrder.id, SalesOrder.status)
+            .where(SalesOrder.id.in_(order_ids))
+            .order_by(SalesOrder.id)
+            .with_for_update()
+        ).all()
+    )
+    allowed, outcomes = plan_transitions(current, order_ids, transition)
+    if not allowed:
+        return outcomes
+
+    now = datetime.now(UTC)
+    db.execute(
+        update(SalesOrder)
+        .where(SalesOrder.id.in_(allowed))
+        .values({"status": transition.to_status, transition.timestamp_column: now, "updated_at": now})
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(
+        insert(SalesOrderEvent),
+        [
+            {"order_id": order_id, "event_type": transition.event_type, "payload": payload, "created_by": user_id, "created_at": now}
+            for order_id in allowed
+        ],
+    )
+    db.execute(
+        insert(CoreAuditEvent),
+        [
+            {
+                "actor_user_id": user_id,
+                "entity_type": "sales_order",
+                "entity_id": str(order_id),
+                "action": transition.event_type,
+                "before_jsonb": {"status": current[order_id]},
+                "after_jsonb": {"status": transition.to_status},
+                "created_at": now,
+            }
+            for order_id in allowed
+        ],
+    )
+
+    if action == "pick":
+        _record_picks(db, allowed, short or {})
+    if action == "ship":
+        payload = payload or {}
+        stamp = int(now.timestamp())
+        db.execute(
+            insert(SalesShipment),
+            [
+                {
+                    "order_id": order_id,
+                    "shipment_number": f"SHP-{order_id}-{stamp}",
+                    "status": "shipped",
+                    "carrier_name": payload.get("carrier_name"),
+                    "shipped_at": now,
+                }
+                for order_id in allowed
+            ],
+        )
+        enqueue_stock_pushes(db, consume_orders(db, allowed, user_id=user_id))
+    sync_sales_rollup(db, allowed)
+    return outcomes
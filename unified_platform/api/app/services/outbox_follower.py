@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Callable, Iterable
+
+from sqlalchemy import Row, case, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.models.integration import IntOutboxEvent
+
+PRODUCT_EVENT = "product.updated"
+# Bulk catalogue writes (the Woo import) announce themselves with one event instead of one per product.
+CATALOG_EVENT = "catalog.imported"
+
+# An outbox id is taken at insert but only visible at commit, so the cursor can pass an id
+# whose transaction commits later. Skipped ids are re-read for this long before they are
+# taken for rolled back; a transaction open longer than that is left to the follower's
+# own fallback (entry TTL, periodic reload).
+OUTBOX_GAP_SECONDS = 60.0
+
+
+def outbox_end(db: Session) -> int:
+    """Id of the newest visible outbox event, 0 when there is none."""
+    return db.scalar(select(func.coalesce(func.max(IntOutboxEvent.id), 0))) or 0
+
+
+class OutboxFollower:
+    """
+    Per-process cursor over the outbox for caches that apply events to in-memory state.
+    Every event past the cursor is read, whatever its name, so that ids the cursor skips
+    are known and picked up when their transaction commits late. Only events named in
+    `event_names` are handed on, with their payload.
+    """
+
+    def __init__(self, event_names: Iterable[str]) -> None:
+        self.event_names = tuple(event_names)
+        # None until the follower is positioned; callers treat that as "not following yet".
+        self.cursor: int | None = None
+        # Outbox ids below the cursor not seen yet -> when the cursor first passed them.
+        self.gaps: dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def reset(self, cursor: int) -> None:
+        """Continue after `cursor`, e.g. once a full reload has read everything up to it. Skipped ids stay awaited."""
+        with self._lock:
+            self.cursor = cursor
+
+    def follow(self, db: Session, apply: Callable[[list[Row]], None], *, batch_size: int = 1000) -> list[Row]:
+        """Pass the followed events written since the last call to `apply`, then move past them.
+
+        Returns those events. If `apply` raises, the cursor stays put and they are read again.
+        """
+        if self.cursor is None:
+            raise ValueError("Outbox follower has no cursor yet")
+        now = time.monotonic()
+        cursor = self.cursor
+        gaps = {event_id: seen for event_id, seen in self.gaps.items() if now - seen < OUTBOX_GAP_SECONDS}
+        after_cursor = IntOutboxEvent.id > cursor
+        events = db.execute(
+            select(
+                IntOutboxEvent.id,
+                IntOutboxEvent.event_name,
+                case((IntOutboxEvent.event_name.in_(self.event_names), IntOutboxEvent.payload)).label("payload"),
+            )
+            .where(or_(after_cursor, IntOutboxEvent.id.in_(gaps)) if gaps else after_cursor)
+            .order_by(IntOutboxEvent.id.asc())
+            .limit(batch_size)
+        ).all()
+        seen = {event.id for event in events}
+        last = max(seen, default=cursor)
+        for event_id in range(cursor + 1, last):
+            if event_id not in seen:
+                gaps[event_id] = now
+        for event_id in seen:
+            gaps.pop(event_id, None)
+
+        followed = [event for event in events if event.event_name in self.event_names]
+        if followed:
+            apply(followed)
+        with self._lock:
+            # apply() may have reset the cursor past `last` with a full reload.
+            self.cursor = max(self.cursor, last)
+            self.gaps = gaps
+        return followed
@@ -19,6 +19,7 @@ from app.models.pim import (
     PimProductI18n,
     PimProductVariant,
 )
+from app.services.audit import enqueue_outbox_event
 
 logger = logging.getLogger(__name__)
 
@@ -505,6 +506,16 @@ def run_woo_import(
                 break
             page += 1
 
+    if imported or updated:
+        enqueue_outbox_event(
+            db,
+            event_name="catalog.imported",
+            aggregate_type="store_connection",
+            aggregate_id=str(connection_id),
+            payload={"connection_id": connection_id, "imported": imported, "updated": updated},
+        )
+        db.commit()
+
     result = {
         "connection_id": connection_id,
         "company_id": company_id,
@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from collections.abc import Iterable
+
+from sqlalchemy import Row, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal, read_engine
+from app.models.pim import PimBrand, PimPriceListItem, PimProduct, PimProductI18n, PimProductVariant
+from app.services.outbox_follower import CATALOG_EVENT, PRODUCT_EVENT, OutboxFollower, outbox_end
+
+logger = logging.getLogger(__name__)
+
+
+def serialize_products(db: Session, products: list[PimProduct]) -> list[dict]:
+    """ProductResponse payloads for products, in the given order, with four batched queries."""
+    if not products:
+        return []
+
+    product_ids = [product.id for product in products]
+    product_id_set = set(product_ids)
+
+    names: dict[int, str] = {}
+    for translation in db.scalars(
+        select(PimProductI18n)
+        .where(PimProductI18n.product_id.in_(product_ids))
+        .order_by(PimProductI18n.id.asc())
+    ):
+        if translation.product_id in product_id_set and translation.name and translation.product_id not in names:
+            names[translation.product_id] = translation.name
+
+    for translation in db.scalars(
+        select(PimProductI18n).where(
+            PimProductI18n.product_id.in_(product_ids),
+            PimProductI18n.language_code == "sv-SE",
+        )
+    ):
+        if translation.product_id in product_id_set and translation.name:
+            names[translation.product_id] = translation.name
+
+    brand_names: dict[int, str] = {}
+    brand_ids = [product.brand_id for product in products if product.brand_id]
+    if brand_ids:
+        for brand in db.scalars(select(PimBrand).where(PimBrand.id.in_(brand_ids))):
+            brand_names[brand.id] = brand.name
+
+    variant_counts: dict[int, int] = defaultdict(int)
+    variant_to_product: dict[int, int] = {}
+    variant_ids: list[int] = []
+    for variant_id, product_id in db.execute(
+        select(PimProductVariant.id, PimProductVariant.product_id).where(
+            PimProductVariant.product_id.in_(product_ids)
+        )
+    ):
+        variant_to_product[variant_id] = product_id
+        variant_counts[product_id] += 1
+        variant_ids.append(variant_id)
+
+    default_prices: dict[int, object] = {}
+    if variant_ids:
+        for variant_id, unit_price in db.execute(
+            select(PimPriceListItem.variant_id, PimPriceListItem.unit_price)
+            .where(
+                PimPriceListItem.variant_id.in_(variant_ids),
+                PimPriceListItem.min_qty == 1,
+            )
+            .order_by(PimPriceListItem.id.desc())
+        ):
+            product_id = variant_to_product.get(variant_id)
+            if product_id and product_id not in default_prices:
+                default_prices[product_id] = unit_price
+
+    payloads: list[dict] = []
+    for product in products:
+        payloads.append(
+            {
+                "id": product.id,
+                "company_id": product.company_id,
+                "sku": product.sku,
+                "ean": product.ean,
+                "brand_id": product.brand_id,
+                "status": product.status,
+                "product_type": product.product_type,
+                "is_tobacco": product.is_tobacco,
+                "name": names.get(product.id),
+                "brand": brand_names.get(product.brand_id) if product.brand_id else None,
+                "default_price": default_prices.get(product.id),
+                "variant_count": variant_counts.get(product.id, 0),
+            }
+        )
+    return payloads
+
+
+class ProductCache:
+    """
+    Per-process LRU of serialized products keyed by product id.
+    Entries are dropped when a product.updated outbox event names their product,
+    when catalog.imported is seen, or after PRODUCT_CACHE_TTL_SECONDS. Until the
+    outbox cursor is known (before start() reaches the database) reads bypass it.
+    Entries are only filled from the primary: a lagging replica could store a product
+    as it was before an event the cache has already applied.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[int, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by every invalidation; a fill that raced one is not stored.
+        self._generation = 0
+        self._outbox = OutboxFollower((PRODUCT_EVENT, CATALOG_EVENT))
+        self._task: asyncio.Task | None = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_many(self, db: Session, product_ids: Iterable[int]) -> list[dict]:
+        """Payloads for the existing products among product_ids, in that order; misses are loaded in one batch."""
+        product_ids = list(dict.fromkeys(product_ids))
+        found: dict[int, dict] = {}
+        now = time.monotonic()
+        with self._lock:
+            generation = self._generation
+            enabled = self._outbox.cursor is not None
+            if enabled:
+                for product_id in product_ids:
+                    entry = self._entries.get(product_id)
+                    if entry is not None and entry[0] > now:
+                        self._entries.move_to_end(product_id)
+                        found[product_id] = entry[1]
+            self.hits += len(found)
+            self.misses += len(product_ids) - len(found)
+
+        missing = [product_id for product_id in product_ids if product_id not in found]
+        if missing:
+            products = db.scalars(select(PimProduct).where(PimProduct.id.in_(missing))).all()
+            loaded = {payload["id"]: payload for payload in serialize_products(db, list(products))}
+            found.update(loaded)
+            if enabled and db.get_bind() is not read_engine:
+                self._store(loaded, generation)
+        return [dict(found[product_id]) for product_id in product_ids if product_id in found]
+
+    def _store(self, payloads: dict[int, dict], generation: int) -> None:
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            if generation != self._generation:
+                return
+            for product_id, payload in payloads.items():
+                self._entries[product_id] = (expires_at, payload)
+                self._entries.move_to_end(product_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, product_ids: Iterable[int]) -> None:
+        with self._lock:
+            self._generation += 1
+            for product_id in product_ids:
+                if self._entries.pop(product_id, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> dict[str, float | int | None]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "outbox_cursor": self._outbox.cursor,
+                "outbox_gaps": len(self._outbox.gaps),
+            }
+
+    def sync_cursor(self, db: Session) -> None:
+        """Start following the outbox from its current end, dropping anything cached before."""
+        cursor = outbox_end(db)
+        self.clear()
+        self._outbox.reset(cursor)
+
+    def follow_outbox(self, db: Session, *, batch_size: int = 1000) -> int:
+        """Apply product and catalogue events written since the last call; returns how many were applied."""
+        if self._outbox.cursor is None:
+            self.sync_cursor(db)
+            return 0
+        return len(self._outbox.follow(db, self._apply_events, batch_size=batch_size))
+
+    def _apply_events(self, events: list[Row]) -> None:
+        if any(event.event_name == CATALOG_EVENT for event in events):
+            self.clear()
+        else:
+            self.invalidate(
+                int(event.payload["product_id"]) for event in events if (event.payload or {}).get("product_id") is not None
+            )
+
+    async def start(self) -> None:
+        """Find the outbox cursor, then follow the outbox in the background; a failed start is retried there."""
+        try:
+            await asyncio.to_thread(self._with_session, self.sync_cursor)
+        except SQLAlchemyError as exc:
+            logger.warning("Product cache disabled until the outbox is reachable: %s", exc)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.product_cache_poll_seconds)
+            try:
+                await asyncio.to_thread(self._with_session, self.follow_outbox)
+            except SQLAlchemyError as exc:
+                logger.warning("Product cache outbox poll failed: %s", exc)
+
+    @staticmethod
+    def _with_session(fn) -> None:
+        db = SessionLocal()
+        try:
+            fn(db)
+        finally:
+            db.close()
+
+
+product_cache = ProductCache(settings.product_cache_max_entries, settings.product_cache_ttl_seconds)
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from sqlalchemy import Float, case, cast, func, select, union_all
+from sqlalchemy.orm import Session
+
+from app.models.pim import PimBrand, PimProduct, PimProductI18n, PimProductVariant
+
+# Score bonuses on top of trigram similarity (0..1): exact matches first, then prefixes.
+EXACT_BONUS = 2.0
+PREFIX_BONUS = 1.0
+# pg_trgm extracts no trigram from a shorter pattern, so a substring match on it would scan
+# the whole GIN index. Queries whose words are all shorter match as a field prefix instead,
+# served by the lower(column) text_pattern_ops indexes (migration 0012).
+MIN_SUBSTRING_LENGTH = 3
+
+
+def escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _branch(product_id, column, term: str, limit: int, *joins):
+    """The `limit` best products whose `column` matches term, with a relevance score for that field.
+
+    A field matches when it contains every word of term (gin_trgm_ops indexes, migration 0011)
+    or, for a term without a word of MIN_SUBSTRING_LENGTH, when it starts with the term.
+    """
+    escaped = escape_like(term)
+    score = func.max(
+        cast(func.similarity(column, term), Float)
+        + case((func.lower(column) == term.lower(), EXACT_BONUS), else_=0.0)
+        + case((column.ilike(f"{escaped}%", escape="\\"), PREFIX_BONUS), else_=0.0)
+    ).label("score")
+    words = term.split()
+    if max(len(word) for word in words) >= MIN_SUBSTRING_LENGTH:
+        matches = [column.ilike(f"%{escape_like(word)}%", escape="\\") for word in words]
+    else:
+        matches = [func.lower(column).like(f"{escape_like(term.lower())}%", escape="\\")]
+    stmt = select(product_id.label("product_id"), score)
+    for target, onclause in joins:
+        stmt = stmt.join(target, onclause)
+    return (
+        stmt.where(*matches)
+        .group_by(product_id)
+        .order_by(score.desc(), product_id.desc())
+        .limit(limit)
+    )
+
+
+def search_products(db: Session, q: str, *, limit: int = 25) -> list[tuple[int, float]]:
+    """(product_id, score) for products matching q in SKU, EAN, variant SKU/EAN, name or brand, best first.
+
+    Each field contributes at most `limit` products, ranked the same way as the result, so
+    broad terms never sort every match; the overall top `limit` is still exact.
+    """
+    term = " ".join(q.split())
+    if not term:
+        return []
+    hits = union_all(
+        _branch(PimProduct.id, PimProduct.sku, term, limit),
+        _branch(PimProduct.id, PimProduct.ean, term, limit),
+        _branch(PimProductVariant.product_id, PimProductVariant.sku, term, limit),
+        _branch(PimProductVariant.product_id, PimProductVariant.ean, term, limit),
+        _branch(PimProductI18n.product_id, PimProductI18n.name, term, limit),
+        _branch(PimProduct.id, PimBrand.name, term, limit, (PimBrand, PimBrand.id == PimProduct.brand_id)),
+    ).subquery("hits")
+    score = func.max(hits.c.score).label("score")
+    stmt = (
+        select(hits.c.product_id, score)
+        .group_by(hits.c.product_id)
+        .order_by(score.desc(), hits.c.product_id.desc())
+        .limit(limit)
+    )
+    return [(product_id, float(value)) for product_id, value in db.execute(stmt)]
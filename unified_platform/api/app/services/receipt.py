@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from decimal import Decimal
+
+from sqlalchemy import bindparam, func, insert, select, tuple_, update
+from sqlalchemy.orm import Session
+
+from app.models.inventory import (
+    InvDiscrepancyReport,
+    InvInboundShipment,
+    InvInboundShipmentLine,
+    InvReceivingScanEvent,
+    InvStockBalance,
+    InvStockMovement,
+)
+from app.models.procurement import ProcPurchaseOrderLine
+from app.schemas.supply import ScanResult
+from app.services.barcode import BarcodeMatch
+from app.services.stock_alerts import evaluate_touched
+from app.services.valuation import ValuationMove, apply_valuation
+
+_ZERO = Decimal("0")
+
+# Scan results (app.schemas.supply.ScanResult) that count one unit towards their shipment line.
+RECEIVED_SCAN_RESULTS: tuple[ScanResult, ...] = ("ok", "match", "matched")
+# Stored instead of the device's result for case GTINs: the PIM has no pack sizes, so
+# a case cannot be turned into units (the ASN import rejects them for the same reason).
+CASE_GTIN_SCAN_RESULT: ScanResult = "case_gtin"
+
+_balances = InvStockBalance.__table__
+_po_lines = ProcPurchaseOrderLine.__table__
+
+_RECEIVE = (
+    update(_balances)
+    .where(_balances.c.id == bindparam("b_id"))
+    .values(
+        on_hand_qty=_balances.c.on_hand_qty + bindparam("b_qty"),
+        available_qty=_balances.c.available_qty + bindparam("b_qty"),
+        updated_at=bindparam("b_now"),
+    )
+)
+_PO_RECEIVED = (
+    update(_po_lines)
+    .where(_po_lines.c.id == bindparam("l_id"))
+    .values(received_qty=_po_lines.c.received_qty + bindparam("l_qty"), updated_at=bindparam("l_now"))
+)
+
+
+@dataclass(slots=True)
+class ReceiptResult:
+    lines: int = 0
+    received_qty: Decimal = _ZERO
+    movement_ids: list[int] = field(default_factory=list)
+    discrepancies: int = 0
+    # (location_id, variant_id) pairs whose balance changed
+    touched: set[tuple[int, int]] = field(default_factory=set)
+
+    @property
+    def variant_ids(self) -> set[int]:
+        return {variant_id for _, variant_id in self.touched}
+
+
+def classify_scan(
+    match: BarcodeMatch | None, shipment_line_id: int | None, scan_result: ScanResult, line_ids: dict[int, int]
+) -> tuple[int | None, ScanResult]:
+    """(shipment_line_id, scan_result) to store for a scan whose code resolved to match.
+
+    Case GTINs are flagged and kept off every line so they never count as one unit;
+    otherwise a scan without a line is matched to the line of its variant (line_ids).
+    """
+    if match is not None and match.pack_indicator is not None:
+        return None, CASE_GTIN_SCAN_RESULT
+    if shipment_line_id is None and match is not None:
+        shipment_line_id = line_ids.get(match.variant_id)
+    return shipment_line_id, scan_result
+
+
+def _scanned_qty(db: Session, shipment_id: int) -> dict[int, Decimal]:
+    rows = db.execute(
+        select(InvReceivingScanEvent.shipment_line_id, func.count())
+        .where(
+            InvReceivingScanEvent.shipment_id == shipment_id,
+            InvReceivingScanEvent.shipment_line_id.is_not(None),
+            InvReceivingScanEvent.scan_result.in_(RECEIVED_SCAN_RESULTS),
+        )
+        .group_by(InvReceivingScanEvent.shipment_line_id)
+    )
+    return {line_id: Decimal(count) for line_id, count in rows}
+
+
+def post_receipt(db: Session, shipment: InvInboundShipment, *, user_id: int | None) -> ReceiptResult:
+    """Turn a shipment's lines into stock in bulk.
+
+    A line's received quantity is its count of accepted scans, or the received_qty it
+    was created with when it was never scanned. Balances, receipt movements, FIFO layers
+    at PO unit cost, PO line received quantities and discrepancy reports are written in
+    a handful of set-based statements. The caller owns the transaction.
+    """
+    db.flush()
+    now = datetime.now(UTC)
+    location_id = shipment.destination_location_id
+    lines = db.execute(
+        select(
+            InvInboundShipmentLine.id,
+            InvInboundShipmentLine.po_line_id,
+            InvInboundShipmentLine.variant_id,
+            InvInboundShipmentLine.expected_qty,
+            InvInboundShipmentLine.received_qty,
+            ProcPurchaseOrderLine.unit_cost,
+        )
+        .outerjoin(ProcPurchaseOrderLine, ProcPurchaseOrderLine.id == InvInboundShipmentLine.po_line_id)
+        .where(InvInboundShipmentLine.shipment_id == shipment.id)
+        .order_by(InvInboundShipmentLine.id)
+    ).all()
+    result = ReceiptResult(lines=len(lines))
+    if not lines:
+        return result
+
+    scanned = _scanned_qty(db, shipment.id)
+    line_updates: list[dict] = []
+    discrepancies: list[dict] = []
+    received_lines = []
+    per_variant: dict[int, Decimal] = defaultdict(lambda: _ZERO)
+    per_po_line: dict[int, Decimal] = defaultdict(lambda: _ZERO)
+    for line in lines:
+        received = scanned.get(line.id, Decimal(line.received_qty))
+        expected = Decimal(line.expected_qty)
+        line_updates.append({"id": line.id, "received_qty": received, "discrepancy_qty": received - expected, "updated_at": now})
+        if received != expected:
+            discrepancies.append(
+                {
+                    "shipment_id": shipment.id,
+                    "shipment_line_id": line.id,
+                    "issue_type": "over_receipt" if received > expected else "short_receipt",
+                    "expected_qty": expected,
+                    "received_qty": received,
+                    "severity": "medium",
+                    "created_by": user_id,
+                }
+            )
+        if received <= 0:
+            continue
+        received_lines.append((line, received))
+        per_variant[line.variant_id] += received
+        if line.po_line_id is not None:
+            per_po_line[line.po_line_id] += received
+
+    db.execute(update(InvInboundShipmentLine), line_updates)
+    if discrepancies:
+        db.execute(insert(InvDiscrepancyReport), discrepancies)
+    if per_po_line:
+        db.execute(_PO_RECEIVED, [{"l_id": line_id, "l_qty": qty, "l_now": now} for line_id, qty in per_po_line.items()])
+    result.discrepancies = len(discrepancies)
+    if not received_lines:
+        return result
+
+    # Untracked (lot/container NULL) balances, locked in id order; missing ones are created.
+    existing = dict(
+        db.execute(
+            select(InvStockBalance.variant_id, InvStockBalance.id)
+            .where(
+                InvStockBalance.company_id == shipment.company_id,
+                tuple_(InvStockBalance.location_id, InvStockBalance.variant_id).in_(
+                    [(location_id, variant_id) for variant_id in per_variant]
+                ),
+                InvStockBalance.lot_id.is_(None),
+                InvStockBalance.container_id.is_(None),
+            )
+            .order_by(InvStockBalance.id)
+            .with_for_update()
+        ).all()
+    )
+    updates = [{"b_id": existing[v], "b_qty": qty, "b_now": now} for v, qty in per_variant.items() if v in existing]
+    if updates:
+        db.execute(_RECEIVE, updates)
+    missing = [
+        {
+            "company_id": shipment.company_id,
+            "location_id": location_id,
+            "variant_id": variant_id,
+            "on_hand_qty": qty,
+            "reserved_qty": _ZERO,
+            "available_qty": qty,
+        }
+        for variant_id, qty in per_variant.items()
+        if variant_id not in existing
+    ]
+    if missing:
+        db.execute(insert(InvStockBalance), missing)
+
+    movement_ids = db.scalars(
+        insert(InvStockMovement).returning(InvStockMovement.id, sort_by_parameter_order=True),
+        [
+            {
+                "company_id": shipment.company_id,
+                "movement_type": "receipt",
+                "dest_location_id": location_id,
+                "variant_id": line.variant_id,
+                "qty": received,
+                "source_doc_type": "inbound_shipment",
+                "source_doc_id": str(shipment.id),
+                "moved_by": user_id,
+                "moved_at": now,
+            }
+            for line, received in received_lines
+        ],
+    ).all()
+    apply_valuation(
+        db,
+        [
+            ValuationMove(
+                movement_id,
+                line.variant_id,
+                location_id,
+                received,
+                Decimal(line.unit_cost) if line.unit_cost is not None else None,
+            )
+            for movement_id, (line, received) in zip(movement_ids, received_lines, strict=True)
+        ],
+    )
+    result.touched = {(location_id, variant_id) for variant_id in per_variant}
+    evaluate_touched(db, result.touched)
+
+    result.received_qty = sum(per_variant.values(), _ZERO)
+    result.movement_ids = list(movement_ids)
+    return result
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import UTC, datetime
+
+import numpy as np
+from sqlalchemy import Float, cast, delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.inventory import InvReplenishmentRule, InvReplenishmentSuggestion, InvStockBalance
+from app.models.mdm import MdmSupplierProfile
+from app.models.procurement import ProcPurchaseOrder, ProcPurchaseOrderLine
+from app.services.sales_rollup import units_by_variant
+from app.services.stock_alerts import LOW_STOCK, AlertScope, sync_alerts
+
+OPEN_PO_STATUSES = ("confirmed", "partially_received")
+
+
+@dataclass(slots=True)
+class ReplenishmentPlan:
+    """Per-rule results of one planning pass; every array is aligned with the rule arrays."""
+
+    lead_time_demand: np.ndarray
+    projected_qty: np.ndarray
+    suggested_qty: np.ndarray
+
+
+def scope_keys(location_ids: np.ndarray, variant_ids: np.ndarray) -> np.ndarray:
+    """Pack (location_id, variant_id) into one int64 so scopes can be matched with searchsorted."""
+    return (location_ids.astype(np.int64) << 32) | variant_ids.astype(np.int64)
+
+
+def lookup(keys: np.ndarray, table_keys: np.ndarray, table_values: np.ndarray) -> np.ndarray:
+    """Values from (table_keys, table_values) for every key; 0 where a key is missing."""
+    out = np.zeros(len(keys), dtype=np.float64)
+    if len(table_keys) == 0 or len(keys) == 0:
+        return out
+    order = np.argsort(table_keys, kind="stable")
+    sorted_keys = table_keys[order]
+    sorted_values = table_values[order]
+    idx = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+    hit = sorted_keys[idx] == keys
+    out[hit] = sorted_values[idx[hit]]
+    return out
+
+
+def plan_replenishment(
+    *,
+    on_hand: np.ndarray,
+    incoming: np.ndarray,
+    daily_demand: np.ndarray,
+    lead_time_days: np.ndarray,
+    min_qty: np.ndarray,
+    max_qty: np.ndarray,
+    reorder_qty: np.ndarray,
+) -> ReplenishmentPlan:
+    """
+    Vectorized min/max planning.
+    A scope reorders when stock position (on hand + incoming) minus demand over the lead
+    time drops to min_qty; it orders up to max_qty, rounded up to multiples of reorder_qty.
+    """
+    lead_time_demand = daily_demand * lead_time_days
+    projected = on_hand + incoming - lead_time_demand
+    shortfall = np.maximum(max_qty - projected, 0.0)
+    pack = np.where(reorder_qty > 0, reorder_qty, 1.0)
+    suggested = np.where(projected <= min_qty, np.ceil(shortfall / pack) * pack, 0.0)
+    return ReplenishmentPlan(
+        lead_time_demand=lead_time_demand,
+        projected_qty=projected,
+        suggested_qty=suggested,
+    )
+
+
+def _pairs(db: Session, stmt) -> tuple[np.ndarray, np.ndarray]:
+    rows = db.execute(stmt).all()
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    data = np.array(rows, dtype=np.float64)
+    return scope_keys(data[:, 0], data[:, 1]), data[:, 2]
+
+
+def run_replenishment(db: Session) -> dict[str, int]:
+    """
+    Evaluate every replenishment rule in one pass.
+    Replaces the stored suggestions and syncs low_stock alerts; the caller commits.
+    """
+    now = datetime.now(UTC)
+    rules = db.execute(
+        select(
+            InvReplenishmentRule.id,
+            InvReplenishmentRule.company_id,
+            InvReplenishmentRule.location_id,
+            InvReplenishmentRule.variant_id,
+            func.coalesce(InvReplenishmentRule.preferred_supplier_id, 0),
+            cast(InvReplenishmentRule.min_qty, Float),
+            cast(InvReplenishmentRule.max_qty, Float),
+            cast(InvReplenishmentRule.reorder_qty, Float),
+            func.coalesce(
+                InvReplenishmentRule.lead_time_days_override,
+                MdmSupplierProfile.lead_time_days,
+                settings.replenishment_default_lead_time_days,
+            ),
+        ).outerjoin(MdmSupplierProfile, MdmSupplierProfile.partner_id == InvReplenishmentRule.preferred_supplier_id)
+    ).all()
+
+    if not rules:
+        alerts = sync_alerts(db, [], alert_type=LOW_STOCK, full_scan=True)
+        db.execute(delete(InvReplenishmentSuggestion))
+        return {"rules": 0, "suggestions": 0, **alerts}
+
+    r = np.array(rules, dtype=np.float64)
+    rule_id, company_id, location_id, variant_id, supplier_id = (r[:, i].astype(np.int64) for i in range(5))
+    keys = scope_keys(location_id, variant_id)
+
+    balance_keys, balance_qty = _pairs(
+        db,
+        select(
+            InvStockBalance.location_id,
+            InvStockBalance.variant_id,
+            cast(func.sum(InvStockBalance.on_hand_qty), Float),
+        ).group_by(InvStockBalance.location_id, InvStockBalance.variant_id),
+    )
+    po_keys, po_qty = _pairs(
+        db,
+        select(
+            ProcPurchaseOrder.destination_location_id,
+            ProcPurchaseOrderLine.variant_id,
+            cast(func.sum(ProcPurchaseOrderLine.ordered_qty - ProcPurchaseOrderLine.received_qty), Float),
+        )
+        .join(ProcPurchaseOrder, ProcPurchaseOrder.id == ProcPurchaseOrderLine.po_id)
+        .where(
+            ProcPurchaseOrder.status.in_(OPEN_PO_STATUSES),
+            ProcPurchaseOrderLine.ordered_qty > ProcPurchaseOrderLine.received_qty,
+        )
+        .group_by(ProcPurchaseOrder.destination_location_id, ProcPurchaseOrderLine.variant_id),
+    )
+
+    # Sales velocity is tracked per variant: web orders are not reliably tied to a warehouse.
+    window_days = settings.replenishment_velocity_days
+    sales = units_by_variant(db, window_days)
+    sales_arr = np.array(sales, dtype=np.float64).reshape(-1, 2)
+    daily_demand = lookup(variant_id, sales_arr[:, 0].astype(np.int64), sales_arr[:, 1] / window_days)
+
+    on_hand = lookup(keys, balance_keys, balance_qty)
+    incoming = lookup(keys, po_keys, po_qty)
+    plan = plan_replenishment(
+        on_hand=on_hand,
+        incoming=incoming,
+        daily_demand=daily_demand,
+        lead_time_days=r[:, 8],
+        min_qty=r[:, 5],
+        max_qty=r[:, 6],
+        reorder_qty=r[:, 7],
+    )
+
+    db.execute(delete(InvReplenishmentSuggestion))
+    suggested_idx = np.flatnonzero(plan.suggested_qty > 0)
+    if len(suggested_idx):
+        db.execute(
+            insert(InvReplenishmentSuggestion),
+            [
+                {
+                    "rule_id": int(rule_id[i]),
+                    "company_id": int(company_id[i]),
+                    "location_id": int(location_id[i]),
+                    "variant_id": int(variant_id[i]),
+                    "supplier_id": int(supplier_id[i]) or None,
+                    "on_hand_qty": round(float(on_hand[i]), 2),
+                    "incoming_qty": round(float(incoming[i]), 2),
+                    "lead_time_demand": round(float(plan.lead_time_demand[i]), 2),
+                    "suggested_qty": round(float(plan.suggested_qty[i]), 2),
+                    "computed_at": now,
+                }
+                for i in suggested_idx.tolist()
+            ],
+        )
+
+    alerts = sync_alerts(
+        db,
+        (
+            AlertScope(int(company_id[i]), int(location_id[i]), int(variant_id[i]), float(r[i, 5]), float(on_hand[i]))
+            for i in range(len(rules))
+        ),
+        alert_type=LOW_STOCK,
+        full_scan=True,
+    )
+    return {"rules": len(rules), "suggestions": len(suggested_idx), **alerts}
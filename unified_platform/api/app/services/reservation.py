@@ -0,0 +1,430 @@
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from decimal import Decimal
+
+from sqlalchemy import bindparam, func, insert, select, tuple_, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.core import CoreLocation
+from app.models.integration import IntStoreConnection, IntSyncQueue
+from app.models.inventory import InvLot, InvStockBalance, InvStockMovement
+from app.models.pim import PimProductVariant
+from app.models.sales import SalesOrder, SalesOrderLine
+from app.services.stock_alerts import evaluate_touched
+from app.services.stock_locations import locations_below, parse_expiry, pick_order
+from app.services.valuation import ValuationMove, apply_valuation
+from app.services.wgr import stock_location_id
+
+logger = logging.getLogger(__name__)
+
+_ZERO = Decimal("0")
+
+# WooCommerce order status -> stock action.
+WOO_STATUS_ACTIONS: dict[str, str] = {
+    "processing": "reserve",
+    "on-hold": "reserve",
+    "completed": "consume",
+    "cancelled": "release",
+    "refunded": "release",
+    "failed": "release",
+}
+
+# Channels that sell from our stock and get its available quantity pushed (app.tasks.woo/wgr.push_stock).
+STOCK_PUSH_PROVIDERS = ("woocommerce", "wgr")
+
+_balances = InvStockBalance.__table__
+_lines = SalesOrderLine.__table__
+
+# Conditional updates: a concurrent writer can never push available_qty below zero.
+_RESERVE = (
+    update(_balances)
+    .where(_balances.c.id == bindparam("b_id"), _balances.c.available_qty >= bindparam("b_qty"))
+    .values(
+        reserved_qty=_balances.c.reserved_qty + bindparam("b_qty"),
+        available_qty=_balances.c.available_qty - bindparam("b_qty"),
+        updated_at=bindparam("b_now"),
+    )
+)
+# A release never gives back more than the balance still has reserved.
+_RELEASE = (
+    update(_balances)
+    .where(_balances.c.id == bindparam("b_id"))
+    .values(
+        reserved_qty=func.greatest(_balances.c.reserved_qty - bindparam("b_qty"), 0),
+        available_qty=_balances.c.available_qty + func.least(_balances.c.reserved_qty, bindparam("b_qty")),
+        updated_at=bindparam("b_now"),
+    )
+)
+_CONSUME = (
+    update(_balances)
+    .where(_balances.c.id == bindparam("b_id"))
+    .values(
+        on_hand_qty=_balances.c.on_hand_qty - bindparam("b_ship"),
+        reserved_qty=func.greatest(_balances.c.reserved_qty - bindparam("b_reserved"), 0),
+        available_qty=_balances.c.available_qty - (bindparam("b_ship") - bindparam("b_reserved")),
+        updated_at=bindparam("b_now"),
+    )
+)
+
+
+@dataclass(slots=True)
+class ReservationResult:
+    reserved_lines: int = 0
+    # order_id -> quantity that could not be reserved
+    short: dict[int, Decimal] = field(default_factory=dict)
+    variant_ids: set[int] = field(default_factory=set)
+
+
+@dataclass(slots=True)
+class _Line:
+    id: int
+    order_id: int
+    warehouse_id: int
+    variant_id: int
+    quantity: Decimal
+    reserved_qty: Decimal
+    shipped_qty: Decimal
+
+
+@dataclass(slots=True)
+class _Balance:
+    id: int
+    location_id: int
+    lot_id: int | None
+    reserved: Decimal
+    available: Decimal
+
+
+def _load_lines(db: Session, order_ids: list[int]) -> list[_Line]:
+    db.flush()
+    rows = db.execute(
+        select(
+            SalesOrderLine.id,
+            SalesOrderLine.order_id,
+            func.coalesce(SalesOrder.warehouse_location_id, settings.wgr_location_id),
+            SalesOrderLine.variant_id,
+            SalesOrderLine.quantity,
+            SalesOrderLine.reserved_qty,
+            SalesOrderLine.shipped_qty,
+        )
+        .join(SalesOrder, SalesOrder.id == SalesOrderLine.order_id)
+        .where(SalesOrderLine.order_id.in_(order_ids), SalesOrderLine.variant_id.is_not(None))
+        .order_by(SalesOrderLine.order_id, SalesOrderLine.id)
+    )
+    return [
+        _Line(row[0], row[1], row[2], row[3], Decimal(row[4]), Decimal(row[5]), Decimal(row[6]))
+        for row in rows
+    ]
+
+
+def _lock_balances(db: Session, keys: set[tuple[int, int]]) -> dict[tuple[int, int], list[_Balance]]:
+    """Lock every balance of each (warehouse, variant) at the warehouse or below it, in id order.
+
+    A key's balances come back in pick_order, the order the wave planner picks them in.
+    """
+    if not keys:
+        return {}
+    tree = locations_below({warehouse_id for warehouse_id, _ in keys})
+    rows = db.execute(
+        select(
+            tree.c.warehouse_id,
+            InvStockBalance.id,
+            InvStockBalance.location_id,
+            InvStockBalance.variant_id,
+            InvStockBalance.lot_id,
+            InvStockBalance.reserved_qty,
+            InvStockBalance.available_qty,
+            CoreLocation.code,
+            InvLot.expiry_date,
+        )
+        .join(tree, tree.c.location_id == InvStockBalance.location_id)
+        .join(CoreLocation, CoreLocation.id == InvStockBalance.location_id)
+        .outerjoin(InvLot, InvLot.id == InvStockBalance.lot_id)
+        .where(tuple_(tree.c.warehouse_id, InvStockBalance.variant_id).in_(keys))
+        .order_by(InvStockBalance.id)
+        .with_for_update(of=InvStockBalance)
+    ).all()
+    balances: dict[tuple[int, int], list[_Balance]] = defaultdict(list)
+    for row in sorted(rows, key=lambda row: (pick_order(parse_expiry(row.expiry_date), row.code), row.id)):
+        balances[(row.warehouse_id, row.variant_id)].append(
+            _Balance(
+                row.id,
+                row.location_id,
+                row.lot_id,
+                Decimal(row.reserved_qty),
+                Decimal(row.available_qty),
+            )
+        )
+    return balances
+
+
+def _update_balances(db: Session, stmt, params: list[dict]) -> None:
+    """Run a balance update for rows locked by _lock_balances; every row must be hit."""
+    updated = db.execute(stmt, params).rowcount
+    if updated != len(params):
+        raise ValueError(f"stock balance update hit {updated} of {len(params)} locked rows")
+
+
+def reserve_orders(db: Session, order_ids: list[int]) -> ReservationResult:
+    """
+    Reserve open quantities for every line of the given orders.
+    The stock of a line's warehouse is every balance at or below it; balances are locked
+    once for the whole batch and granted oldest order first, each line taking from them
+    in pick order. A line gets what is available (possibly partial) and the remainder is
+    reported as short.
+    """
+    result = ReservationResult()
+    lines = [line for line in _load_lines(db, order_ids) if line.quantity - line.shipped_qty > line.reserved_qty]
+    if not lines:
+        return result
+    balances = _lock_balances(db, {(line.warehouse_id, line.variant_id) for line in lines})
+
+    now = datetime.now(UTC)
+    per_balance: dict[int, Decimal] = defaultdict(Decimal)
+    line_updates: list[dict] = []
+    for line in lines:
+        need = line.quantity - line.shipped_qty - line.reserved_qty
+        grant = _ZERO
+        for balance in balances.get((line.warehouse_id, line.variant_id), ()):
+            take = min(need - grant, balance.available)
+            if take > 0:
+                balance.available -= take
+                per_balance[balance.id] += take
+                grant += take
+            if grant == need:
+                break
+        if grant > 0:
+            line_updates.append({"l_id": line.id, "l_qty": line.reserved_qty + grant})
+            result.variant_ids.add(line.variant_id)
+        if grant < need:
+            result.short[line.order_id] = result.short.get(line.order_id, _ZERO) + (need - grant)
+
+    if per_balance:
+        _update_balances(db, _RESERVE, [{"b_id": b_id, "b_qty": qty, "b_now": now} for b_id, qty in per_balance.items()])
+        db.execute(
+            update(_lines).where(_lines.c.id == bindparam("l_id")).values(reserved_qty=bindparam("l_qty")),
+            line_updates,
+        )
+    result.reserved_lines = len(line_updates)
+    return result
+
+
+def release_orders(db: Session, order_ids: list[int]) -> set[int]:
+    """Give back everything still reserved by the given orders. Returns the affected variant ids."""
+    lines = [line for line in _load_lines(db, order_ids) if line.reserved_qty > 0]
+    if not lines:
+        return set()
+    balances = _lock_balances(db, {(line.warehouse_id, line.variant_id) for line in lines})
+
+    now = datetime.now(UTC)
+    per_balance: dict[int, Decimal] = defaultdict(Decimal)
+    for line in lines:
+        left = line.reserved_qty
+        for balance in balances.get((line.warehouse_id, line.variant_id), ()):
+            take = min(left, balance.reserved)
+            if take > 0:
+                balance.reserved -= take
+                per_balance[balance.id] += take
+                left -= take
+            if left == 0:
+                break
+        if left > 0:
+            logger.warning(
+                "release: order %d line %d holds %s of variant %d that warehouse %d no longer has reserved",
+                line.order_id,
+                line.id,
+                left,
+                line.variant_id,
+                line.warehouse_id,
+            )
+
+    if per_balance:
+        _update_balances(db, _RELEASE, [{"b_id": b_id, "b_qty": qty, "b_now": now} for b_id, qty in per_balance.items()])
+    db.execute(
+        update(_lines).where(_lines.c.id.in_([line.id for line in lines])).values(reserved_qty=0)
+    )
+    return {line.variant_id for line in lines}
+
+
+def _ship_from(balances: list[_Balance], ship: Decimal, reserved: Decimal) -> list[tuple[_Balance, Decimal, Decimal]]:
+    """Split one line's shipment over its warehouse's balances as (balance, shipped, of which reserved).
+
+    The line's reservation is drawn first, then available stock, both in pick order; what
+    the warehouse does not have comes off the first balance, which goes negative.
+    """
+    taken: dict[int, list] = {}
+    left_reserved = min(reserved, ship)
+    for balance in balances:
+        take = min(left_reserved, balance.reserved)
+        if take > 0:
+            balance.reserved -= take
+            taken[balance.id] = [balance, take, take]
+            left_reserved -= take
+    left = ship - sum((entry[1] for entry in taken.values()), _ZERO)
+    for balance in balances:
+        take = min(left, max(balance.available, _ZERO))
+        if take > 0:
+            balance.available -= take
+            taken.setdefault(balance.id, [balance, _ZERO, _ZERO])[1] += take
+            left -= take
+    if left > 0:
+        balances[0].available -= left
+        taken.setdefault(balances[0].id, [balances[0], _ZERO, _ZERO])[1] += left
+    return [(balance, shipped, of_reserved) for balance, shipped, of_reserved in taken.values()]
+
+
+def consume_orders(db: Session, order_ids: list[int], *, user_id: int | None = None) -> set[int]:
+    """
+    Ship the open quantity of every line: on_hand drops by the shipped quantity, the
+    line's reservation is consumed and any unreserved remainder comes off available,
+    across the warehouse's balances in pick order. Writes one sale movement per line and
+    balance it ships from and values them FIFO. A line whose warehouse has no balance for
+    the variant is marked shipped without a movement and logged, so the ledger never
+    holds stock the balances do not. Returns the affected variant ids.
+    """
+    lines = [line for line in _load_lines(db, order_ids) if line.quantity > line.shipped_qty]
+    if not lines:
+        return set()
+    balances = _lock_balances(db, {(line.warehouse_id, line.variant_id) for line in lines})
+
+    now = datetime.now(UTC)
+    company_ids = dict(db.execute(select(SalesOrder.id, SalesOrder.company_id).where(SalesOrder.id.in_(order_ids))).all())
+    per_balance: dict[int, list[Decimal]] = defaultdict(lambda: [_ZERO, _ZERO])
+    movements: list[dict] = []
+    moves: list[tuple[int, int, Decimal]] = []  # (variant_id, location_id, qty) per movement
+    for line in lines:
+        ship = line.quantity - line.shipped_qty
+        sources = balances.get((line.warehouse_id, line.variant_id))
+        if not sources:
+            logger.warning(
+                "consume: no stock balance for variant %d in warehouse %d, order %d ships %s without a movement",
+                line.variant_id,
+                line.warehouse_id,
+                line.order_id,
+                ship,
+            )
+            continue
+        for balance, shipped, of_reserved in _ship_from(sources, ship, line.reserved_qty):
+            per_balance[balance.id][0] += shipped
+            per_balance[balance.id][1] += of_reserved
+            moves.append((line.variant_id, balance.location_id, shipped))
+            movements.append(
+                {
+                    "company_id": company_ids[line.order_id],
+                    "movement_type": "sale",
+                    "source_location_id": balance.location_id,
+                    "variant_id": line.variant_id,
+                    "lot_id": balance.lot_id,
+                    "qty": shipped,
+                    "source_doc_type": "sales_order",
+                    "source_doc_id": str(line.order_id),
+                    "moved_by": user_id,
+                    "moved_at": now,
+                }
+            )
+
+    if per_balance:
+        _update_balances(
+            db,
+            _CONSUME,
+            [
+                {"b_id": b_id, "b_ship": ship, "b_reserved": reserved, "b_now": now}
+                for b_id, (ship, reserved) in per_balance.items()
+            ],
+        )
+    db.execute(
+        update(_lines)
+        .where(_lines.c.id.in_([line.id for line in lines]))
+        .values(shipped_qty=_lines.c.quantity, reserved_qty=0)
+    )
+    if not movements:
+        return set()
+    movement_ids = db.scalars(insert(InvStockMovement).returning(InvStockMovement.id, sort_by_parameter_order=True), movements).all()
+    apply_valuation(
+        db,
+        [
+            ValuationMove(movement_id, variant_id, location_id, -qty)
+            for movement_id, (variant_id, location_id, qty) in zip(movement_ids, moves, strict=True)
+        ],
+    )
+    evaluate_touched(db, {(location_id, variant_id) for variant_id, location_id, _ in moves})
+    return {variant_id for variant_id, _, _ in moves}
+
+
+def enqueue_stock_pushes(
+    db: Session, variant_ids: set[int], *, providers: tuple[str, ...] = STOCK_PUSH_PROVIDERS
+) -> int:
+    """Queue a stock.push of the available_qty per variant for every active store of `providers`.
+
+    WooCommerce gets the total over every location. WGR gets only the untracked balance at
+    its stock location (app.services.wgr.stock_location_id), the one poll_stock writes its
+    figure back to; the total would be booked there again on every poll.
+    """
+    if not variant_ids:
+        return 0
+    connections = db.scalars(
+        select(IntStoreConnection).where(
+            IntStoreConnection.provider.in_(providers),
+            IntStoreConnection.active.is_(True),
+        )
+    ).all()
+    if not connections:
+        return 0
+    db.flush()
+    rows = db.execute(
+        select(PimProductVariant.id, PimProductVariant.sku, func.coalesce(func.sum(InvStockBalance.available_qty), 0))
+        .outerjoin(InvStockBalance, InvStockBalance.variant_id == PimProductVariant.id)
+        .where(PimProductVariant.id.in_(variant_ids))
+        .group_by(PimProductVariant.id, PimProductVariant.sku)
+    ).all()
+    wgr_locations = {stock_location_id(conn) for conn in connections if conn.provider == "wgr"}
+    at_location: dict[tuple[int, int], object] = {}
+    if wgr_locations:
+        at_location = {
+            (location_id, variant_id): available
+            for location_id, variant_id, available in db.execute(
+                select(InvStockBalance.location_id, InvStockBalance.variant_id, InvStockBalance.available_qty).where(
+                    InvStockBalance.variant_id.in_(variant_ids),
+                    InvStockBalance.location_id.in_(wgr_locations),
+                    InvStockBalance.lot_id.is_(None),
+                    InvStockBalance.container_id.is_(None),
+                )
+            )
+        }
+
+    def pushed(conn: IntStoreConnection, variant_id: int, total) -> int:
+        if conn.provider == "wgr":
+            return max(0, int(at_location.get((stock_location_id(conn), variant_id), 0)))
+        return max(0, int(total))
+
+    entries = [
+        {
+            "store_connection_id": conn.id,
+            "entity_type": "stock",
+            "event_type": "stock.push",
+            "payload": {"sku": sku, "qty": pushed(conn, variant_id, available), "variant_id": variant_id},
+            "status": "pending",
+        }
+        for conn in connections
+        for variant_id, sku, available in rows
+        if sku
+    ]
+    if entries:
+        db.execute(insert(IntSyncQueue), entries)
+    return len(entries)
+
+
+def apply_status_action(db: Session, order_ids: list[int], action: str | None, *, user_id: int | None = None) -> set[int]:
+    """Run the stock action mapped from an external status; returns the affected variant ids."""
+    if action == "reserve":
+        return reserve_orders(db, order_ids).variant_ids
+    if action == "consume":
+        return consume_orders(db, order_ids, user_id=user_id)
+    if action == "release":
+        return release_orders(db, order_ids)
+    return set()
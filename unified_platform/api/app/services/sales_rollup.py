@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+from collections.abc import Iterable
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import Date, and_, case, cast, delete, func, literal, select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.sales import SalesDailyRollup, SalesOrder, SalesOrderLine
+
+# Orders in these statuses do not count as sold.
+EXCLUDED_SALES_STATUSES = ("cancelled", "refunded", "failed")
+VELOCITY_WINDOWS = (7, 30, 90)
+
+
+def sales_day():
+    """SQL expression for an order's sales day in SALES_ROLLUP_TIMEZONE."""
+    return cast(func.timezone(settings.sales_rollup_timezone, SalesOrder.created_at), Date)
+
+
+def local_today() -> date:
+    return datetime.now(ZoneInfo(settings.sales_rollup_timezone)).date()
+
+
+def _add_orders(db: Session, condition, sign: int) -> None:
+    """Add (sign=1) or subtract (sign=-1) the lines of the orders matching condition."""
+    day = sales_day()
+    totals = (
+        select(
+            day,
+            SalesOrder.channel_type,
+            SalesOrderLine.variant_id,
+            func.sum(SalesOrderLine.quantity) * sign,
+            func.sum(SalesOrderLine.line_total) * sign,
+            func.count(SalesOrderLine.id) * sign,
+        )
+        .join(SalesOrder, SalesOrder.id == SalesOrderLine.order_id)
+        .where(condition, SalesOrderLine.variant_id.is_not(None))
+        .group_by(day, SalesOrder.channel_type, SalesOrderLine.variant_id)
+    )
+    stmt = pg_insert(SalesDailyRollup).from_select(
+        ["sales_date", "channel_type", "variant_id", "units", "revenue", "order_lines"], totals
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["sales_date", "channel_type", "variant_id"],
+        set_={
+            "units": SalesDailyRollup.units + stmt.excluded.units,
+            "revenue": SalesDailyRollup.revenue + stmt.excluded.revenue,
+            "order_lines": SalesDailyRollup.order_lines + stmt.excluded.order_lines,
+        },
+    )
+    db.execute(stmt)
+
+
+def sync_sales_rollup(db: Session, order_ids: Iterable[int]) -> dict[str, int]:
+    """Bring the rollup in line with the current status of the given orders.
+
+    Call after creating orders or changing their status, in the same transaction.
+    An order is counted once while its status is not excluded; in_sales_rollup
+    records whether it currently is.
+    """
+    order_ids = list(set(order_ids))
+    if not order_ids:
+        return {"added": 0, "removed": 0}
+    db.flush()
+    rows = db.execute(
+        select(SalesOrder.id, SalesOrder.status, SalesOrder.in_sales_rollup)
+        .where(SalesOrder.id.in_(order_ids))
+        .order_by(SalesOrder.id)
+        .with_for_update()
+    ).all()
+    add = [row.id for row in rows if row.status not in EXCLUDED_SALES_STATUSES and not row.in_sales_rollup]
+    remove = [row.id for row in rows if row.status in EXCLUDED_SALES_STATUSES and row.in_sales_rollup]
+    for ids, sign in ((add, 1), (remove, -1)):
+        if ids:
+            _add_orders(db, SalesOrder.id.in_(ids), sign)
+            db.execute(
+                update(SalesOrder)
+                .where(SalesOrder.id.in_(ids))
+                .values(in_sales_rollup=sign > 0, updated_at=SalesOrder.updated_at)
+                .execution_options(synchronize_session=False)
+            )
+    return {"added": len(add), "removed": len(remove)}
+
+
+def backfill_sales_rollup(db: Session, *, since: date | None = None) -> dict[str, int]:
+    """Rebuild the rollup from orders, for every day or from `since` on. The caller commits."""
+    # Blocks concurrent sync_sales_rollup writers until the rebuild commits.
+    db.execute(text("LOCK TABLE sales_daily_rollup IN SHARE ROW EXCLUSIVE MODE"))
+    if since is None:
+        in_range, rollup_range = literal(True), literal(True)
+    else:
+        in_range, rollup_range = sales_day() >= since, SalesDailyRollup.sales_date >= since
+    db.execute(delete(SalesDailyRollup).where(rollup_range))
+    counted = and_(in_range, SalesOrder.status.notin_(EXCLUDED_SALES_STATUSES))
+    _add_orders(db, counted, 1)
+    result = db.execute(
+        update(SalesOrder)
+        .where(in_range)
+        .values(
+            in_sales_rollup=SalesOrder.status.notin_(EXCLUDED_SALES_STATUSES),
+            # Bookkeeping only: keep updated_at for the order's own changes.
+            updated_at=SalesOrder.updated_at,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return {"orders": result.rowcount}
+
+
+def units_by_variant(db: Session, days: int, *, channel: str | None = None) -> list[tuple[int, float]]:
+    """(variant_id, units) sold over the last `days` days, today included."""
+    stmt = (
+        select(SalesDailyRollup.variant_id, func.sum(SalesDailyRollup.units))
+        .where(SalesDailyRollup.sales_date > local_today() - timedelta(days=days))
+        .group_by(SalesDailyRollup.variant_id)
+    )
+    if channel:
+        stmt = stmt.where(SalesDailyRollup.channel_type == channel)
+    return [(variant_id, float(units or 0)) for variant_id, units in db.execute(stmt)]
+
+
+def total_units(db: Session, days: int) -> float:
+    return float(
+        db.scalar(
+            select(func.coalesce(func.sum(SalesDailyRollup.units), 0)).where(
+                SalesDailyRollup.sales_date > local_today() - timedelta(days=days)
+            )
+        )
+        or 0
+    )
+
+
+def velocity(
+    db: Session,
+    *,
+    variant_ids: list[int] | None = None,
+    channel: str | None = None,
+    windows: tuple[int, ...] = VELOCITY_WINDOWS,
+) -> list[dict]:
+    """Units sold and average units per day over each window, per variant, in one scan of the rollup."""
+    today = local_today()
+    columns = [
+        func.sum(
+            case((SalesDailyRollup.sales_date > today - timedelta(days=window), SalesDailyRollup.units), else_=0)
+        ).label(f"units_{window}d")
+        for window in windows
+    ]
+    stmt = (
+        select(SalesDailyRollup.variant_id, *columns)
+        .where(SalesDailyRollup.sales_date > today - timedelta(days=max(windows)))
+        .group_by(SalesDailyRollup.variant_id)
+        .order_by(SalesDailyRollup.variant_id)
+    )
+    if variant_ids:
+        stmt = stmt.where(SalesDailyRollup.variant_id.in_(variant_ids))
+    if channel:
+        stmt = stmt.where(SalesDailyRollup.channel_type == channel)
+    result = []
+    for row in db.execute(stmt):
+        units = {window: float(row[index + 1] or 0) for index, window in enumerate(windows)}
+        result.append(
+            {
+                "variant_id": row.variant_id,
+                "windows": [
+                    {"days": window, "units": units[window], "per_day": round(units[window] / window, 4)}
+                    for window in windows
+                ],
+            }
+        )
+    return result
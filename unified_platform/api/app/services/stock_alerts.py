@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import UTC, datetime
+
+from sqlalchemy import Float, cast, func, insert, select, tuple_, update
+from sqlalchemy.orm import Session
+
+from app.models.inventory import InvReplenishmentRule, InvStockAlert, InvStockBalance
+
+LOW_STOCK = "low_stock"
+
+
+@dataclass(slots=True)
+class AlertScope:
+    """One evaluated (location, variant) scope with its threshold and current level."""
+
+    company_id: int
+    location_id: int
+    variant_id: int
+    threshold: float
+    current: float
+
+    @property
+    def breached(self) -> bool:
+        return self.current < self.threshold
+
+
+def sync_alerts(
+    db: Session,
+    scopes: Iterable[AlertScope],
+    *,
+    alert_type: str = LOW_STOCK,
+    full_scan: bool = False,
+) -> dict[str, int]:
+    """Open, refresh and resolve alerts for the evaluated scopes in bulk.
+
+    With full_scan every open alert of this type is considered, so scopes that are no
+    longer evaluated at all (rule deleted) are resolved as well. The caller commits.
+    """
+    scopes = {(scope.location_id, scope.variant_id): scope for scope in scopes}
+    if not scopes and not full_scan:
+        return {"opened": 0, "updated": 0, "resolved": 0}
+
+    stmt = select(InvStockAlert.id, InvStockAlert.location_id, InvStockAlert.variant_id, InvStockAlert.current_value).where(
+        InvStockAlert.alert_type == alert_type, InvStockAlert.status == "open"
+    )
+    if not full_scan:
+        stmt = stmt.where(tuple_(InvStockAlert.location_id, InvStockAlert.variant_id).in_(list(scopes)))
+    open_alerts = {(row.location_id, row.variant_id): row for row in db.execute(stmt)}
+
+    now = datetime.now(UTC)
+    to_insert: list[dict] = []
+    to_update: list[dict] = []
+    for key, scope in scopes.items():
+        if not scope.breached:
+            continue
+        alert = open_alerts.pop(key, None)
+        if alert is None:
+            to_insert.append(
+                {
+                    "company_id": scope.company_id,
+                    "location_id": scope.location_id,
+                    "variant_id": scope.variant_id,
+                    "alert_type": alert_type,
+                    "threshold_value": scope.threshold,
+                    "current_value": scope.current,
+                    "status": "open",
+                    "triggered_at": now,
+                }
+            )
+        elif float(alert.current_value) != scope.current:
+            to_update.append({"id": alert.id, "threshold_value": scope.threshold, "current_value": scope.current})
+
+    # Whatever is still in open_alerts was evaluated (or dropped out of scope) without breaching.
+    to_resolve = [
+        {"id": alert.id, "status": "resolved", "resolved_at": now}
+        for key, alert in open_alerts.items()
+        if full_scan or key in scopes
+    ]
+
+    if to_insert:
+        db.execute(insert(InvStockAlert), to_insert)
+    if to_update:
+        db.execute(update(InvStockAlert), to_update)
+    if to_resolve:
+        db.execute(update(InvStockAlert), to_resolve)
+    return {"opened": len(to_insert), "updated": len(to_update), "resolved": len(to_resolve)}
+
+
+def evaluate_touched(db: Session, pairs: Iterable[tuple[int, int]]) -> dict[str, int]:
+    """Re-check low_stock alerts for the (location_id, variant_id) pairs a write just touched.
+
+    Only pairs with a replenishment rule have a threshold; everything else is ignored.
+    Pending ORM changes are flushed first so the check sees the new balances.
+    """
+    pairs = list(set(pairs))
+    if not pairs:
+        return {"opened": 0, "updated": 0, "resolved": 0}
+    db.flush()
+
+    on_hand = (
+        select(
+            InvStockBalance.location_id,
+            InvStockBalance.variant_id,
+            func.sum(InvStockBalance.on_hand_qty).label("on_hand_qty"),
+        )
+        .where(tuple_(InvStockBalance.location_id, InvStockBalance.variant_id).in_(pairs))
+        .group_by(InvStockBalance.location_id, InvStockBalance.variant_id)
+        .subquery()
+    )
+    rows = db.execute(
+        select(
+            InvReplenishmentRule.company_id,
+            InvReplenishmentRule.location_id,
+            InvReplenishmentRule.variant_id,
+            cast(InvReplenishmentRule.min_qty, Float),
+            cast(func.coalesce(on_hand.c.on_hand_qty, 0), Float),
+        )
+        .outerjoin(
+            on_hand,
+            (on_hand.c.location_id == InvReplenishmentRule.location_id)
+            & (on_hand.c.variant_id == InvReplenishmentRule.variant_id),
+        )
+        .where(tuple_(InvReplenishmentRule.location_id, InvReplenishmentRule.variant_id).in_(pairs))
+    ).all()
+    return sync_alerts(db, (AlertScope(*row) for row in rows), alert_type=LOW_STOCK)
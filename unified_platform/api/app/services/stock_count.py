@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from datetime import UTC, datetime
+from decimal import Decimal
+
+from sqlalchemy import and_, func, insert, literal, select, update
+from sqlalchemy.orm import Session
+
+from app.models.inventory import (
+    InvCountLine,
+    InvCountSession,
+    InvStockBalance,
+    InvStockMovement,
+)
+from app.schemas.inventory import CountLineCreate
+from app.services.stock_alerts import evaluate_touched
+from app.services.valuation import ValuationMove, apply_valuation
+
+# Lines are applied in id ranges of this size so a 10k+ line session reports
+# progress and keeps each UPDATE ... FROM reasonably sized.
+CLOSE_CHUNK_SIZE = 2000
+
+ProgressCallback = Callable[[int, int], None]
+
+
+def upsert_count_lines(db: Session, *, session_id: int, lines: list[CountLineCreate]) -> dict[str, int]:
+    """Insert new count lines and update existing ones keyed by (variant_id, lot_id)."""
+    if not lines:
+        return {"inserted": 0, "updated": 0}
+
+    # Last entry wins when the same scope is posted twice in one payload.
+    incoming: dict[tuple[int, int | None], CountLineCreate] = {}
+    for line in lines:
+        incoming[(line.variant_id, line.lot_id)] = line
+
+    variant_ids = {variant_id for variant_id, _ in incoming}
+    existing: dict[tuple[int, int | None], int] = {
+        (row.variant_id, row.lot_id): row.id
+        for row in db.execute(
+            select(InvCountLine.id, InvCountLine.variant_id, InvCountLine.lot_id).where(
+                InvCountLine.session_id == session_id,
+                InvCountLine.variant_id.in_(variant_ids),
+            )
+        )
+    }
+
+    now = datetime.now(UTC)
+    to_update: list[dict] = []
+    to_insert: list[dict] = []
+    for key, line in incoming.items():
+        values = {
+            "expected_qty": line.expected_qty,
+            "counted_qty": line.counted_qty,
+            "diff_qty": line.counted_qty - line.expected_qty,
+            "reason_code": line.reason_code,
+            "updated_at": now,
+        }
+        line_id = existing.get(key)
+        if line_id is not None:
+            to_update.append({"id": line_id, **values})
+        else:
+            to_insert.append({"session_id": session_id, "variant_id": line.variant_id, "lot_id": line.lot_id, **values})
+
+    if to_update:
+        db.execute(update(InvCountLine), to_update)
+    if to_insert:
+        db.execute(insert(InvCountLine), to_insert)
+    return {"inserted": len(to_insert), "updated": len(to_update)}
+
+
+def _balance_join(session: InvCountSession):
+    return and_(
+        InvStockBalance.company_id == session.company_id,
+        InvStockBalance.location_id == session.location_id,
+        InvStockBalance.variant_id == InvCountLine.variant_id,
+        InvStockBalance.lot_id.is_not_distinct_from(InvCountLine.lot_id),
+        InvStockBalance.container_id.is_(None),
+    )
+
+
+def _apply_chunk(
+    db: Session, *, session: InvCountSession, user_id: int | None, now: datetime, low: int, high: int
+) -> list[ValuationMove]:
+    in_chunk = and_(InvCountLine.session_id == session.id, InvCountLine.id >= low, InvCountLine.id <= high)
+    on_hand = func.coalesce(InvStockBalance.on_hand_qty, 0)
+    diff = InvCountLine.counted_qty - on_hand
+
+    # 1. Adjustment movements for every line whose count differs from the live balance.
+    #    Must run before the balance update, which overwrites on_hand_qty.
+    movement_rows = (
+        select(
+            literal(session.company_id),
+            literal("count_adjustment"),
+            literal(session.location_id),
+            InvCountLine.variant_id,
+            InvCountLine.lot_id,
+            diff,
+            literal("pcs"),
+            InvCountLine.reason_code,
+            literal("count_session"),
+            literal(str(session.id)),
+            literal(user_id),
+            literal(now),
+        )
+        .select_from(InvCountLine)
+        .outerjoin(InvStockBalance, _balance_join(session))
+        .where(in_chunk, diff != 0)
+    )
+    result = db.execute(
+        insert(InvStockMovement)
+        .from_select(
+            [
+                "company_id",
+                "movement_type",
+                "dest_location_id",
+                "variant_id",
+                "lot_id",
+                "qty",
+                "uom",
+                "reason_code",
+                "source_doc_type",
+                "source_doc_id",
+                "moved_by",
+                "moved_at",
+            ],
+            movement_rows,
+        )
+        .returning(InvStockMovement.id, InvStockMovement.variant_id, InvStockMovement.qty)
+    )
+    moves = [ValuationMove(row.id, row.variant_id, session.location_id, Decimal(row.qty)) for row in result]
+
+    # 2. Overwrite existing balances in one UPDATE ... FROM inv_count_line.
+    db.execute(
+        update(InvStockBalance)
+        .where(_balance_join(session), in_chunk, InvStockBalance.on_hand_qty != InvCountLine.counted_qty)
+        .values(
+            on_hand_qty=InvCountLine.counted_qty,
+            available_qty=InvCountLine.counted_qty - InvStockBalance.reserved_qty,
+            updated_at=now,
+        )
+    )
+
+    # 3. Counted stock with no balance row yet.
+    missing = (
+        select(
+            literal(session.company_id),
+            literal(session.location_id),
+            InvCountLine.variant_id,
+            InvCountLine.lot_id,
+            InvCountLine.counted_qty,
+            literal(0),
+            InvCountLine.counted_qty,
+        )
+        .select_from(InvCountLine)
+        .outerjoin(InvStockBalance, _balance_join(session))
+        .where(in_chunk, InvStockBalance.id.is_(None), InvCountLine.counted_qty != 0)
+    )
+    db.execute(
+        insert(InvStockBalance).from_select(
+            ["company_id", "location_id", "variant_id", "lot_id", "on_hand_qty", "reserved_qty", "available_qty"],
+            missing,
+        )
+    )
+    return moves
+
+
+def close_count_session(
+    db: Session,
+    *,
+    session: InvCountSession,
+    user_id: int | None,
+    progress: ProgressCallback | None = None,
+    chunk_size: int = CLOSE_CHUNK_SIZE,
+) -> dict:
+    """Apply all count differences set-based and write count_adjustment movements.
+
+    The caller owns the transaction; nothing is committed here.
+    """
+    now = datetime.now(UTC)
+    bounds = db.execute(
+        select(func.min(InvCountLine.id), func.max(InvCountLine.id), func.count(InvCountLine.id)).where(
+            InvCountLine.session_id == session.id
+        )
+    ).one()
+    first_id, last_id, total = bounds[0], bounds[1], int(bounds[2] or 0)
+
+    moves: list[ValuationMove] = []
+    if total:
+        low = first_id
+        while low <= last_id:
+            high = low + chunk_size - 1
+            moves += _apply_chunk(db, session=session, user_id=user_id, now=now, low=low, high=high)
+            processed = int(
+                db.scalar(
+                    select(func.count(InvCountLine.id)).where(
+                        InvCountLine.session_id == session.id, InvCountLine.id <= high
+                    )
+                )
+                or 0
+            )
+            if progress:
+                progress(processed, total)
+            low = high + 1
+
+    apply_valuation(db, moves)
+    evaluate_touched(db, ((move.location_id, move.variant_id) for move in moves))
+
+    session.status = "closed"
+    session.closed_by = user_id
+    session.closed_at = now
+    return {"lines": total, "adjusted": len(moves)}
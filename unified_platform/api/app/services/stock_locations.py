@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import re
+from datetime import date
+
+from sqlalchemy import select
+
+from app.models.core import CoreLocation
+
+_DIGITS = re.compile(r"(\d+)")
+
+
+def path_key(code: str) -> tuple:
+    """Natural sort key for location codes, so A-2-10 comes after A-2-9."""
+    return tuple(int(part) if part.isdigit() else part for part in _DIGITS.split(code.upper()))
+
+
+def parse_expiry(value: str | None) -> date | None:
+    """Lot expiry as a date; missing or unreadable expiries are treated as none."""
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value[:10])
+    except ValueError:
+        return None
+
+
+def pick_order(expiry_date: date | None, location_code: str) -> tuple:
+    """Order in which a warehouse's stock of one variant is allocated: earliest-expiring
+    lots first, then along the pick path. Reservation, shipping and wave planning all
+    take stock in this order, so they agree on which balances a promise sits on."""
+    return (expiry_date is None, expiry_date or date.max, path_key(location_code))
+
+
+def locations_below(warehouse_ids: set[int]):
+    """CTE of (warehouse_id, location_id) for every warehouse and all locations nested below it."""
+    tree = (
+        select(CoreLocation.id.label("warehouse_id"), CoreLocation.id.label("location_id"))
+        .where(CoreLocation.id.in_(warehouse_ids))
+        .cte("warehouse_locations", recursive=True)
+    )
+    return tree.union_all(
+        select(tree.c.warehouse_id, CoreLocation.id).join(CoreLocation, CoreLocation.parent_location_id == tree.c.location_id)
+    )
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import ColumnElement, Text, cast, delete, func, insert, literal, or_, select, union_all
+from sqlalchemy.orm import Session
+
+from app.models.inventory import InvStockBalance, InvStockMovement, InvStockSnapshot, InvStockSnapshotRun
+
+# Daily runs older than this are thinned to the first run of each month.
+DAILY_SNAPSHOT_RETENTION_DAYS = 90
+
+
+def take_snapshot(db: Session, *, at: datetime | None = None) -> InvStockSnapshotRun:
+    """
+    Copy current on-hand per (variant, location) into a new snapshot run. The caller commits.
+    On a session that has not begun yet the transaction runs at REPEATABLE READ and its
+    first statement reads snapshot_at and the transaction snapshot, so the balances copied
+    are exactly those of the transactions that snapshot saw. moved_at is stamped before
+    commit, so a movement still in flight at snapshot_at can carry an earlier moved_at;
+    stock_as_of replays by transaction (every movement the snapshot did not see) rather than
+    by moved_at. `at` overrides the timestamp for backfills, which replay by moved_at.
+    """
+    if not db.in_transaction():
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+    snapshot_at, xact_snapshot = db.execute(
+        select(func.statement_timestamp(), cast(func.pg_current_snapshot(), Text))
+    ).one()
+    run = InvStockSnapshotRun(snapshot_at=at or snapshot_at, xact_snapshot=None if at else xact_snapshot)
+    db.add(run)
+    db.flush()
+
+    on_hand = func.sum(InvStockBalance.on_hand_qty)
+    result = db.execute(
+        insert(InvStockSnapshot).from_select(
+            ["run_id", "variant_id", "location_id", "on_hand_qty"],
+            select(literal(run.id), InvStockBalance.variant_id, InvStockBalance.location_id, on_hand)
+            .group_by(InvStockBalance.variant_id, InvStockBalance.location_id)
+            .having(on_hand != 0),
+        ),
+        # INSERT ... SELECT reports rowcount -1 unless asked to keep it.
+        execution_options={"preserve_rowcount": True},
+    )
+    run.row_count = result.rowcount or 0
+    return run
+
+
+def thin_snapshots(db: Session, *, now: datetime | None = None) -> int:
+    """Drop daily runs past the retention window, keeping the first run of each month."""
+    cutoff = (now or datetime.now(UTC)) - timedelta(days=DAILY_SNAPSHOT_RETENTION_DAYS)
+    month = func.date_trunc("month", InvStockSnapshotRun.snapshot_at)
+    keep = select(func.min(InvStockSnapshotRun.id)).group_by(month)
+    result = db.execute(
+        delete(InvStockSnapshotRun).where(
+            InvStockSnapshotRun.snapshot_at < cutoff,
+            InvStockSnapshotRun.id.notin_(keep),
+        )
+    )
+    return result.rowcount or 0
+
+
+def _unseen_by(xact_snapshot: str) -> ColumnElement[bool]:
+    """Movements written by transactions a pg_snapshot ("xmin:xmax:xip,...") did not see."""
+    _, xmax, xip = xact_snapshot.split(":")
+    unseen = InvStockMovement.xact_id >= int(xmax)
+    in_flight = [int(xid) for xid in xip.split(",") if xid]
+    if in_flight:
+        unseen = or_(unseen, InvStockMovement.xact_id.in_(in_flight))
+    return unseen
+
+
+def _signed_deltas(*, variant_id: int, run: InvStockSnapshotRun | None, until: datetime):
+    """Per-movement signed quantity per location, for movements after `run`: dest gains qty, source loses qty."""
+    window = [InvStockMovement.variant_id == variant_id, InvStockMovement.moved_at <= until]
+    if run is not None and run.xact_snapshot:
+        window.append(_unseen_by(run.xact_snapshot))
+    elif run is not None:
+        window.append(InvStockMovement.moved_at > run.snapshot_at)
+    inbound = select(
+        InvStockMovement.dest_location_id.label("location_id"),
+        InvStockMovement.qty.label("delta"),
+    ).where(*window, InvStockMovement.dest_location_id.is_not(None))
+    outbound = select(
+        InvStockMovement.source_location_id.label("location_id"),
+        (-InvStockMovement.qty).label("delta"),
+    ).where(*window, InvStockMovement.source_location_id.is_not(None))
+    return union_all(inbound, outbound).subquery()
+
+
+def stock_as_of(db: Session, *, variant_id: int, at: datetime, location_id: int | None = None) -> dict:
+    """
+    On-hand for a variant at a past instant.
+    Starts from the latest snapshot taken at or before `at` and replays the movements
+    that snapshot did not see, up to `at`.
+    """
+    run = db.scalar(
+        select(InvStockSnapshotRun)
+        .where(InvStockSnapshotRun.snapshot_at <= at)
+        .order_by(InvStockSnapshotRun.snapshot_at.desc())
+        .limit(1)
+    )
+
+    quantities: dict[int, float] = {}
+    if run is not None:
+        base = select(InvStockSnapshot.location_id, InvStockSnapshot.on_hand_qty).where(
+            InvStockSnapshot.run_id == run.id, InvStockSnapshot.variant_id == variant_id
+        )
+        if location_id:
+            base = base.where(InvStockSnapshot.location_id == location_id)
+        for loc, qty in db.execute(base):
+            quantities[loc] = float(qty)
+
+    deltas = _signed_deltas(variant_id=variant_id, run=run, until=at)
+    replay = select(deltas.c.location_id, func.sum(deltas.c.delta), func.count()).group_by(deltas.c.location_id)
+    if location_id:
+        replay = replay.where(deltas.c.location_id == location_id)
+    replayed = 0
+    for loc, delta, count in db.execute(replay):
+        quantities[loc] = quantities.get(loc, 0.0) + float(delta)
+        replayed += count
+    if location_id:
+        quantities.setdefault(location_id, 0.0)
+
+    return {
+        "variant_id": variant_id,
+        "as_of": at.isoformat(),
+        "snapshot_at": run.snapshot_at.isoformat() if run else None,
+        "replayed_deltas": replayed,
+        "locations": [
+            {"location_id": loc, "on_hand_qty": round(qty, 2)}
+            for loc, qty in sorted(quantities.items())
+            if qty != 0 or loc == location_id
+        ],
+    }
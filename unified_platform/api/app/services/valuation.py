@@ -0,0 +1,280 @@
+from __future__ import annotations
+
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from decimal import Decimal
+
+from sqlalchemy import func, insert, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.inventory import InvValuationLayer, InvValuationSummary
+from app.models.procurement import ProcPurchaseOrderLine
+
+_COST_QUANT = Decimal("0.0001")
+_ZERO = Decimal("0")
+
+
+@dataclass(slots=True)
+class ValuationMove:
+    """One stock movement at one location. Positive qty enters, negative qty leaves."""
+
+    movement_id: int
+    variant_id: int
+    location_id: int
+    qty: Decimal
+    unit_cost: Decimal | None = None
+
+
+@dataclass(slots=True)
+class OpenLayer:
+    id: int
+    remaining_qty: Decimal
+    remaining_cost: Decimal
+
+
+@dataclass(slots=True)
+class _Summary:
+    qty_on_hand: Decimal = _ZERO
+    fifo_value: Decimal = _ZERO
+    wac_value: Decimal = _ZERO
+    last_unit_cost: Decimal | None = None
+
+    @property
+    def wac_unit_cost(self) -> Decimal | None:
+        if self.qty_on_hand > 0:
+            return self.wac_value / self.qty_on_hand
+        return self.last_unit_cost
+
+
+def consume_fifo(layers: deque[OpenLayer], qty: Decimal) -> tuple[Decimal, Decimal, list[OpenLayer]]:
+    """Take qty from the oldest layers first.
+
+    Returns (consumed_qty, consumed_cost, touched_layers). Fully consumed layers are
+    popped from the deque; consumed_qty is lower than qty when stock runs out.
+    """
+    consumed_qty = _ZERO
+    consumed_cost = _ZERO
+    touched: list[OpenLayer] = []
+    while qty > consumed_qty and layers:
+        layer = layers[0]
+        take = min(layer.remaining_qty, qty - consumed_qty)
+        if take == layer.remaining_qty:
+            cost = layer.remaining_cost
+            layers.popleft()
+        else:
+            cost = (layer.remaining_cost * take / layer.remaining_qty).quantize(_COST_QUANT)
+        layer.remaining_qty -= take
+        layer.remaining_cost -= cost
+        consumed_qty += take
+        consumed_cost += cost
+        touched.append(layer)
+    return consumed_qty, consumed_cost, touched
+
+
+def _fallback_costs(db: Session, variant_ids: set[int]) -> dict[int, Decimal]:
+    """Latest purchase cost per variant, used when inbound stock arrives without a cost."""
+    if not variant_ids:
+        return {}
+    rows = db.execute(
+        select(ProcPurchaseOrderLine.variant_id, ProcPurchaseOrderLine.unit_cost)
+        .where(ProcPurchaseOrderLine.variant_id.in_(variant_ids))
+        .order_by(ProcPurchaseOrderLine.variant_id, ProcPurchaseOrderLine.id.desc())
+        .distinct(ProcPurchaseOrderLine.variant_id)
+    )
+    return {variant_id: Decimal(unit_cost) for variant_id, unit_cost in rows}
+
+
+def apply_valuation(db: Session, moves: list[ValuationMove]) -> list[Decimal]:
+    """Write FIFO layers and update the per-(variant, location) summary for a batch of moves.
+
+    Inbound moves open a FIFO layer at their unit cost (or the current WAC / latest PO
+    cost when none is given). Outbound moves consume open layers oldest-first and write
+    a costed out-layer. Returns the unit cost applied to each move, in order.
+    """
+    if not moves:
+        return []
+
+    keys = {(move.variant_id, move.location_id) for move in moves}
+    summaries: dict[tuple[int, int], _Summary] = defaultdict(_Summary)
+    for row in db.execute(
+        select(
+            InvValuationSummary.variant_id,
+            InvValuationSummary.location_id,
+            InvValuationSummary.qty_on_hand,
+            InvValuationSummary.fifo_value,
+            InvValuationSummary.wac_value,
+            InvValuationSummary.last_unit_cost,
+        )
+        .where(tuple_(InvValuationSummary.variant_id, InvValuationSummary.location_id).in_(keys))
+        .with_for_update()
+    ):
+        summaries[(row.variant_id, row.location_id)] = _Summary(
+            qty_on_hand=Decimal(row.qty_on_hand),
+            fifo_value=Decimal(row.fifo_value),
+            wac_value=Decimal(row.wac_value),
+            last_unit_cost=Decimal(row.last_unit_cost) if row.last_unit_cost is not None else None,
+        )
+
+    open_layers: dict[tuple[int, int], deque[OpenLayer]] = defaultdict(deque)
+    if any(move.qty < 0 for move in moves):
+        for row in db.execute(
+            select(
+                InvValuationLayer.id,
+                InvValuationLayer.variant_id,
+                InvValuationLayer.location_id,
+                InvValuationLayer.remaining_qty,
+                InvValuationLayer.remaining_cost,
+            )
+            .where(
+                tuple_(InvValuationLayer.variant_id, InvValuationLayer.location_id).in_(keys),
+                InvValuationLayer.remaining_qty > 0,
+            )
+            .order_by(InvValuationLayer.id)
+            .with_for_update()
+        ):
+            open_layers[(row.variant_id, row.location_id)].append(
+                OpenLayer(id=row.id, remaining_qty=Decimal(row.remaining_qty), remaining_cost=Decimal(row.remaining_cost))
+            )
+
+    uncosted = {
+        move.variant_id
+        for move in moves
+        if move.qty > 0 and move.unit_cost is None and summaries[(move.variant_id, move.location_id)].wac_unit_cost is None
+    }
+    fallback = _fallback_costs(db, uncosted)
+
+    new_layers: list[dict] = []
+    changed_layers: dict[int, OpenLayer] = {}
+    unit_costs: list[Decimal] = []
+    for move in moves:
+        key = (move.variant_id, move.location_id)
+        summary = summaries[key]
+        qty = Decimal(move.qty)
+        if qty > 0:
+            unit_cost = move.unit_cost
+            if unit_cost is None:
+                unit_cost = summary.wac_unit_cost
+            if unit_cost is None:
+                unit_cost = fallback.get(move.variant_id, _ZERO)
+            unit_cost = Decimal(unit_cost).quantize(_COST_QUANT)
+            total = (qty * unit_cost).quantize(_COST_QUANT)
+            # Units negative stock owed were already shipped: they settle here and never enter the layer.
+            owed = min(qty, max(-summary.qty_on_hand, _ZERO))
+            remaining_qty = qty - owed
+            remaining_cost = (remaining_qty * unit_cost).quantize(_COST_QUANT)
+            if remaining_qty > 0:
+                # Later moves of the batch consume it like a stored layer; a negative id points into new_layers.
+                open_layers[key].append(
+                    OpenLayer(id=-len(new_layers) - 1, remaining_qty=remaining_qty, remaining_cost=remaining_cost)
+                )
+            new_layers.append(
+                {
+                    "movement_id": move.movement_id,
+                    "variant_id": move.variant_id,
+                    "location_id": move.location_id,
+                    "method": "fifo",
+                    "qty_in": qty,
+                    "qty_out": _ZERO,
+                    "unit_cost": unit_cost,
+                    "total_cost": total,
+                    "remaining_qty": remaining_qty,
+                    "remaining_cost": remaining_cost,
+                }
+            )
+            if summary.qty_on_hand < 0:
+                # The units negative stock owed are settled at this receipt's cost.
+                summary.wac_value = ((summary.qty_on_hand + qty) * unit_cost).quantize(_COST_QUANT)
+            else:
+                summary.wac_value += total
+            summary.qty_on_hand += qty
+            summary.fifo_value += remaining_cost
+            summary.last_unit_cost = unit_cost
+        elif qty < 0:
+            out_qty = -qty
+            running_unit = summary.wac_unit_cost
+            wac_unit = running_unit or _ZERO
+            consumed_qty, consumed_cost, touched = consume_fifo(open_layers[key], out_qty)
+            for layer in touched:
+                if layer.id < 0:
+                    new_layers[-layer.id - 1].update(remaining_qty=layer.remaining_qty, remaining_cost=layer.remaining_cost)
+                else:
+                    changed_layers[layer.id] = layer
+            # Stock that was never layered (negative on-hand) is costed at WAC.
+            total = consumed_cost + ((out_qty - consumed_qty) * wac_unit).quantize(_COST_QUANT)
+            unit_cost = (total / out_qty).quantize(_COST_QUANT)
+            new_layers.append(
+                {
+                    "movement_id": move.movement_id,
+                    "variant_id": move.variant_id,
+                    "location_id": move.location_id,
+                    "method": "fifo",
+                    "qty_in": _ZERO,
+                    "qty_out": out_qty,
+                    "unit_cost": unit_cost,
+                    "total_cost": total,
+                    "remaining_qty": _ZERO,
+                    "remaining_cost": _ZERO,
+                }
+            )
+            summary.qty_on_hand -= out_qty
+            summary.fifo_value -= consumed_cost
+            if summary.qty_on_hand > 0:
+                summary.wac_value -= (out_qty * wac_unit).quantize(_COST_QUANT)
+            else:
+                # Empty or negative stock keeps the unit cost it ran out at: value = qty x that cost.
+                # A scope that never had a cost keeps None, so its next receipt still falls back to the PO cost.
+                summary.last_unit_cost = None if running_unit is None else running_unit.quantize(_COST_QUANT)
+                summary.wac_value = (summary.qty_on_hand * wac_unit).quantize(_COST_QUANT)
+        else:
+            unit_cost = summary.wac_unit_cost or _ZERO
+        unit_costs.append(unit_cost)
+
+    if new_layers:
+        db.execute(insert(InvValuationLayer), new_layers)
+    if changed_layers:
+        db.execute(
+            update(InvValuationLayer),
+            [
+                {"id": layer.id, "remaining_qty": layer.remaining_qty, "remaining_cost": layer.remaining_cost}
+                for layer in changed_layers.values()
+            ],
+        )
+
+    now = datetime.now(UTC)
+    stmt = pg_insert(InvValuationSummary)
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_inv_valuation_summary_scope",
+        set_={
+            "qty_on_hand": stmt.excluded.qty_on_hand,
+            "fifo_value": stmt.excluded.fifo_value,
+            "wac_value": stmt.excluded.wac_value,
+            "last_unit_cost": stmt.excluded.last_unit_cost,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    db.execute(
+        stmt,
+        [
+            {
+                "variant_id": variant_id,
+                "location_id": location_id,
+                "qty_on_hand": summary.qty_on_hand,
+                "fifo_value": summary.fifo_value,
+                "wac_value": summary.wac_value,
+                "last_unit_cost": summary.last_unit_cost,
+                "updated_at": now,
+            }
+            for (variant_id, location_id), summary in summaries.items()
+        ],
+    )
+    return unit_costs
+
+
+def stock_value(db: Session, *, method: str, location_id: int | None = None) -> float:
+    column = InvValuationSummary.fifo_value if method == "fifo" else InvValuationSummary.wac_value
+    stmt = select(func.coalesce(func.sum(column), 0))
+    if location_id:
+        stmt = stmt.where(InvValuationSummary.location_id == location_id)
+    return float(db.scalar(stmt) or 0)
@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass, field, replace
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import func, literal, select, tuple_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.core import CoreLocation
+from app.models.inventory import InvLot, InvStockBalance
+from app.models.pim import PimProductVariant
+from app.models.sales import SalesOrder, SalesOrderLine
+from app.services.order_transitions import WAVE_TRANSITIONS
+from app.services.stock_locations import locations_below, parse_expiry, path_key, pick_order
+
+_ZERO = Decimal("0")
+
+
+@dataclass(slots=True)
+class WaveLine:
+    order_id: int
+    warehouse_id: int
+    variant_id: int
+    qty: Decimal
+
+
+@dataclass(slots=True)
+class StockSlot:
+    """Pickable stock of one variant in one bin (and lot) below a warehouse."""
+
+    warehouse_id: int
+    variant_id: int
+    location_id: int
+    location_code: str
+    lot_id: int | None
+    expiry_date: date | None
+    qty: Decimal
+
+
+@dataclass(slots=True)
+class PickLine:
+    location_id: int
+    location_code: str
+    variant_id: int
+    lot_id: int | None
+    qty: Decimal = _ZERO
+    # put-wall slot -> qty
+    puts: dict[int, Decimal] = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class WavePlan:
+    slots: dict[int, int]  # order_id -> put-wall slot
+    picks: list[PickLine]
+    # (order_id, variant_id) -> qty that could not be allocated
+    shortages: dict[tuple[int, int], Decimal]
+
+
+def plan_wave(
+    lines: list[WaveLine], stock: list[StockSlot], held: dict[tuple[int, int], Decimal] | None = None
+) -> WavePlan:
+    """Allocate a wave's demand from bin stock and order the picks along the path.
+
+    Orders get put-wall slots 1..n in order id order. Each variant is taken from the
+    earliest-expiring lots first, then along the pick path (pick_order); within a
+    variant, orders are served in slot order. `held` is the quantity of each
+    (warehouse, variant) promised outside the wave; it comes off the front of that
+    order first, as the orders holding it are picked the same way. The returned picks
+    are sorted by location code.
+    """
+    slots = {order_id: slot for slot, order_id in enumerate(sorted({line.order_id for line in lines}), start=1)}
+    held = held or {}
+
+    demand: dict[tuple[int, int], list[WaveLine]] = defaultdict(list)
+    for line in sorted(lines, key=lambda line: slots[line.order_id]):
+        demand[(line.warehouse_id, line.variant_id)].append(line)
+
+    sources: dict[tuple[int, int], list[StockSlot]] = defaultdict(list)
+    for slot in stock:
+        if slot.qty > 0 and (slot.warehouse_id, slot.variant_id) in demand:
+            sources[(slot.warehouse_id, slot.variant_id)].append(slot)
+
+    picks: dict[tuple[int, int, int | None], PickLine] = {}
+    shortages: dict[tuple[int, int], Decimal] = {}
+    for key, wanted in demand.items():
+        skip = held.get(key, _ZERO)
+        available: list[StockSlot] = []
+        for source in sorted(sources.get(key, []), key=lambda slot: pick_order(slot.expiry_date, slot.location_code)):
+            taken = min(skip, source.qty)
+            skip -= taken
+            if source.qty > taken:
+                available.append(replace(source, qty=source.qty - taken))
+        position = 0
+        left = available[0].qty if available else _ZERO
+        for line in wanted:
+            need = line.qty
+            while need > 0 and position < len(available):
+                source = available[position]
+                take = min(need, left)
+                pick = picks.get((source.location_id, source.variant_id, source.lot_id))
+                if pick is None:
+                    pick = PickLine(source.location_id, source.location_code, source.variant_id, source.lot_id)
+                    picks[(source.location_id, source.variant_id, source.lot_id)] = pick
+                pick.qty += take
+                slot = slots[line.order_id]
+                pick.puts[slot] = pick.puts.get(slot, _ZERO) + take
+                need -= take
+                left -= take
+                if left == 0:
+                    position += 1
+                    left = available[position].qty if position < len(available) else _ZERO
+            if need > 0:
+                short_key = (line.order_id, line.variant_id)
+                shortages[short_key] = shortages.get(short_key, _ZERO) + need
+
+    ordered = sorted(picks.values(), key=lambda pick: (path_key(pick.location_code), pick.variant_id, pick.lot_id or 0))
+    return WavePlan(slots=slots, picks=ordered, shortages=shortages)
+
+
+def load_wave(
+    db: Session, order_ids: list[int]
+) -> tuple[list[WaveLine], list[StockSlot], dict[tuple[int, int], Decimal], list[int]]:
+    """Demand, bin stock and held quantities for the pickable orders among order_ids, plus the ids that are not pickable.
+
+    Stock is every balance at or below the order's warehouse, the scope reservation works
+    on. Held is what that stock already owes elsewhere: reservations of orders outside
+    the wave, plus units picked for orders not yet shipped beyond their reservation.
+    """
+    pickable = WAVE_TRANSITIONS["pick"].from_statuses
+    statuses = dict(db.execute(select(SalesOrder.id, SalesOrder.status).where(SalesOrder.id.in_(order_ids))).all())
+    rejected = [order_id for order_id in dict.fromkeys(order_ids) if statuses.get(order_id) not in pickable]
+    accepted = [order_id for order_id in statuses if statuses[order_id] in pickable]
+    if not accepted:
+        return [], [], {}, rejected
+
+    warehouse = func.coalesce(SalesOrder.warehouse_location_id, literal(settings.wgr_location_id))
+    lines: list[WaveLine] = []
+    own_reserved: dict[tuple[int, int], Decimal] = defaultdict(Decimal)
+    for order_id, warehouse_id, variant_id, qty, reserved in db.execute(
+        select(
+            SalesOrderLine.order_id,
+            warehouse,
+            SalesOrderLine.variant_id,
+            SalesOrderLine.quantity - SalesOrderLine.picked_qty,
+            SalesOrderLine.reserved_qty,
+        )
+        .join(SalesOrder, SalesOrder.id == SalesOrderLine.order_id)
+        .where(
+            SalesOrderLine.order_id.in_(accepted),
+            SalesOrderLine.variant_id.is_not(None),
+            SalesOrderLine.quantity > SalesOrderLine.picked_qty,
+        )
+    ):
+        lines.append(WaveLine(order_id, warehouse_id, variant_id, Decimal(qty)))
+        own_reserved[(warehouse_id, variant_id)] += Decimal(reserved)
+    if not lines:
+        return [], [], {}, rejected
+
+    tree = locations_below({line.warehouse_id for line in lines})
+    keys = {(line.warehouse_id, line.variant_id) for line in lines}
+    stock: list[StockSlot] = []
+    held: dict[tuple[int, int], Decimal] = defaultdict(Decimal)
+    for warehouse_id, variant_id, location_id, code, lot_id, expiry, on_hand, reserved in db.execute(
+        select(
+            tree.c.warehouse_id,
+            InvStockBalance.variant_id,
+            InvStockBalance.location_id,
+            CoreLocation.code,
+            InvStockBalance.lot_id,
+            InvLot.expiry_date,
+            InvStockBalance.on_hand_qty,
+            InvStockBalance.reserved_qty,
+        )
+        .join(tree, tree.c.location_id == InvStockBalance.location_id)
+        .join(CoreLocation, CoreLocation.id == InvStockBalance.location_id)
+        .outerjoin(InvLot, InvLot.id == InvStockBalance.lot_id)
+        .where(tuple_(tree.c.warehouse_id, InvStockBalance.variant_id).in_(keys))
+    ):
+        held[(warehouse_id, variant_id)] += Decimal(reserved)
+        if on_hand > 0:
+            stock.append(StockSlot(warehouse_id, variant_id, location_id, code, lot_id, parse_expiry(expiry), Decimal(on_hand)))
+
+    # Picked but not shipped: the units left their bins while on_hand still counts them.
+    in_flight = WAVE_TRANSITIONS["pack"].from_statuses | WAVE_TRANSITIONS["ship"].from_statuses
+    for warehouse_id, variant_id, qty in db.execute(
+        select(
+            warehouse,
+            SalesOrderLine.variant_id,
+            func.sum(
+                func.greatest(SalesOrderLine.picked_qty - SalesOrderLine.shipped_qty - SalesOrderLine.reserved_qty, 0)
+            ),
+        )
+        .join(SalesOrder, SalesOrder.id == SalesOrderLine.order_id)
+        .where(SalesOrder.status.in_(in_flight), tuple_(warehouse, SalesOrderLine.variant_id).in_(keys))
+        .group_by(warehouse, SalesOrderLine.variant_id)
+    ):
+        held[(warehouse_id, variant_id)] += Decimal(qty)
+    for key, qty in own_reserved.items():
+        held[key] -= qty
+    return lines, stock, {key: qty for key, qty in held.items() if qty > 0}, rejected
+
+
+def serialize_plan(db: Session, plan: WavePlan) -> dict:
+    skus = dict(
+        db.execute(
+            select(PimProductVariant.id, PimProductVariant.sku).where(
+                PimProductVariant.id.in_({pick.variant_id for pick in plan.picks} | {v for _, v in plan.shortages})
+            )
+        ).all()
+    )
+    return {
+        "slots": [{"order_id": order_id, "slot": slot} for order_id, slot in plan.slots.items()],
+        "picks": [
+            {
+                "sequence": sequence,
+                "location_id": pick.location_id,
+                "location_code": pick.location_code,
+                "variant_id": pick.variant_id,
+                "sku": skus.get(pick.variant_id),
+                "lot_id": pick.lot_id,
+                "qty": pick.qty,
+                "puts": [{"slot": slot, "qty": qty} for slot, qty in sorted(pick.puts.items())],
+            }
+            for sequence, pick in enumerate(plan.picks, start=1)
+        ],
+        "shortages": [
+            {"order_id": order_id, "variant_id": variant_id, "sku": skus.get(variant_id), "qty": qty}
+            for (order_id, variant_id), qty in plan.shortages.items()
+        ],
+    }
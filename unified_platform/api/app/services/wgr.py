@@ -4,14 +4,27 @@ import asyncio
 import logging
 import time
 from datetime import datetime
+from typing import TYPE_CHECKING
 
 import httpx
 
+if TYPE_CHECKING:
+    from app.models.integration import IntStoreConnection
+
 logger = logging.getLogger(__name__)
 
 _RETRY_DELAYS = [1, 2, 4]
 
 
+def stock_location_id(conn: IntStoreConnection) -> int:
+    """Location a WGR connection's stock is booked at and pushed from (best-effort: its store channel id).
+
+    WGR holds one figure per article for this location only: poll_stock books it on the
+    location's untracked balance, so that balance is all the connection may be sent.
+    """
+    return conn.store_channel_id
+
+
 class WGRClient:
     """JSON-RPC client for Wikinggruppen (WGR) warehouse API."""
 
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import logging
+
+from app.db.session import SessionLocal
+from app.models.inventory import InvCountSession
+from app.services.audit import log_audit_event
+from app.services.replenishment import run_replenishment as apply_replenishment
+from app.services.stock_count import close_count_session as apply_count_session
+from app.services.stock_snapshot import take_snapshot, thin_snapshots
+from app.worker import celery_app
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(name="app.tasks.inventory.close_count_session", bind=True, max_retries=0)
+def close_count_session(self, session_id: int, user_id: int | None) -> dict:  # type: ignore[override]
+    """
+    Close a large count session in the background.
+    Progress is published as Celery task state: PROGRESS {processed, total}.
+    """
+    db = SessionLocal()
+    try:
+        session = db.get(InvCountSession, session_id)
+        if session is None or session.status == "closed":
+            return {"status": "skipped", "session_id": session_id}
+
+        def report(processed: int, total: int) -> None:
+            self.update_state(state="PROGRESS", meta={"processed": processed, "total": total})
+
+        result = apply_count_session(db, session=session, user_id=user_id, progress=report)
+        # Same audit row as the synchronous close in the route.
+        log_audit_event(
+            db,
+            actor_user_id=user_id,
+            entity_type="inv_count_session",
+            entity_id=str(session.id),
+            action="close",
+            before={"status": "in_progress"},
+            after={"status": session.status, **result},
+        )
+        db.commit()
+        logger.info("Count session %d closed: lines=%d adjusted=%d", session_id, result["lines"], result["adjusted"])
+        return {"status": "closed", "session_id": session_id, **result}
+    except Exception as exc:
+        db.rollback()
+        session = db.get(InvCountSession, session_id)
+        if session is not None and session.status == "closing":
+            session.status = "in_progress"
+            db.commit()
+        logger.exception("close_count_session failed for session %d: %s", session_id, exc)
+        raise
+    finally:
+        db.close()
+
+
+@celery_app.task(name="app.tasks.inventory.run_replenishment", bind=True, max_retries=1)
+def run_replenishment(self) -> dict:  # type: ignore[override]
+    """
+    Recompute reorder suggestions and low_stock alerts for every replenishment rule.
+    Runs on beat schedule and on demand via POST /inventory/replenishment/run.
+    """
+    db = SessionLocal()
+    try:
+        result = apply_replenishment(db)
+        db.commit()
+        logger.info(
+            "Replenishment run: rules=%d suggestions=%d alerts opened=%d resolved=%d",
+            result["rules"],
+            result["suggestions"],
+            result["opened"],
+            result["resolved"],
+        )
+        return result
+    except Exception as exc:
+        db.rollback()
+        logger.exception("run_replenishment failed: %s", exc)
+        raise self.retry(exc=exc, countdown=60)
+    finally:
+        db.close()
+
+
+@celery_app.task(name="app.tasks.inventory.snapshot_stock", bind=True, max_retries=3)
+def snapshot_stock(self) -> dict:  # type: ignore[override]
+    """Daily per-(variant, location) on-hand snapshot used as the base for as-of queries."""
+    db = SessionLocal()
+    try:
+        run = take_snapshot(db)
+        thinned = thin_snapshots(db)
+        db.commit()
+        logger.info("Stock snapshot %d: rows=%d thinned_runs=%d", run.id, run.row_count, thinned)
+        return {"run_id": run.id, "rows": run.row_count, "thinned_runs": thinned}
+    except Exception as exc:
+        db.rollback()
+        logger.exception("snapshot_stock failed: %s", exc)
+        raise self.retry(exc=exc, countdown=300)
+    finally:
+        db.close()
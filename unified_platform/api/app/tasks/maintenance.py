@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import logging
+from datetime import timedelta
+from pathlib import Path
+
+from app.core.config import settings
+from app.db.partitions import PARTITIONED_TABLES, ensure_current_partitions
+from app.db.session import SessionLocal
+from app.services.archive import archive_partition, expired_partitions
+from app.services.sales_rollup import backfill_sales_rollup, local_today
+from app.worker import celery_app
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------------------------
+# ensure_partitions
+# ---------------------------------------------------------------------------
+
+
+@celery_app.task(name="app.tasks.maintenance.ensure_partitions", bind=True, max_retries=3)
+def ensure_partitions(self) -> dict:  # type: ignore[override]
+    """
+    Create monthly partitions for the current month and the next MONTHS_AHEAD months,
+    so rows never pile up in the default partition.
+    """
+    db = SessionLocal()
+    try:
+        conn = db.connection()
+        created = {table: ensure_current_partitions(conn, table) for table in PARTITIONED_TABLES}
+        db.commit()
+        return created
+    except Exception as exc:
+        db.rollback()
+        logger.exception("ensure_partitions failed: %s", exc)
+        raise self.retry(exc=exc, countdown=300)
+    finally:
+        db.close()
+
+
+# ---------------------------------------------------------------------------
+# archive_partitions
+# ---------------------------------------------------------------------------
+
+
+@celery_app.task(name="app.tasks.maintenance.archive_partitions", bind=True, max_retries=0)
+def archive_partitions(self) -> dict:  # type: ignore[override]
+    """
+    Detach partitions older than PARTITION_RETENTION_MONTHS, write them to gzip'd CSV
+    under ARCHIVE_DIR and drop them. Each partition is its own transaction.
+    """
+    archive_dir = Path(settings.archive_dir)
+    archived: list[str] = []
+    skipped: list[str] = []
+    db = SessionLocal()
+    try:
+        candidates = expired_partitions(db, retention_months=settings.partition_retention_months)
+        db.rollback()
+        for table, partition in candidates:
+            try:
+                path = archive_partition(db, table, partition, archive_dir)
+                db.commit()
+            except Exception as exc:
+                db.rollback()
+                logger.exception("Archiving %s failed: %s", partition.name, exc)
+                skipped.append(partition.name)
+                continue
+            if path is None:
+                skipped.append(partition.name)
+            else:
+                archived.append(partition.name)
+                logger.info("Archived %s to %s", partition.name, path)
+        return {"archived": archived, "skipped": skipped}
+    finally:
+        db.close()
+
+
+# ---------------------------------------------------------------------------
+# rebuild_sales_rollup
+# ---------------------------------------------------------------------------
+
+
+@celery_app.task(name="app.tasks.maintenance.rebuild_sales_rollup", bind=True, max_retries=3)
+def rebuild_sales_rollup(self, days: int | None = 7) -> dict:  # type: ignore[override]
+    """
+    Rebuild sales_daily_rollup from orders for the last `days` days, or entirely when days is None.
+    The rollup is kept current on order writes; the nightly run repairs days touched outside those paths.
+    """
+    db = SessionLocal()
+    try:
+        since = local_today() - timedelta(days=days - 1) if days is not None else None
+        result = backfill_sales_rollup(db, since=since)
+        db.commit()
+        logger.info("Sales rollup rebuilt since %s: orders=%d", since or "the beginning", result["orders"])
+        return {"since": since.isoformat() if since else None, **result}
+    except Exception as exc:
+        db.rollback()
+        logger.exception("rebuild_sales_rollup failed: %s", exc)
+        raise self.retry(exc=exc, countdown=300)
+    finally:
+        db.close()
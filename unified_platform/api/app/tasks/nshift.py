@@ -12,6 +12,7 @@ from app.db.session import SessionLocal
 from app.models.integration import IntExternalIdMap, IntStoreConnection, IntSyncQueue
 from app.models.sales import SalesOrder, SalesOrderLine
 from app.services.nshift import NShiftClient
+from app.services.reservation import consume_orders, enqueue_stock_pushes
 from app.services.wgr import WGRClient
 from app.worker import celery_app
 from app.ws.manager import ws_manager
@@ -84,6 +85,7 @@ def process_queue(self):  # type: ignore[override]
             # Update SalesOrder
             order.status = "shipped"
             order.shipped_at = _now()
+            enqueue_stock_pushes(db, consume_orders(db, [order.id]))
 
             # Try to update WooCommerce or WGR depending on channel_type
             if order.channel_type == "woocommerce" and order.store_connection_id:
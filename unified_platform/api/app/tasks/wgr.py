@@ -3,15 +3,21 @@ from __future__ import annotations
 import asyncio
 import logging
 from datetime import UTC, datetime
+from decimal import Decimal
 
 from sqlalchemy import select
 
+from app.core.config import settings
 from app.db.session import SessionLocal
-from app.models.integration import IntExternalIdMap, IntStoreConnection, IntSyncQueue
+from app.models.integration import IntExternalIdMap, IntStoreConnection, IntSyncError, IntSyncQueue
 from app.models.inventory import InvStockBalance, InvStockMovement
 from app.models.pim import PimProductVariant
 from app.models.sales import SalesOrder, SalesOrderLine
-from app.services.wgr import WGRClient
+from app.services.reservation import enqueue_stock_pushes, reserve_orders
+from app.services.sales_rollup import sync_sales_rollup
+from app.services.stock_alerts import evaluate_touched
+from app.services.valuation import ValuationMove, apply_valuation
+from app.services.wgr import WGRClient, stock_location_id
 from app.worker import celery_app
 from app.ws.manager import ws_manager
 
@@ -31,8 +37,12 @@ def _now() -> datetime:
 def poll_stock(self):  # type: ignore[override]
     """
     Poll WGR for stock changes since last_sync_at.
-    Updates InvStockBalance and InvStockMovement, then enqueues stock.push for
-    every active WooCommerce connection.
+    Updates InvStockBalance and InvStockMovement, then enqueues stock.push with the
+    resulting available quantity for every active WooCommerce connection.
+
+    WGR gets the available quantity of its stock location pushed (push_stock), so the
+    figure it reports is sellable stock there: on_hand is that figure plus what is
+    reserved at that location.
     """
     db = SessionLocal()
     try:
@@ -43,14 +53,9 @@ def poll_stock(self):  # type: ignore[override]
             )
         ).all()
 
-        woo_connections = db.scalars(
-            select(IntStoreConnection).where(
-                IntStoreConnection.provider == "woocommerce",
-                IntStoreConnection.active.is_(True),
-            )
-        ).all()
-
         total_updated = 0
+        touched: set[tuple[int, int]] = set()
+        movements: list[InvStockMovement] = []
 
         for conn in wgr_connections:
             client = WGRClient(conn.api_base_url, conn.consumer_key, conn.consumer_secret)
@@ -79,54 +84,67 @@ def poll_stock(self):  # type: ignore[override]
                     logger.debug("WGR stock: no variant for SKU '%s', skipping", sku)
                     continue
 
-                # Upsert InvStockBalance
+                # Upsert the untracked balance at the connection's location, the one push_stock sends.
+                location_id = stock_location_id(conn)
                 balance = db.scalar(
                     select(InvStockBalance).where(
                         InvStockBalance.variant_id == variant.id,
-                        InvStockBalance.location_id == conn.store_channel_id,  # best-effort location mapping
+                        InvStockBalance.location_id == location_id,
                         InvStockBalance.lot_id.is_(None),
                         InvStockBalance.container_id.is_(None),
                     )
                 )
                 if balance is None:
+                    previous_qty = 0.0
+                    on_hand = float(qty)
                     balance = InvStockBalance(
                         company_id=1,
-                        location_id=conn.store_channel_id,
+                        location_id=location_id,
                         variant_id=variant.id,
-                        on_hand_qty=qty,
+                        on_hand_qty=on_hand,
                         reserved_qty=0,
                         available_qty=qty,
                     )
                     db.add(balance)
                 else:
-                    balance.on_hand_qty = qty
-                    balance.available_qty = max(0, qty - float(balance.reserved_qty))
-
-                movement = InvStockMovement(
-                    company_id=1,
-                    movement_type="wgr_sync",
-                    variant_id=variant.id,
-                    qty=qty,
-                    source_doc_type="wgr",
-                    source_doc_id=str(conn.id),
-                )
-                db.add(movement)
-
-                # Enqueue stock.push for every Woo connection
-                for woo in woo_connections:
-                    queue_entry = IntSyncQueue(
-                        store_connection_id=woo.id,
-                        entity_type="stock",
-                        event_type="stock.push",
-                        payload={"sku": sku, "qty": qty, "variant_id": variant.id},
-                        status="pending",
+                    previous_qty = float(balance.on_hand_qty)
+                    on_hand = qty + float(balance.reserved_qty)
+                    balance.on_hand_qty = on_hand
+                    balance.available_qty = qty
+                touched.add((balance.location_id, variant.id))
+
+                # WGR reports absolute stock; the ledger records the signed change so it can be replayed.
+                delta = on_hand - previous_qty
+                if delta:
+                    movement = InvStockMovement(
+                        company_id=1,
+                        movement_type="wgr_sync",
+                        dest_location_id=location_id,
+                        variant_id=variant.id,
+                        qty=delta,
+                        source_doc_type="wgr",
+                        source_doc_id=str(conn.id),
                     )
-                    db.add(queue_entry)
+                    db.add(movement)
+                    movements.append(movement)
 
                 total_updated += 1
 
             conn.last_sync_at = _now()
 
+        db.flush()
+        # Value the deltas like any other movement: gains at WAC / latest PO cost, losses FIFO.
+        apply_valuation(
+            db,
+            [
+                ValuationMove(movement.id, movement.variant_id, movement.dest_location_id, Decimal(str(movement.qty)))
+                for movement in movements
+            ],
+        )
+        evaluate_touched(db, touched)
+        # Woo sells what is not reserved, so the push carries available_qty, not on-hand.
+        # WGR already holds these figures; pushing them back would only echo.
+        enqueue_stock_pushes(db, {variant_id for _, variant_id in touched}, providers=("woocommerce",))
         db.commit()
         logger.info("WGR poll_stock: %d articles updated", total_updated)
 
@@ -154,7 +172,8 @@ def poll_stock(self):  # type: ignore[override]
 def poll_orders(self):  # type: ignore[override]
     """
     Poll WGR for new orders since last_sync_at.
-    Creates SalesOrder + SalesOrderLines, decrements stock, enqueues label print.
+    Creates SalesOrder + SalesOrderLines, reserves stock at the store's location,
+    enqueues label print. Stock leaves on_hand when the order ships.
     """
     db = SessionLocal()
     try:
@@ -165,13 +184,8 @@ def poll_orders(self):  # type: ignore[override]
             )
         ).all()
 
-        woo_connections = db.scalars(
-            select(IntStoreConnection).where(
-                IntStoreConnection.provider == "woocommerce",
-                IntStoreConnection.active.is_(True),
-            )
-        ).all()
-
+        reserved_variants: set[int] = set()
+        new_order_ids: list[int] = []
         for conn in wgr_connections:
             client = WGRClient(conn.api_base_url, conn.consumer_key, conn.consumer_secret)
             last_sync = conn.last_sync_at
@@ -210,6 +224,7 @@ def poll_orders(self):  # type: ignore[override]
                     channel_type="wgr",
                     store_connection_id=conn.id,
                     external_order_id=str(wgr_order_id),
+                    warehouse_location_id=stock_location_id(conn),
                     status="confirmed",
                     currency_code="SEK",
                     subtotal=0,
@@ -244,29 +259,6 @@ def poll_orders(self):  # type: ignore[override]
                     db.add(line)
                     subtotal += line_total
 
-                    # Decrement stock
-                    if variant:
-                        balance = db.scalar(
-                            select(InvStockBalance).where(
-                                InvStockBalance.variant_id == variant.id,
-                                InvStockBalance.lot_id.is_(None),
-                                InvStockBalance.container_id.is_(None),
-                            )
-                        )
-                        if balance:
-                            balance.on_hand_qty = max(0, float(balance.on_hand_qty) - qty)
-                            balance.available_qty = max(0, float(balance.available_qty) - qty)
-
-                        movement = InvStockMovement(
-                            company_id=1,
-                            movement_type="sale",
-                            variant_id=variant.id,
-                            qty=qty,
-                            source_doc_type="wgr_order",
-                            source_doc_id=str(wgr_order_id),
-                        )
-                        db.add(movement)
-
                 order.subtotal = subtotal
                 order.total = subtotal
 
@@ -282,17 +274,11 @@ def poll_orders(self):  # type: ignore[override]
 
                 db.flush()
 
-                # Enqueue stock.push for all Woo connections
-                for woo in woo_connections:
-                    db.add(
-                        IntSyncQueue(
-                            store_connection_id=woo.id,
-                            entity_type="stock",
-                            event_type="stock.push",
-                            payload={"order_id": order.id, "source": "wgr_order"},
-                            status="pending",
-                        )
-                    )
+                new_order_ids.append(order.id)
+                reservation = reserve_orders(db, [order.id])
+                reserved_variants |= reservation.variant_ids
+                if reservation.short:
+                    logger.warning("WGR order %s: %s short on reservation", wgr_order_id, reservation.short[order.id])
 
                 # Enqueue nShift label print
                 db.add(
@@ -315,6 +301,8 @@ def poll_orders(self):  # type: ignore[override]
 
             conn.last_sync_at = _now()
 
+        sync_sales_rollup(db, new_order_ids)
+        enqueue_stock_pushes(db, reserved_variants)
         db.commit()
     except Exception as exc:
         db.rollback()
@@ -322,3 +310,91 @@ def poll_orders(self):  # type: ignore[override]
         raise
     finally:
         db.close()
+
+
+# ---------------------------------------------------------------------------
+# push_stock
+# ---------------------------------------------------------------------------
+
+
+@celery_app.task(name="app.tasks.wgr.push_stock", bind=True, max_retries=3)
+def push_stock(self):  # type: ignore[override]
+    """
+    Process IntSyncQueue stock.push entries of WGR connections.
+    Sets the article's stock in WGR to the queued available quantity (Stock.set).
+    """
+    db = SessionLocal()
+    try:
+        now = _now()
+        pending = db.scalars(
+            select(IntSyncQueue)
+            .join(IntStoreConnection, IntStoreConnection.id == IntSyncQueue.store_connection_id)
+            .where(
+                IntStoreConnection.provider == "wgr",
+                IntSyncQueue.entity_type == "stock",
+                IntSyncQueue.event_type == "stock.push",
+                IntSyncQueue.status == "pending",
+                IntSyncQueue.available_at <= now,
+            )
+            # Oldest first, so the latest quantity of a SKU is the one WGR ends up with.
+            .order_by(IntSyncQueue.id)
+            .limit(settings.wgr_push_batch_size)
+        ).all()
+
+        success = 0
+        failed = 0
+        clients: dict[int, WGRClient] = {}
+
+        for entry in pending:
+            payload = entry.payload or {}
+            sku = payload.get("sku")
+            qty = payload.get("qty")
+
+            if sku is None or qty is None:
+                entry.status = "failed"
+                entry.last_error = "missing sku or qty in payload"
+                failed += 1
+                continue
+
+            conn = db.get(IntStoreConnection, entry.store_connection_id)
+            if conn is None or not conn.active:
+                entry.status = "failed"
+                entry.last_error = "connection not found or inactive"
+                failed += 1
+                continue
+
+            try:
+                if conn.id not in clients:
+                    clients[conn.id] = WGRClient(conn.api_base_url, conn.consumer_key, conn.consumer_secret)
+                if not asyncio.run(clients[conn.id].set_stock(sku, int(qty))):
+                    raise ValueError(f"WGR rejected Stock.set for '{sku}'")
+
+                entry.status = "done"
+                entry.processed_at = _now()
+                success += 1
+
+            except Exception as exc:
+                entry.retry_count = (entry.retry_count or 0) + 1
+                entry.last_error = str(exc)
+                if entry.retry_count >= 3:
+                    entry.status = "failed"
+                    db.add(
+                        IntSyncError(
+                            queue_id=entry.id,
+                            error_message=str(exc),
+                            payload=payload,
+                        )
+                    )
+                    failed += 1
+                # else: leave as pending for next run
+                logger.warning("WGR push_stock failed for queue %d sku=%s: %s", entry.id, sku, exc)
+
+        db.commit()
+        logger.info("WGR push_stock: success=%d failed=%d", success, failed)
+
+    except Exception as exc:
+        db.rollback()
+        logger.exception("WGR push_stock unhandled error: %s", exc)
+        raise
+    finally:
+        db.close()
@@ -28,8 +28,11 @@ def push_stock(self):  # type: ignore[override]
     try:
         now = _now()
         pending = db.scalars(
-            select(IntSyncQueue).where(
+            select(IntSyncQueue)
+            .join(IntStoreConnection, IntStoreConnection.id == IntSyncQueue.store_connection_id)
+            .where(
                 and_(
+                    IntStoreConnection.provider == "woocommerce",
                     IntSyncQueue.entity_type == "stock",
                     IntSyncQueue.event_type == "stock.push",
                     IntSyncQueue.status == "pending",
@@ -13,6 +13,8 @@ celery_app = Celery(
         "app.tasks.wgr",
         "app.tasks.woo",
         "app.tasks.nshift",
+        "app.tasks.inventory",
+        "app.tasks.maintenance",
     ],
 )
 
@@ -32,6 +34,10 @@ celery_app.conf.beat_schedule = {
         "task": "app.tasks.wgr.poll_orders",
         "schedule": 120,  # every 2 minutes
     },
+    "wgr-push-stock": {
+        "task": "app.tasks.wgr.push_stock",
+        "schedule": 30,  # every 30 seconds
+    },
     "woo-push-stock": {
         "task": "app.tasks.woo.push_stock",
         "schedule": 30,  # every 30 seconds
@@ -40,6 +46,26 @@ celery_app.conf.beat_schedule = {
         "task": "app.tasks.nshift.process_queue",
         "schedule": 15,  # every 15 seconds
     },
+    "inventory-replenishment": {
+        "task": "app.tasks.inventory.run_replenishment",
+        "schedule": 3600,  # every hour
+    },
+    "inventory-snapshot-stock": {
+        "task": "app.tasks.inventory.snapshot_stock",
+        "schedule": 86400,  # daily
+    },
+    "maintenance-ensure-partitions": {
+        "task": "app.tasks.maintenance.ensure_partitions",
+        "schedule": 86400,  # daily
+    },
+    "maintenance-archive-partitions": {
+        "task": "app.tasks.maintenance.archive_partitions",
+        "schedule": 86400,  # daily
+    },
+    "maintenance-rebuild-sales-rollup": {
+        "task": "app.tasks.maintenance.rebuild_sales_rollup",
+        "schedule": 86400,  # daily, last 7 days
+    },
 }
 
 # ---------------------------------------------------------------------------
@@ -51,6 +77,8 @@ celery_app.conf.task_routes = {
     "app.tasks.wgr.*": {"queue": "wgr"},
     "app.tasks.woo.*": {"queue": "woo"},
     "app.tasks.nshift.*": {"queue": "nshift"},
+    "app.tasks.inventory.*": {"queue": "inventory"},
+    "app.tasks.maintenance.*": {"queue": "maintenance"},
 }
 
 # ---------------------------------------------------------------------------
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
+
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+
+if TYPE_CHECKING:
+    from app.ws.manager import WSManager
+
+logger = logging.getLogger(__name__)
+
+FANOUT_CHANNEL = "ws:fanout"
+# How often an API process whose bridge failed to start tries again.
+START_RETRY_SECONDS = 5.0
+
+
+class RedisBridge:
+    """
+    Cross-process WebSocket fan-out over Redis pub/sub.
+    Any process publishes; every started API process delivers each message to its
+    own sockets. Started bridges coalesce messages for up to `flush_interval`
+    seconds (or `max_batch` messages) into one PUBLISH. Processes that never start
+    the bridge (Celery workers) publish each message immediately. An API process whose
+    start failed delivers to its own sockets only, without touching Redis, until a
+    background retry has subscribed it again.
+    """
+
+    def __init__(
+        self,
+        manager: WSManager,
+        url: str,
+        *,
+        flush_interval: float = 0.02,
+        max_batch: int = 200,
+        client_factory: Callable[[], Any] | None = None,
+    ) -> None:
+        self.manager = manager
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.client_factory = client_factory or (lambda: aioredis.Redis.from_url(url))
+        self.client: Any = None
+        self.running = False
+        # Set while a failed start is being retried: publishing would skip this process's sockets.
+        self.local_only = False
+        self._pending: list[dict] = []
+        self._tasks: list[asyncio.Task] = []
+        self._retry: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        client = self.client_factory()
+        pubsub = client.pubsub()
+        try:
+            await pubsub.subscribe(FANOUT_CHANNEL)  # raises if Redis is unreachable
+        except RedisError:
+            await client.aclose()
+            raise
+        self.client = client
+        self.running = True
+        self.local_only = False
+        self._tasks = [asyncio.create_task(self._listen(pubsub)), asyncio.create_task(self._flush_loop())]
+
+    async def start_or_retry(self, retry_interval: float = START_RETRY_SECONDS) -> bool:
+        """Start for an API process; if Redis is unreachable, stay local-only and retry in the background."""
+        try:
+            await self.start()
+            return True
+        except RedisError as exc:
+            logger.warning("WebSocket Redis bridge unavailable, delivering to local sockets only: %s", exc)
+        self.local_only = True
+        self._retry = asyncio.create_task(self._retry_start(retry_interval))
+        return False
+
+    async def _retry_start(self, interval: float) -> None:
+        while not self.running:
+            await asyncio.sleep(interval)
+            try:
+                await self.start()
+            except RedisError as exc:
+                logger.debug("WebSocket Redis bridge still unavailable: %s", exc)
+        logger.info("WebSocket Redis bridge started after a failed start")
+
+    async def stop(self) -> None:
+        if self._retry is not None:
+            self._retry.cancel()
+            await asyncio.gather(self._retry, return_exceptions=True)
+            self._retry = None
+        self.local_only = False
+        if not self.running:
+            return
+        self.running = False
+        await self._flush()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.client.aclose()
+        self.client = None
+
+    async def publish(self, channel: str, payload: dict) -> bool:
+        """Queue or send one message; False means Redis is unavailable and the caller should deliver locally."""
+        if self.local_only:
+            return False
+        message = {"channel": channel, "payload": payload}
+        if self.running:
+            self._pending.append(message)
+            if len(self._pending) >= self.max_batch:
+                await self._flush()  # falls back to local delivery itself
+            return True
+        client = self.client_factory()
+        try:
+            await client.publish(FANOUT_CHANNEL, json.dumps([message], default=str))
+            return True
+        except RedisError as exc:
+            logger.warning("WS bridge publish failed, delivering locally: %s", exc)
+            return False
+        finally:
+            await client.aclose()
+
+    async def incr(self, key: str) -> int | None:
+        if self.local_only:
+            return None
+        client = self.client if self.running else self.client_factory()
+        try:
+            return int(await client.incr(key))
+        except RedisError as exc:
+            logger.warning("WS bridge counter %s failed: %s", key, exc)
+            return None
+        finally:
+            if client is not self.client:
+                await client.aclose()
+
+    async def _flush(self) -> bool:
+        if not self._pending:
+            return True
+        batch, self._pending = self._pending, []
+        try:
+            await self.client.publish(FANOUT_CHANNEL, json.dumps(batch, default=str))
+            return True
+        except RedisError as exc:
+            logger.warning("WS bridge flush failed, delivering %d messages locally: %s", len(batch), exc)
+            for message in batch:
+                await self.manager.deliver(message["channel"], message["payload"])
+            return False
+
+    async def _flush_loop(self) -> None:
+        while self.running:
+            await asyncio.sleep(self.flush_interval)
+            await self._flush()
+
+    async def _listen(self, pubsub: Any) -> None:
+        while self.running:
+            try:
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    for item in json.loads(message["data"]):
+                        await self.manager.deliver(item["channel"], item["payload"])
+            except RedisError as exc:
+                logger.warning("WS bridge subscription lost, resubscribing: %s", exc)
+                await pubsub.aclose()
+                await asyncio.sleep(1)
+                pubsub = self.client.pubsub()
+                try:
+                    await pubsub.subscribe(FANOUT_CHANNEL)
+                except RedisError:
+                    continue
+        await pubsub.aclose()
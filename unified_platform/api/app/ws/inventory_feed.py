@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+from collections import defaultdict, deque
+from collections.abc import Iterable
+
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.inventory import InvStockBalance
+from app.ws.manager import WSManager, ws_manager
+
+
+class InventoryFeed:
+    """
+    Sequenced stock deltas per `inventory:{location_id}` channel.
+    Every payload gets the next sequence number of its location and is kept in a
+    bounded ring buffer, so a client that sees a gap can replay from its last seq
+    instead of refetching the whole stock list.
+    """
+
+    def __init__(self, manager: WSManager, buffer_size: int) -> None:
+        self.manager = manager
+        self.buffer_size = buffer_size
+        self.sequences: dict[int, int] = defaultdict(int)
+        self.buffers: dict[int, deque[dict]] = {}
+
+    def current_seq(self, location_id: int) -> int:
+        return self.sequences.get(location_id, 0)
+
+    def record(
+        self, location_id: int, changes: list[dict], *, movement_id: int | None = None, seq: int | None = None
+    ) -> dict:
+        payload = {
+            "event": "stock_delta",
+            "location_id": location_id,
+            "seq": seq if seq is not None else self.current_seq(location_id) + 1,
+            "movement_id": movement_id,
+            "changes": changes,
+        }
+        self.remember(f"inventory:{location_id}", payload)
+        return payload
+
+    def remember(self, channel: str, payload: dict) -> None:
+        """Buffer a delivered delta. The local record and its bridged echo are kept once."""
+        if payload.get("event") != "stock_delta":
+            return
+        location_id, seq = payload["location_id"], payload["seq"]
+        buffer = self.buffers.setdefault(location_id, deque(maxlen=self.buffer_size))
+        if seq > self.current_seq(location_id):
+            buffer.append(payload)
+            self.sequences[location_id] = seq
+        elif buffer and seq > buffer[0]["seq"] and all(item["seq"] != seq for item in buffer):
+            # Another process's delta overtook this one on the bridge.
+            ordered = sorted([*buffer, payload], key=lambda item: item["seq"])
+            buffer.clear()
+            buffer.extend(ordered)
+
+    def since(self, location_id: int, seq: int) -> list[dict] | None:
+        """Payloads after `seq`, or None when they have already left the buffer (full reload needed)."""
+        current = self.current_seq(location_id)
+        if seq >= current:
+            return []
+        buffer = self.buffers.get(location_id)
+        if not buffer or buffer[0]["seq"] > seq + 1:
+            return None
+        return [payload for payload in buffer if payload["seq"] > seq]
+
+    async def publish(self, location_id: int, changes: list[dict], *, movement_id: int | None = None) -> None:
+        seq = None
+        if self.manager.bridge is not None:
+            # One counter per location across processes, so every API process buffers the same numbering.
+            seq = await self.manager.bridge.incr(f"ws:seq:inventory:{location_id}")
+        await self.manager.broadcast(
+            f"inventory:{location_id}", self.record(location_id, changes, movement_id=movement_id, seq=seq)
+        )
+
+
+def stock_levels(db: Session, pairs: Iterable[tuple[int, int]]) -> dict[int, list[dict]]:
+    """Current on-hand/reserved/available per variant, grouped by location, for the given (location, variant) pairs."""
+    keys = set(pairs)
+    if not keys:
+        return {}
+    rows = db.execute(
+        select(
+            InvStockBalance.location_id,
+            InvStockBalance.variant_id,
+            func.sum(InvStockBalance.on_hand_qty),
+            func.sum(InvStockBalance.reserved_qty),
+            func.sum(InvStockBalance.available_qty),
+        )
+        .where(tuple_(InvStockBalance.location_id, InvStockBalance.variant_id).in_(keys))
+        .group_by(InvStockBalance.location_id, InvStockBalance.variant_id)
+    )
+    levels: dict[int, list[dict]] = defaultdict(list)
+    for location_id, variant_id, on_hand, reserved, available in rows:
+        levels[location_id].append(
+            {
+                "variant_id": variant_id,
+                "on_hand_qty": float(on_hand),
+                "reserved_qty": float(reserved),
+                "available_qty": float(available),
+            }
+        )
+    return levels
+
+
+async def publish_stock_levels(
+    db: AsyncSession, pairs: Iterable[tuple[int, int]], *, movement_id: int | None = None
+) -> None:
+    """Read the post-commit quantities for the touched pairs and push one delta per location."""
+    levels = await db.run_sync(stock_levels, list(pairs))
+    for location_id, changes in levels.items():
+        await inventory_feed.publish(location_id, changes, movement_id=movement_id)
+
+
+inventory_feed = InventoryFeed(ws_manager, settings.ws_inventory_buffer_size)
+ws_manager.observe("inventory:", inventory_feed.remember)
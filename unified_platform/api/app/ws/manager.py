@@ -1,33 +1,137 @@
 from __future__ import annotations
 
+import asyncio
+import json
+import logging
 from collections import defaultdict
+from collections.abc import Callable
 
 from fastapi import WebSocket
 
+from app.core.config import settings
+from app.ws.bridge import RedisBridge
+
+logger = logging.getLogger(__name__)
+
+# Close code for consumers that cannot keep up ("try again later").
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+class Connection:
+    """
+    One socket's bounded outbox and the writer task draining it.
+    When the outbox is full the oldest message is dropped and the client is told how
+    many it missed before the next one; a client that falls a whole queue behind,
+    or whose send stalls past the timeout, is disconnected.
+    """
+
+    def __init__(self, manager: WSManager, channel: str, websocket: WebSocket, *, queue_size: int, send_timeout: float) -> None:
+        self.manager = manager
+        self.channel = channel
+        self.websocket = websocket
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.writer: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self.writer = asyncio.create_task(self._write())
+
+    def offer(self, text: str) -> bool:
+        """Enqueue without waiting. False when the consumer is too slow to keep."""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+            if self.dropped >= self.queue_size:
+                return False
+        self.queue.put_nowait(text)
+        return True
+
+    async def _write(self) -> None:
+        try:
+            while True:
+                text = await self.queue.get()
+                if self.dropped:
+                    dropped, self.dropped = self.dropped, 0
+                    await self._send(json.dumps({"event": "messages_dropped", "count": dropped}))
+                await self._send(text)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.info("Dropping WebSocket on %s: %s", self.channel, exc)
+            self.manager.disconnect(self.channel, self.websocket)
+            await self.close(SLOW_CONSUMER_CLOSE_CODE)
+
+    async def _send(self, text: str) -> None:
+        await asyncio.wait_for(self.websocket.send_text(text), timeout=self.send_timeout)
+
+    async def close(self, code: int) -> None:
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
 
 class WSManager:
-    def __init__(self) -> None:
-        self.channels: dict[str, set[WebSocket]] = defaultdict(set)
+    def __init__(self, *, queue_size: int = 100, send_timeout: float = 5.0) -> None:
+        self.channels: dict[str, dict[WebSocket, Connection]] = defaultdict(dict)
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.bridge: RedisBridge | None = None
+        # (channel prefix, callback) run for every delivered message, even with no sockets.
+        self.observers: list[tuple[str, Callable[[str, dict], None]]] = []
+        self._closing: set[asyncio.Task] = set()
 
     async def connect(self, channel: str, websocket: WebSocket) -> None:
         await websocket.accept()
-        self.channels[channel].add(websocket)
+        connection = Connection(self, channel, websocket, queue_size=self.queue_size, send_timeout=self.send_timeout)
+        self.channels[channel][websocket] = connection
+        connection.start()
 
     def disconnect(self, channel: str, websocket: WebSocket) -> None:
-        if websocket in self.channels[channel]:
-            self.channels[channel].remove(websocket)
-        if not self.channels[channel]:
+        connection = self.channels.get(channel, {}).pop(websocket, None)
+        if connection and connection.writer and connection.writer is not asyncio.current_task():
+            connection.writer.cancel()
+        if channel in self.channels and not self.channels[channel]:
             self.channels.pop(channel, None)
 
+    def observe(self, prefix: str, callback: Callable[[str, dict], None]) -> None:
+        self.observers.append((prefix, callback))
+
     async def broadcast(self, channel: str, payload: dict) -> None:
-        dead: list[WebSocket] = []
-        for socket in self.channels.get(channel, set()):
-            try:
-                await socket.send_json(payload)
-            except Exception:
-                dead.append(socket)
-        for socket in dead:
-            self.disconnect(channel, socket)
+        """Send to every API process through the bridge, or only to this process's sockets without one."""
+        if self.bridge is not None and await self.bridge.publish(channel, payload):
+            return
+        await self.deliver(channel, payload)
+
+    async def deliver(self, channel: str, payload: dict) -> None:
+        """Serialize once and hand the text to every socket's outbox; never waits on a client."""
+        for prefix, callback in self.observers:
+            if channel.startswith(prefix):
+                callback(channel, payload)
+        connections = list(self.channels.get(channel, {}).values())
+        if not connections:
+            return
+        text = json.dumps(payload, default=str)
+        for connection in connections:
+            if not connection.offer(text):
+                logger.info("Disconnecting slow WebSocket consumer on %s", channel)
+                self.disconnect(channel, connection.websocket)
+                task = asyncio.create_task(connection.close(SLOW_CONSUMER_CLOSE_CODE))
+                self._closing.add(task)
+                task.add_done_callback(self._closing.discard)
+
+    async def send(self, channel: str, websocket: WebSocket, payload: dict) -> None:
+        """
+        Send to one socket through its outbox, keeping order with broadcasts.
+        Waits for room instead of dropping: only the caller serving this socket is held up.
+        """
+        connection = self.channels.get(channel, {}).get(websocket)
+        if connection is not None:
+            await asyncio.wait_for(connection.queue.put(json.dumps(payload, default=str)), timeout=self.send_timeout)
 
 
-ws_manager = WSManager()
+ws_manager = WSManager(queue_size=settings.ws_send_queue_size, send_timeout=settings.ws_send_timeout_seconds)
+if settings.ws_redis_bridge:
+    ws_manager.bridge = RedisBridge(ws_manager, settings.redis_url)
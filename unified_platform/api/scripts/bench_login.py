@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+scripts/bench_login.py
+══════════════════════
+Shift-start login burst: fires concurrent logins and measures their latency
+together with an unrelated request that runs during the burst.
+
+Usage:
+    python scripts/bench_login.py \
+        --api-url http://localhost:8080 \
+        --email scanner@snushallen.cloud \
+        --password secret \
+        --logins 200 \
+        --concurrency 50
+
+Use an account that is not throttled (or raise LOGIN_MAX_FAILURES_PER_* while
+benchmarking wrong passwords).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def report(label: str, samples: list[float]) -> None:
+    if not samples:
+        print(f"{label:<12} no samples")
+        return
+    print(
+        f"{label:<12} n={len(samples):<5} "
+        f"p50={percentile(samples, 50):7.1f} ms  p95={percentile(samples, 95):7.1f} ms  "
+        f"p99={percentile(samples, 99):7.1f} ms  max={max(samples):7.1f} ms  mean={statistics.fmean(samples):7.1f} ms"
+    )
+
+
+async def run(args: argparse.Namespace) -> None:
+    limits = httpx.Limits(max_connections=args.concurrency + 5)
+    async with httpx.AsyncClient(base_url=args.api_url, timeout=60, limits=limits) as client:
+        gate = asyncio.Semaphore(args.concurrency)
+        login_ms: list[float] = []
+        probe_ms: list[float] = []
+        statuses: dict[int, int] = {}
+        done = asyncio.Event()
+
+        async def one_login() -> None:
+            async with gate:
+                started = time.perf_counter()
+                response = await client.post(
+                    "/api/v1/auth/login", json={"email": args.email, "password": args.password}
+                )
+                login_ms.append((time.perf_counter() - started) * 1000)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        async def probe() -> None:
+            # Unrelated traffic: should stay fast while bcrypt is busy.
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get("/")
+                probe_ms.append((time.perf_counter() - started) * 1000)
+                await asyncio.sleep(0.05)
+
+        probe_task = asyncio.create_task(probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(one_login() for _ in range(args.logins)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe_task
+
+    print(f"{args.logins} logins, concurrency {args.concurrency}, {elapsed:.2f} s ({args.logins / elapsed:.1f}/s)")
+    print(f"status codes: {dict(sorted(statuses.items()))}")
+    report("login", login_ms)
+    report("probe GET /", probe_ms)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--api-url", default="http://localhost:8080")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
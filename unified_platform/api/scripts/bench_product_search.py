@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+scripts/bench_product_search.py
+═══════════════════════════════
+Search-as-you-type latency of search_products() against the configured
+DATABASE_URL (migrated to 20261019_0011 so the trigram indexes exist).
+
+Usage:
+    python scripts/bench_product_search.py --seed-variants 100000 --runs 20
+
+--seed-variants inserts a synthetic catalogue inside a transaction that is
+rolled back at the end; leave it at 0 to benchmark the existing catalogue.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import insert, select, text  # noqa: E402
+
+from app.db.session import SessionLocal  # noqa: E402
+from app.models.core import CoreCompany  # noqa: E402
+from app.models.pim import PimBrand, PimProduct, PimProductI18n, PimProductVariant  # noqa: E402
+from app.services.product_search import search_products  # noqa: E402
+
+WORDS = ["nordic", "spirit", "mint", "frost", "berry", "citrus", "slim", "strong", "white", "original", "ice", "cool"]
+QUERIES = ["mi", "min", "mint", "nordic m", "SKU-12", "SKU-4711", "7350", "frost berry", "velo", "zz-no-hit"]
+
+
+def seed(db, variants: int, rng: random.Random) -> None:
+    company_id = db.scalar(select(CoreCompany.id).limit(1))
+    if company_id is None:
+        raise SystemExit("Seeding needs at least one core_company row")
+    brand_ids = db.scalars(
+        insert(PimBrand).returning(PimBrand.id),
+        [{"company_id": company_id, "name": f"Bench {name.title()} {n}"} for n, name in enumerate(WORDS * 5)],
+    ).all()
+    products = max(variants // 3, 1)
+    product_ids = db.scalars(
+        insert(PimProduct).returning(PimProduct.id, sort_by_parameter_order=True),
+        [
+            {"company_id": company_id, "sku": f"SKU-{n}", "ean": f"7350{n:09d}", "brand_id": rng.choice(brand_ids)}
+            for n in range(products)
+        ],
+    ).all()
+    db.execute(
+        insert(PimProductI18n),
+        [
+            {"product_id": product_id, "language_code": "sv-SE", "name": " ".join(rng.sample(WORDS, 3)).title()}
+            for product_id in product_ids
+        ],
+    )
+    db.execute(
+        insert(PimProductVariant),
+        [
+            {"product_id": product_ids[n % products], "sku": f"SKU-{n % products}-V{n}", "ean": f"7351{n:09d}"}
+            for n in range(variants)
+        ],
+    )
+    db.execute(text("ANALYZE pim_product, pim_product_variant, pim_product_i18n, pim_brand"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed-variants", type=int, default=0)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=25)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.seed_variants:
+            seed(db, args.seed_variants, random.Random(args.seed))
+        for query in QUERIES:
+            search_products(db, query, limit=args.limit)  # warm up
+            timings: list[float] = []
+            for _ in range(args.runs):
+                started = time.perf_counter()
+                hits = search_products(db, query, limit=args.limit)
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            p95 = timings[max(int(len(timings) * 0.95) - 1, 0)]
+            print(f"{query!r:>14}: {len(hits):3d} hits  median={statistics.median(timings):6.1f} ms  p95={p95:6.1f} ms")
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+scripts/bench_wave.py
+═════════════════════
+Wave planner on synthetic data: builds a warehouse of bins with lotted and
+untracked stock, a wave of orders, and times plan_wave().
+
+Usage:
+    python scripts/bench_wave.py --orders 500 --lines-per-order 4 --variants 3000 --bins 2000 --runs 5
+
+Only the in-memory planning step is timed; load_wave() is two indexed queries.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.wave_planner import StockSlot, WaveLine, plan_wave  # noqa: E402
+
+
+def synthetic(args: argparse.Namespace) -> tuple[list[WaveLine], list[StockSlot]]:
+    rng = random.Random(args.seed)
+    bins = [f"{aisle}-{rack}-{level}" for aisle in "ABCDEFGHJK" for rack in range(1, 41) for level in range(1, 6)]
+    bins = bins[: args.bins]
+    stock: list[StockSlot] = []
+    for variant_id in range(1, args.variants + 1):
+        for copy in range(rng.randint(1, 3)):
+            lotted = rng.random() < 0.4
+            stock.append(
+                StockSlot(
+                    warehouse_id=1,
+                    variant_id=variant_id,
+                    location_id=rng.randrange(len(bins)),
+                    location_code=rng.choice(bins),
+                    lot_id=variant_id * 10 + copy if lotted else None,
+                    expiry_date=f"2027-{rng.randint(1, 12):02d}-01" if lotted else None,
+                    qty=Decimal(rng.randint(0, 60)),
+                )
+            )
+    # Skewed demand: a few fast movers appear in many orders.
+    weights = [1 / rank for rank in range(1, args.variants + 1)]
+    lines = [
+        WaveLine(order_id=order_id, warehouse_id=1, variant_id=variant_id, qty=Decimal(rng.randint(1, 5)))
+        for order_id in range(1, args.orders + 1)
+        for variant_id in rng.choices(range(1, args.variants + 1), weights=weights, k=args.lines_per_order)
+    ]
+    return lines, stock
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--lines-per-order", type=int, default=4)
+    parser.add_argument("--variants", type=int, default=3000)
+    parser.add_argument("--bins", type=int, default=2000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    lines, stock = synthetic(args)
+    timings: list[float] = []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        plan = plan_wave(lines, stock)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    print(f"{args.orders} orders, {len(lines)} lines, {len(stock)} stock slots")
+    print(f"{len(plan.picks)} picks, {len(plan.shortages)} short order lines, {len(plan.slots)} put-wall slots")
+    print(f"plan_wave: min={min(timings):.1f} ms  median={statistics.median(timings):.1f} ms  max={max(timings):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from collections.abc import Generator
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import delete, text
+from sqlalchemy.orm import Session
+
+import app.models  # noqa: F401
+from app.db.base import Base
+from app.db.session import engine
+from app.models.core import CoreCompany, CoreLocation
+from app.models.pim import PimProduct, PimProductVariant
+
+
+def postgres_available() -> bool:
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except Exception:
+        return False
+    return True
+
+
+@pytest.fixture()
+def pg_db() -> Generator[Session, None, None]:
+    """Session on the configured Postgres inside a transaction that is rolled back afterwards."""
+    if not postgres_available():
+        pytest.skip("needs a reachable Postgres")
+    Base.metadata.create_all(bind=engine)  # same runtime guard as app startup
+    conn = engine.connect()
+    outer = conn.begin()
+    db = Session(bind=conn, join_transaction_mode="create_savepoint")
+    try:
+        yield db
+    finally:
+        db.close()
+        outer.rollback()
+        conn.close()
+
+
+def _build_catalog(db: Session) -> SimpleNamespace:
+    company = CoreCompany(legal_name="Test AB")
+    db.add(company)
+    db.flush()
+    warehouse = CoreLocation(company_id=company.id, code=f"WH-{company.id}", name="Warehouse", location_type="warehouse")
+    db.add(warehouse)
+    db.flush()
+    bin_location = CoreLocation(
+        company_id=company.id, code=f"A-1-{company.id}", name="Bin", location_type="bin", parent_location_id=warehouse.id
+    )
+    product = PimProduct(company_id=company.id, sku=f"TEST-{company.id}")
+    db.add_all([bin_location, product])
+    db.flush()
+    variants = [PimProductVariant(product_id=product.id, sku=f"TEST-{company.id}-{n}") for n in range(2)]
+    db.add_all(variants)
+    db.flush()
+    return SimpleNamespace(
+        company_id=company.id,
+        warehouse_id=warehouse.id,
+        bin_id=bin_location.id,
+        product_id=product.id,
+        variant_ids=[variant.id for variant in variants],
+    )
+
+
+@pytest.fixture()
+def pg_catalog(pg_db: Session) -> SimpleNamespace:
+    """One company, a warehouse with one bin, and two variants of one product."""
+    return _build_catalog(pg_db)
+
+
+@pytest.fixture()
+def pg_committed_catalog() -> Generator[SimpleNamespace, None, None]:
+    """pg_catalog committed, for tests that need several connections. Deleted afterwards;
+    the test removes the rows it adds on top."""
+    if not postgres_available():
+        pytest.skip("needs a reachable Postgres")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        catalog = _build_catalog(db)
+        db.commit()
+    try:
+        yield catalog
+    finally:
+        with Session(engine) as db:
+            db.execute(delete(PimProductVariant).where(PimProductVariant.id.in_(catalog.variant_ids)))
+            db.execute(delete(PimProduct).where(PimProduct.id == catalog.product_id))
+            db.execute(delete(CoreLocation).where(CoreLocation.id == catalog.bin_id))
+            db.execute(delete(CoreLocation).where(CoreLocation.id == catalog.warehouse_id))
+            db.execute(delete(CoreCompany).where(CoreCompany.id == catalog.company_id))
+            db.commit()
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app.models import core, integration, inventory, pim, procurement  # noqa: F401
+from app.models.inventory import InvInboundShipment, InvInboundShipmentLine
+from app.models.pim import PimProduct, PimProductVariant
+from app.models.procurement import ProcPurchaseOrderLine
+from app.services.asn_import import AsnImporter, AsnImportResult, AsnParser, AsnRowError
+
+
+def test_csv_parser_accepts_semicolons_and_decimal_commas() -> None:
+    parser = AsnParser("csv")
+    rows = [parser.parse(line) for line in ["EAN;Qty;PO_Line_Id", "", "96385074;12,5;", "P1-V;3;7"]]
+
+    assert rows[:2] == [None, None]
+    assert (rows[2].row, rows[2].code, rows[2].expected_qty, rows[2].po_line_id) == (3, "96385074", Decimal("12.5"), None)
+    assert rows[3].po_line_id == 7
+
+
+def test_parser_reports_bad_rows_with_their_line_number() -> None:
+    parser = AsnParser("jsonl")
+    assert parser.parse('{"sku": "P1-V", "qty": 2}').expected_qty == Decimal("2")
+    with pytest.raises(AsnRowError) as bad_qty:
+        parser.parse('{"sku": "P1-V", "qty": 0}')
+    with pytest.raises(AsnRowError) as bad_json:
+        parser.parse("{not json")
+
+    assert (bad_qty.value.row, bad_json.value.row) == (2, 3)
+
+
+def test_importer_resolves_codes_and_links_po_lines() -> None:
+    engine = create_engine("sqlite://")
+    for model in (PimProduct, PimProductVariant, ProcPurchaseOrderLine, InvInboundShipmentLine):
+        model.__table__.create(engine)
+    db = Session(engine)
+    db.add_all(
+        [
+            PimProduct(id=1, company_id=1, sku="P1"),
+            PimProductVariant(id=10, product_id=1, sku="P1-V", ean="96385074"),
+            ProcPurchaseOrderLine(id=7, po_id=3, variant_id=10, ordered_qty=5, unit_cost=1),
+        ]
+    )
+    db.commit()
+    shipment = InvInboundShipment(id=1, po_id=3)
+    parser = AsnParser("csv")
+    rows = [parser.parse(line) for line in ["sku,qty,po_line_id", "96385074,5,", "UNKNOWN,1,", "p1-v,2,8"]][1:]
+
+    result = AsnImportResult()
+    AsnImporter(db, shipment).write_batch(db, rows, result)
+
+    assert result.imported == 1
+    assert [error["row"] for error in result.errors] == [3, 4]
+    line = db.scalars(select(InvInboundShipmentLine)).one()
+    assert (line.variant_id, line.po_line_id, line.expected_qty) == (10, 7, Decimal("5"))
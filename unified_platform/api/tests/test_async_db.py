@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+from conftest import postgres_available
+from sqlalchemy import text
+
+from app.db.session import AsyncSessionLocal, SessionLocal, async_engine
+
+pytestmark = pytest.mark.skipif(not postgres_available(), reason="needs a reachable Postgres")
+
+SLOW_QUERY = text("SELECT pg_sleep(0.5)")
+
+
+async def _race(slow) -> tuple[float, float]:
+    """Finish times of a slow query and an unrelated 50 ms coroutine started together."""
+
+    async def unrelated() -> float:
+        await asyncio.sleep(0.05)
+        return time.perf_counter()
+
+    async def timed_slow() -> float:
+        await slow()
+        return time.perf_counter()
+
+    return tuple(await asyncio.gather(timed_slow(), unrelated()))
+
+
+def test_sync_session_stalls_the_event_loop() -> None:
+    async def slow() -> None:
+        db = SessionLocal()
+        try:
+            db.execute(SLOW_QUERY)
+        finally:
+            db.close()
+
+    slow_done, unrelated_done = asyncio.run(_race(slow))
+    assert unrelated_done >= slow_done
+
+
+def test_async_session_keeps_the_event_loop_free() -> None:
+    async def slow() -> None:
+        async with AsyncSessionLocal() as db:
+            await db.execute(SLOW_QUERY)
+
+    async def run() -> tuple[float, float]:
+        try:
+            return await _race(slow)
+        finally:
+            await async_engine.dispose()
+
+    slow_done, unrelated_done = asyncio.run(run())
+    assert unrelated_done < slow_done
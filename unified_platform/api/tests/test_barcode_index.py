@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from app.models import core, integration, pim  # noqa: F401
+from app.models.integration import IntOutboxEvent
+from app.models.pim import PimProduct, PimProductVariant
+from app.services.barcode import BarcodeIndex, gtin_check_digit, normalize_code, normalize_gtin, pack_base
+
+
+def _session() -> Session:
+    engine = create_engine("sqlite://")
+    for table in (PimProduct.__table__, PimProductVariant.__table__, IntOutboxEvent.__table__):
+        table.create(engine)
+    return Session(engine)
+
+
+def test_gtin_normalization_validates_check_digit() -> None:
+    assert gtin_check_digit("400638133393") == 1
+    assert normalize_gtin("4006381333931") == "04006381333931"
+    assert normalize_gtin("96385074") == "00000096385074"  # EAN-8
+    assert normalize_gtin("4006381333932") is None
+    assert normalize_code(" snus-01 ") == "SNUS-01"
+
+
+def test_pack_gtin_maps_to_consumer_unit() -> None:
+    case = "1" + "400638133393"
+    case += str(gtin_check_digit(case))
+
+    assert pack_base(case) == ("04006381333931", 1)
+    assert pack_base("04006381333931") is None
+
+
+def test_index_resolves_ean_forms_packs_and_sku() -> None:
+    db = _session()
+    product = PimProduct(id=1, company_id=1, sku="P1", gtin14="04006381333931")
+    db.add_all([product, PimProductVariant(id=10, product_id=1, sku="P1-V", ean="96385074")])
+    db.commit()
+    index = BarcodeIndex()
+    index.load(db)
+
+    assert index.resolve("00000096385074").variant_id == 10
+    assert index.resolve("4006381333931").source == "product_gtin14"
+    assert index.resolve("p1-v").source == "sku"
+    case = "3" + "400638133393"
+    case += str(gtin_check_digit(case))
+    assert index.resolve(case).pack_indicator == 3
+
+
+def test_outbox_events_and_cold_lookups_update_the_index() -> None:
+    db = _session()
+    db.add_all([PimProduct(id=1, company_id=1, sku="P1"), PimProductVariant(id=10, product_id=1, sku="P1-V", ean="96385074")])
+    db.commit()
+    index = BarcodeIndex()
+    index.load(db)
+
+    db.add(PimProductVariant(id=11, product_id=1, sku="P1-W", ean="4006381333931"))
+    db.commit()
+    assert index.resolve("4006381333931") is None
+    assert index.lookup(db, "4006381333931").variant_id == 11
+
+    db.get(PimProductVariant, 10).ean = "5901234123457"
+    db.add(IntOutboxEvent(event_name="product.updated", aggregate_type="product", aggregate_id="1", payload={"product_id": 1}))
+    db.commit()
+    assert index.follow_outbox(db) == 1
+    assert index.resolve("96385074") is None
+    assert index.resolve("5901234123457").variant_id == 10
+
+
+def test_late_committed_and_catalogue_events_update_the_index() -> None:
+    db = _session()
+    db.add_all([PimProduct(id=1, company_id=1, sku="P1"), PimProductVariant(id=10, product_id=1, sku="P1-V", ean="96385074")])
+    db.add(PimProduct(id=2, company_id=1, sku="P2"))
+    db.commit()
+    index = BarcodeIndex()
+    index.load(db)
+
+    # Id 1 is taken by a transaction that commits after id 2 was followed.
+    db.add(IntOutboxEvent(id=2, event_name="stock.changed", aggregate_type="variant", aggregate_id="10", payload={}))
+    db.commit()
+    assert index.follow_outbox(db) == 0
+    db.add(PimProductVariant(id=20, product_id=2, sku="P2-V", ean="4006381333931"))
+    db.add(IntOutboxEvent(id=1, event_name="product.updated", aggregate_type="product", aggregate_id="2", payload={"product_id": 2}))
+    db.commit()
+    assert index.follow_outbox(db) == 1
+    assert index.resolve("4006381333931").variant_id == 20
+
+    # An import names no products: the whole index is rebuilt.
+    db.get(PimProductVariant, 10).ean = "5901234123457"
+    db.add(IntOutboxEvent(id=3, event_name="catalog.imported", aggregate_type="store_connection", aggregate_id="1", payload={}))
+    db.commit()
+    assert index.follow_outbox(db) == 2
+    assert index.resolve("96385074") is None
+    assert index.resolve("5901234123457").variant_id == 10
+
+
+def test_lookup_many_resolves_every_cold_code_with_one_lookup_query() -> None:
+    db = _session()
+    db.add(PimProduct(id=1, company_id=1, sku="P1"))
+    db.add_all([PimProductVariant(id=10, product_id=1, sku="P1-V"), PimProductVariant(id=11, product_id=1, sku="P1-W")])
+    db.commit()
+    index = BarcodeIndex()
+    index.load(db)
+    db.add_all([PimProduct(id=2, company_id=1, sku="P2"), PimProduct(id=3, company_id=1, sku="P3")])
+    db.add_all([PimProductVariant(id=20, product_id=2, sku="P2-V"), PimProductVariant(id=30, product_id=3, sku="P3-V")])
+    db.commit()
+
+    statements: list[str] = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    found = index.lookup_many(db, ["p1-v", "P2-V", "p3-v", "NOPE"])
+
+    assert {code: match.variant_id for code, match in found.items()} == {"p1-v": 10, "P2-V": 20, "p3-v": 30}
+    # One query finds the products of the misses, one re-reads their codes.
+    assert len(statements) == 2
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+from app.api.deps import get_current_principal
+from app.core.permission_cache import Principal
+from app.db.pool import instrumented_pool, pool_metrics
+from app.main import app
+from app.models.core import CoreUser
+
+
+def test_checkouts_and_timeouts_are_counted_per_label() -> None:
+    pool_class = instrumented_pool(QueuePool, "test-pool")
+    pool = pool_class(lambda: sqlite3.connect(":memory:"), pool_size=1, max_overflow=0, timeout=0.05)
+
+    held = pool.connect()
+    assert pool_metrics()["test-pool"]["checked_out"] == 1
+    with pytest.raises(PoolTimeoutError):
+        pool.connect()
+    held.close()
+
+    metrics = pool_metrics()["test-pool"]
+    assert metrics["checked_out"] == 0
+    assert metrics["checkouts"] == 2
+    assert metrics["timeouts"] == 1
+    assert metrics["wait_max_ms"] >= 50
+
+
+@pytest.mark.parametrize("path", ["/api/v1/metrics/db-pool", "/api/v1/metrics/product-cache"])
+def test_metrics_need_the_metrics_read_permission(path: str) -> None:
+    client = TestClient(app)
+    assert client.get(path).status_code == 401
+
+    def principal(*permissions: str):
+        return lambda: Principal(user=CoreUser(id=1, email="ops@example.com"), permissions=frozenset(permissions))
+
+    try:
+        app.dependency_overrides[get_current_principal] = principal("sales.read")
+        assert client.get(path).status_code == 403
+        app.dependency_overrides[get_current_principal] = principal("metrics.read")
+        assert client.get(path).status_code == 200
+    finally:
+        app.dependency_overrides.clear()
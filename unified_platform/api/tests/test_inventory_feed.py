@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.main import app
+from app.ws.inventory_feed import InventoryFeed
+from app.ws.manager import WSManager, ws_manager
+
+
+def test_sequences_are_per_location() -> None:
+    feed = InventoryFeed(WSManager(), buffer_size=10)
+    assert feed.record(1, [])["seq"] == 1
+    assert feed.record(1, [])["seq"] == 2
+    assert feed.record(2, [])["seq"] == 1
+    assert [payload["seq"] for payload in feed.since(1, 0)] == [1, 2]
+    assert feed.since(1, 2) == []
+
+
+def test_gap_past_the_buffer_requires_full_resync() -> None:
+    feed = InventoryFeed(WSManager(), buffer_size=3)
+    for _ in range(5):
+        feed.record(7, [{"variant_id": 1, "on_hand_qty": 1.0}])
+    assert [payload["seq"] for payload in feed.since(7, 2)] == [3, 4, 5]
+    assert feed.since(7, 1) is None
+
+
+@pytest.mark.parametrize("frame", ["not json", '{"action": "resync", "since": "x"}', '{"action": "resync", "since": [1]}'])
+def test_malformed_client_frames_close_the_socket_as_unsupported_data(frame: str) -> None:
+    client = TestClient(app)
+    with client.websocket_connect("/api/v1/ws/inventory/41") as websocket:
+        assert websocket.receive_json()["event"] == "hello"
+        websocket.send_text(frame)
+        with pytest.raises(WebSocketDisconnect) as closed:
+            websocket.receive_json()
+    assert closed.value.code == 1003
+    assert "inventory:41" not in ws_manager.channels
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from app.models.sales import SalesCustomer, SalesOrder, SalesOrderEvent, SalesOrderLine
+from app.schemas.sales import SalesOrderDetailResponse, SalesOrderListItem
+from app.services.order_search import get_order_detail, search_orders
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine("sqlite://")
+    for model in (SalesCustomer, SalesOrder, SalesOrderLine, SalesOrderEvent):
+        model.__table__.create(engine)
+    session = Session(engine)
+    session.add_all(SalesCustomer(id=c, email=f"Customer{c}@Example.com") for c in range(1, 4))
+    for order_id in range(1, 21):
+        session.add(
+            SalesOrder(
+                id=order_id,
+                company_id=1,
+                order_number=f"SO-{order_id}",
+                channel_type="web",
+                external_order_id=str(9000 + order_id),
+                customer_id=order_id % 3 + 1,
+                status="confirmed",
+                total=Decimal("10"),
+            )
+        )
+        session.add_all(
+            SalesOrderLine(
+                order_id=order_id,
+                sku_snapshot=f"SKU-{order_id}-{n}",
+                name_snapshot="Item",
+                quantity=1,
+                unit_price=5,
+                line_total=5,
+            )
+            for n in range(2)
+        )
+        session.add_all(SalesOrderEvent(order_id=order_id, event_type=kind) for kind in ("created", "confirmed"))
+    session.commit()
+    session.expunge_all()
+    yield session
+    session.close()
+
+
+def count_queries(db: Session) -> list[str]:
+    statements: list[str] = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+def test_order_list_loads_lines_and_customers_in_constant_queries(db: Session) -> None:
+    statements = count_queries(db)
+    orders = search_orders(db, limit=20)
+    items = [SalesOrderListItem.model_validate(order) for order in orders]
+
+    assert len(statements) == 3
+    assert [item.id for item in items[:2]] == [20, 19]
+    assert all(len(item.lines) == 2 and item.customer is not None for item in items)
+
+
+def test_order_detail_loads_lines_events_and_customer_up_front(db: Session) -> None:
+    statements = count_queries(db)
+    detail = SalesOrderDetailResponse.model_validate(get_order_detail(db, 7))
+
+    assert len(statements) == 4
+    assert [line.sku_snapshot for line in detail.lines] == ["SKU-7-0", "SKU-7-1"]
+    assert [item.event_type for item in detail.events] == ["created", "confirmed"]
+    assert detail.customer.email == "Customer2@Example.com"
+
+
+@pytest.mark.parametrize("q", ["SO-5", "9005", "SKU-5-1", " SKU-5-1 "])
+def test_search_matches_number_external_id_and_sku(db: Session, q: str) -> None:
+    assert [order.id for order in search_orders(db, q=q)] == [5]
+
+
+def test_search_matches_customer_email_case_insensitively(db: Session) -> None:
+    ids = [order.id for order in search_orders(db, q="customer1@example.com")]
+    assert ids == [order_id for order_id in range(20, 0, -1) if order_id % 3 == 0]
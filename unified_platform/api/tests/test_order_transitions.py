@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models.inventory import InvStockBalance, InvStockMovement
+from app.models.sales import SalesDailyRollup, SalesOrder, SalesOrderLine, SalesShipment
+from app.services.order_transitions import WAVE_TRANSITIONS, plan_transitions, transition_orders
+from app.services.reservation import reserve_orders
+
+
+def test_plan_transitions_reports_every_order_in_request_order() -> None:
+    current = {1: "picking", 2: "confirmed", 3: "shipped"}
+
+    allowed, outcomes = plan_transitions(current, [3, 1, 4, 1], WAVE_TRANSITIONS["pack"])
+
+    assert allowed == [1]
+    assert [(o["order_id"], o["ok"], o["error"]) for o in outcomes] == [
+        (3, False, "shipped -> packed not allowed"),
+        (1, True, None),
+        (4, False, "not_found"),
+    ]
+
+
+def test_woo_processing_orders_can_be_picked() -> None:
+    allowed, _ = plan_transitions({5: "processing", 6: "pending"}, [5, 6], WAVE_TRANSITIONS["pick"])
+
+    assert allowed == [5]
+
+
+def test_pack_then_ship_consumes_stock_and_counts_the_sale_once(pg_db: Session, pg_catalog) -> None:
+    variant_id = pg_catalog.variant_ids[0]
+    balance = InvStockBalance(
+        company_id=pg_catalog.company_id,
+        location_id=pg_catalog.warehouse_id,
+        variant_id=variant_id,
+        on_hand_qty=10,
+        reserved_qty=0,
+        available_qty=10,
+    )
+    pg_db.add(balance)
+    orders = [
+        SalesOrder(
+            company_id=pg_catalog.company_id,
+            order_number=f"SO-WAVE-{n}",
+            channel_type="web",
+            status="confirmed",
+            warehouse_location_id=pg_catalog.warehouse_id,
+        )
+        for n in range(2)
+    ]
+    pg_db.add_all(orders)
+    pg_db.flush()
+    order_ids = [order.id for order in orders]
+    pg_db.add_all(
+        SalesOrderLine(order_id=order_id, variant_id=variant_id, name_snapshot="x", quantity=qty, unit_price=10, line_total=10 * qty)
+        for order_id, qty in zip(order_ids, (3, 4))
+    )
+    pg_db.flush()
+    reserve_orders(pg_db, order_ids)
+    transition_orders(pg_db, order_ids, "pick", user_id=None)
+
+    def stock() -> tuple:
+        pg_db.expire_all()
+        return pg_db.execute(
+            select(InvStockBalance.on_hand_qty, InvStockBalance.reserved_qty, InvStockBalance.available_qty).where(
+                InvStockBalance.id == balance.id
+            )
+        ).one()
+
+    def sold() -> tuple:
+        row = pg_db.execute(
+            select(func.sum(SalesDailyRollup.units), func.sum(SalesDailyRollup.order_lines)).where(
+                SalesDailyRollup.variant_id == variant_id
+            )
+        ).one()
+        return float(row[0] or 0), int(row[1] or 0)
+
+    packed = transition_orders(pg_db, order_ids, "pack", user_id=None)
+    assert [outcome["status"] for outcome in packed] == ["packed", "packed"]
+    assert stock() == (10, 7, 3)
+
+    shipped = transition_orders(pg_db, order_ids, "ship", user_id=None, payload={"carrier_name": "PostNord"})
+    assert [outcome["ok"] for outcome in shipped] == [True, True]
+    assert stock() == (3, 0, 3)
+    shipped_qty = select(SalesOrderLine.shipped_qty).where(SalesOrderLine.order_id.in_(order_ids)).order_by(SalesOrderLine.order_id)
+    assert pg_db.scalars(shipped_qty).all() == [3, 4]
+    movements = select(InvStockMovement.qty).where(
+        InvStockMovement.source_doc_type == "sales_order",
+        InvStockMovement.source_doc_id.in_([str(order_id) for order_id in order_ids]),
+    )
+    assert sorted(pg_db.scalars(movements)) == [3, 4]
+    assert pg_db.scalar(select(func.count()).select_from(SalesShipment).where(SalesShipment.order_id.in_(order_ids))) == 2
+    assert sold() == (7.0, 2)
+    assert all(pg_db.scalars(select(SalesOrder.in_sales_rollup).where(SalesOrder.id.in_(order_ids))))
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.db import partitions
+from app.db.partitions import ensure_monthly_partitions, list_month_partitions
+
+
+def _rows(conn, table: str) -> list:
+    return conn.execute(text(f"SELECT id FROM {table} ORDER BY id")).scalars().all()
+
+
+def test_month_created_after_its_rows_landed_in_the_default_takes_them_over(pg_db: Session, monkeypatch) -> None:
+    conn = pg_db.connection()
+    conn.execute(text("CREATE TABLE test_ledger (id int NOT NULL, moved_at timestamptz NOT NULL) PARTITION BY RANGE (moved_at)"))
+    monkeypatch.setitem(partitions.PARTITIONED_TABLES, "test_ledger", "moved_at")
+    ensure_monthly_partitions(conn, "test_ledger", start=date(2026, 12, 1), end=date(2026, 12, 1))
+    # Nothing covers November or January yet, so these rows go to the default partition.
+    conn.execute(
+        text(
+            "INSERT INTO test_ledger VALUES (1, '2026-11-01 00:00+00'), (2, '2026-11-30 23:59+00'), "
+            "(3, '2026-12-15 12:00+00'), (4, '2027-01-02 08:00+00')"
+        )
+    )
+    assert _rows(conn, "test_ledger_default") == [1, 2, 4]
+
+    created = ensure_monthly_partitions(conn, "test_ledger", start=date(2026, 11, 1), end=date(2027, 1, 1))
+
+    assert created == ["test_ledger_p202611", "test_ledger_p202612", "test_ledger_p202701"]
+    assert _rows(conn, "test_ledger_p202611") == [1, 2]
+    assert _rows(conn, "test_ledger_p202612") == [3]
+    assert _rows(conn, "test_ledger_p202701") == [4]
+    assert _rows(conn, "test_ledger_default") == []
+    assert _rows(conn, "test_ledger") == [1, 2, 3, 4]
+    assert [partition.start for partition in list_month_partitions(conn, "test_ledger")] == [
+        date(2026, 11, 1),
+        date(2026, 12, 1),
+        date(2027, 1, 1),
+    ]
+    # The default is attached again and still catches rows outside every month.
+    conn.execute(text("INSERT INTO test_ledger VALUES (5, '2030-06-01 00:00+00')"))
+    assert _rows(conn, "test_ledger_default") == [5]
+    # Running it again is a no-op.
+    assert ensure_monthly_partitions(conn, "test_ledger", start=date(2026, 11, 1), end=date(2027, 1, 1)) == created
@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+import asyncio
+
+from passlib.context import CryptContext
+
+from app.core.security import password_needs_rehash, verify_password_async
+
+
+def test_outdated_cost_still_verifies_and_is_flagged_for_rehash() -> None:
+    legacy_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("scan1234")
+    assert asyncio.run(verify_password_async("scan1234", legacy_hash)) is True
+    assert asyncio.run(verify_password_async("wrong", legacy_hash)) is False
+    assert password_needs_rehash(legacy_hash) is True
+
+
+def test_unknown_account_is_rejected() -> None:
+    assert asyncio.run(verify_password_async("anything", None)) is False
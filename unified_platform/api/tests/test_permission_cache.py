@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import redis
+
+from app.core.permission_cache import PermissionCache, Principal, RedisVersionStore
+from app.models.core import CoreUser
+
+
+class _CounterStore:
+    def __init__(self) -> None:
+        self.value: int | None = 0
+
+    def current(self) -> int | None:
+        return self.value
+
+    def bump(self) -> None:
+        self.value = (self.value or 0) + 1
+
+
+def _principal() -> Principal:
+    return Principal(user=CoreUser(id=7, email="scanner@example.com"), permissions=frozenset({"purchase.write"}))
+
+
+def test_entry_survives_until_the_version_is_bumped() -> None:
+    store = _CounterStore()
+    cache = PermissionCache(store, ttl_seconds=60)
+    cache.put(7, _principal(), cache.version())
+    assert cache.get(7, cache.version()).permissions == {"purchase.write"}
+
+    cache.invalidate()
+    assert cache.get(7, cache.version()) is None
+
+
+def test_stale_version_from_another_process_misses() -> None:
+    store = _CounterStore()
+    cache = PermissionCache(store, ttl_seconds=60)
+    cache.put(7, _principal(), cache.version())
+    store.value = 5  # bumped elsewhere
+    assert cache.get(7, cache.version()) is None
+
+
+def test_expired_or_unversioned_entries_are_not_served() -> None:
+    store = _CounterStore()
+    expired = PermissionCache(store, ttl_seconds=-1)
+    expired.put(7, _principal(), expired.version())
+    assert expired.get(7, expired.version()) is None
+
+    store.value = None  # Redis unreachable
+    cache = PermissionCache(store, ttl_seconds=60)
+    cache.put(7, _principal(), cache.version())
+    assert cache.get(7, cache.version()) is None
+
+
+class _FakeRedis:
+    def __init__(self) -> None:
+        self.value = 3
+        self.gets = 0
+        self.down = False
+
+    def get(self, key: str) -> bytes:
+        self.gets += 1
+        if self.down:
+            raise redis.ConnectionError("connection refused")
+        return str(self.value).encode()
+
+    def incr(self, key: str) -> int:
+        self.value += 1
+        return self.value
+
+
+def _redis_store(client: _FakeRedis, clock: list[float]) -> RedisVersionStore:
+    store = RedisVersionStore("redis://localhost:6379/0", poll_seconds=1, backoff_seconds=10, clock=lambda: clock[0])
+    store.client = client
+    return store
+
+
+def test_redis_version_is_read_once_per_poll_interval() -> None:
+    client, clock = _FakeRedis(), [100.0]
+    store = _redis_store(client, clock)
+
+    assert [store.current() for _ in range(5)] == [3] * 5
+    assert client.gets == 1
+
+    client.value = 4  # bumped by another process
+    clock[0] += 0.5
+    assert store.current() == 3
+    clock[0] += 0.6
+    assert store.current() == 4
+    assert client.gets == 2
+
+    store.bump()  # a local change is visible at once
+    assert (store.current(), client.gets) == (5, 2)
+
+
+def test_redis_failure_backs_off_before_retrying() -> None:
+    client, clock = _FakeRedis(), [100.0]
+    store = _redis_store(client, clock)
+    client.down = True
+
+    assert [store.current() for _ in range(5)] == [None] * 5
+    assert client.gets == 1
+
+    client.down = False
+    clock[0] += 9
+    assert store.current() is None
+    clock[0] += 2
+    assert store.current() == 3
+    assert client.gets == 2
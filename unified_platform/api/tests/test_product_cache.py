@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from app.models import core, integration, pim  # noqa: F401
+from app.models.integration import IntOutboxEvent
+from app.models.pim import PimBrand, PimPriceListItem, PimProduct, PimProductI18n, PimProductVariant
+from app.services import outbox_follower
+from app.services import product_cache as product_cache_module
+from app.services.product_cache import ProductCache
+
+
+@pytest.fixture()
+def db():
+    engine = create_engine("sqlite://")
+    for model in (PimBrand, PimProduct, PimProductI18n, PimProductVariant, PimPriceListItem, IntOutboxEvent):
+        model.__table__.create(engine)
+    session = Session(engine)
+    session.add(PimBrand(id=1, company_id=1, name="Nordic"))
+    session.add_all(PimProduct(id=n, company_id=1, sku=f"P{n}", brand_id=1) for n in range(1, 4))
+    session.add_all(PimProductI18n(product_id=n, language_code="sv-SE", name=f"Produkt {n}") for n in range(1, 4))
+    session.commit()
+    yield session
+    session.close()
+
+
+def count_queries(db: Session) -> list[str]:
+    statements: list[str] = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+def test_cached_products_are_served_without_queries_in_request_order(db: Session) -> None:
+    cache = ProductCache(max_entries=10, ttl_seconds=60)
+    cache.sync_cursor(db)
+    assert [p["id"] for p in cache.get_many(db, [3, 1, 99])] == [3, 1]
+
+    statements = count_queries(db)
+    payloads = cache.get_many(db, [1, 3])
+    assert statements == []
+    assert [(p["id"], p["name"], p["brand"]) for p in payloads] == [(1, "Produkt 1", "Nordic"), (3, "Produkt 3", "Nordic")]
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 3
+
+
+def test_least_recently_used_entry_is_evicted(db: Session) -> None:
+    cache = ProductCache(max_entries=2, ttl_seconds=60)
+    cache.sync_cursor(db)
+    cache.get_many(db, [1, 2])
+    cache.get_many(db, [1])
+    cache.get_many(db, [3])
+
+    stats = cache.stats()
+    assert (stats["entries"], stats["evictions"]) == (2, 1)
+    statements = count_queries(db)
+    cache.get_many(db, [1, 3])
+    assert statements == []
+
+
+def test_outbox_events_invalidate_entries(db: Session) -> None:
+    cache = ProductCache(max_entries=10, ttl_seconds=60)
+    cache.sync_cursor(db)
+    cache.get_many(db, [1, 2, 3])
+
+    db.get(PimProductI18n, 1).name = "Ny produkt"
+    db.add(IntOutboxEvent(event_name="product.updated", aggregate_type="product", aggregate_id="1", payload={"product_id": 1}))
+    db.commit()
+    assert cache.follow_outbox(db) == 1
+    assert cache.stats()["entries"] == 2
+    assert cache.get_many(db, [1])[0]["name"] == "Ny produkt"
+
+    db.add(IntOutboxEvent(event_name="catalog.imported", aggregate_type="store_connection", aggregate_id="1", payload={}))
+    db.commit()
+    cache.follow_outbox(db)
+    assert cache.stats()["entries"] == 0
+
+
+def test_cache_is_bypassed_until_the_outbox_cursor_is_known(db: Session) -> None:
+    cache = ProductCache(max_entries=10, ttl_seconds=60)
+    cache.get_many(db, [1])
+    assert cache.stats()["entries"] == 0
+
+
+def _product_event(event_id: int, product_id: int) -> IntOutboxEvent:
+    return IntOutboxEvent(
+        id=event_id,
+        event_name="product.updated",
+        aggregate_type="product",
+        aggregate_id=str(product_id),
+        payload={"product_id": product_id},
+    )
+
+
+def test_events_committed_late_below_the_cursor_are_still_applied(db: Session) -> None:
+    cache = ProductCache(max_entries=10, ttl_seconds=60)
+    cache.sync_cursor(db)
+    cache.get_many(db, [1, 2, 3])
+
+    # Ids 1-3 are taken by transactions that have not committed yet.
+    db.add(_product_event(4, 1))
+    db.add(IntOutboxEvent(id=5, event_name="stock.changed", aggregate_type="variant", aggregate_id="1", payload={}))
+    db.commit()
+    assert cache.follow_outbox(db) == 1
+    assert (cache.stats()["entries"], cache.stats()["outbox_cursor"], cache.stats()["outbox_gaps"]) == (2, 5, 3)
+
+    db.add(_product_event(2, 3))
+    db.commit()
+    assert cache.follow_outbox(db) == 1
+    assert (cache.stats()["entries"], cache.stats()["outbox_cursor"], cache.stats()["outbox_gaps"]) == (1, 5, 2)
+
+
+def test_skipped_ids_are_given_up_after_the_gap_window(db: Session, monkeypatch) -> None:
+    cache = ProductCache(max_entries=10, ttl_seconds=60)
+    cache.sync_cursor(db)
+    db.add(_product_event(3, 1))
+    db.commit()
+    cache.follow_outbox(db)
+    assert cache.stats()["outbox_gaps"] == 2
+
+    monkeypatch.setattr(outbox_follower, "OUTBOX_GAP_SECONDS", 0.0)
+    cache.get_many(db, [2])
+    db.add(_product_event(1, 2))
+    db.commit()
+    assert cache.follow_outbox(db) == 0
+    assert (cache.stats()["entries"], cache.stats()["outbox_gaps"]) == (1, 0)
+
+
+def test_reads_on_the_replica_are_served_but_never_stored(db: Session, monkeypatch) -> None:
+    cache = ProductCache(max_entries=10, ttl_seconds=60)
+    cache.sync_cursor(db)
+    cache.get_many(db, [1])
+
+    monkeypatch.setattr(product_cache_module, "read_engine", db.get_bind())
+    assert [p["id"] for p in cache.get_many(db, [1, 2])] == [1, 2]
+    stats = cache.stats()
+    assert (stats["entries"], stats["hits"]) == (1, 1)
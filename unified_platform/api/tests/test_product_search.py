@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from sqlalchemy.dialects import postgresql
+
+from app.services.product_search import escape_like, search_products
+
+
+class _CapturingSession:
+    def __init__(self) -> None:
+        self.statements: list = []
+
+    def execute(self, stmt):
+        self.statements.append(stmt)
+        return []
+
+
+def test_escape_like_neutralises_wildcards() -> None:
+    assert escape_like(r"50%_off\x") == r"50\%\_off\\x"
+
+
+def test_search_matches_every_word_in_each_indexed_field() -> None:
+    db = _CapturingSession()
+    assert search_products(db, "  nordic   mint ") == []
+
+    sql = str(db.statements[0].compile(dialect=postgresql.dialect()))
+    columns = ("pim_product.sku", "pim_product.ean", "pim_product_variant.sku", "pim_product_variant.ean", "pim_product_i18n.name", "pim_brand.name")
+    for column in columns:
+        assert f"similarity({column}" in sql
+        assert sql.count(f"{column} ILIKE") == 3  # prefix bonus + one filter per word
+    assert "ORDER BY score DESC" in sql
+    assert sql.count("LIMIT") == 7  # every branch is capped, then the merged ranking
+
+
+def test_terms_too_short_for_trigrams_match_as_a_prefix() -> None:
+    db = _CapturingSession()
+    search_products(db, "ab")
+
+    statement = db.statements[0].compile(dialect=postgresql.dialect())
+    sql = str(statement)
+    assert sql.count("pim_product.sku) LIKE") == 1
+    assert "ab%" in statement.params.values()
+    assert "%ab%" not in statement.params.values()
+
+    # One long enough word carries the trigram index; the short one only filters.
+    db = _CapturingSession()
+    search_products(db, "ab mint")
+    values = db.statements[0].compile(dialect=postgresql.dialect()).params.values()
+    assert {"%ab%", "%mint%"} <= set(values)
+
+
+def test_blank_query_does_not_hit_the_database() -> None:
+    db = _CapturingSession()
+    assert search_products(db, "   ") == []
+    assert db.statements == []
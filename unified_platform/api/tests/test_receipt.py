@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+from decimal import Decimal
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.inventory import (
+    InvDiscrepancyReport,
+    InvInboundShipment,
+    InvInboundShipmentLine,
+    InvReceivingScanEvent,
+    InvStockBalance,
+    InvStockMovement,
+    InvValuationLayer,
+)
+from app.models.mdm import MdmPartner
+from app.models.procurement import ProcPurchaseOrder, ProcPurchaseOrderLine
+from app.schemas.supply import ShipmentScanBatchItem, ShipmentScanRequest
+from app.services.barcode import BarcodeMatch
+from app.services.receipt import CASE_GTIN_SCAN_RESULT, classify_scan, post_receipt
+
+
+def test_scan_schemas_only_accept_known_results() -> None:
+    assert ShipmentScanRequest(scanned_code="1", code_type="ean13", scan_result="ok").scan_result == "ok"
+    with pytest.raises(ValidationError):
+        ShipmentScanRequest(scanned_code="1", code_type="ean13", scan_result="OK!")
+    with pytest.raises(ValidationError):
+        ShipmentScanBatchItem(client_seq=1, scanned_code="1", code_type="ean13", scan_result="")
+
+
+def test_case_gtin_scans_are_flagged_and_kept_off_the_lines() -> None:
+    unit = BarcodeMatch(variant_id=7, product_id=1, sku="A", source="variant_ean")
+    case = BarcodeMatch(variant_id=7, product_id=1, sku="A", source="variant_ean", pack_indicator=1)
+
+    assert classify_scan(unit, None, "ok", {7: 70}) == (70, "ok")
+    assert classify_scan(unit, 71, "ok", {7: 70}) == (71, "ok")
+    assert classify_scan(None, None, "unknown", {7: 70}) == (None, "unknown")
+    assert classify_scan(case, None, "ok", {7: 70}) == (None, CASE_GTIN_SCAN_RESULT)
+    assert classify_scan(case, 70, "ok", {7: 70}) == (None, CASE_GTIN_SCAN_RESULT)
+
+
+def test_post_receipt_books_stock_cost_and_discrepancies(pg_db: Session, pg_catalog) -> None:
+    scanned_variant, counted_variant = pg_catalog.variant_ids
+    location_id = pg_catalog.warehouse_id
+    supplier = MdmPartner(partner_type="supplier", legal_name="Supplier AB")
+    pg_db.add(supplier)
+    pg_db.flush()
+    po = ProcPurchaseOrder(
+        company_id=pg_catalog.company_id,
+        po_number="PO-R-1",
+        supplier_id=supplier.id,
+        destination_location_id=location_id,
+        currency_code="SEK",
+    )
+    pg_db.add(po)
+    pg_db.flush()
+    po_lines = [
+        ProcPurchaseOrderLine(po_id=po.id, variant_id=variant_id, ordered_qty=5, received_qty=1, unit_cost=cost)
+        for variant_id, cost in ((scanned_variant, 12.5), (counted_variant, 4))
+    ]
+    pg_db.add_all(po_lines)
+    # The scanned variant already has stock here; the counted one gets a new balance.
+    pg_db.add(
+        InvStockBalance(
+            company_id=pg_catalog.company_id,
+            location_id=location_id,
+            variant_id=scanned_variant,
+            on_hand_qty=2,
+            reserved_qty=1,
+            available_qty=1,
+        )
+    )
+    shipment = InvInboundShipment(
+        company_id=pg_catalog.company_id,
+        po_id=po.id,
+        supplier_id=supplier.id,
+        source_type="po",
+        destination_location_id=location_id,
+    )
+    pg_db.add(shipment)
+    pg_db.flush()
+    scanned_line, counted_line = (
+        InvInboundShipmentLine(shipment_id=shipment.id, po_line_id=po_line.id, variant_id=po_line.variant_id, expected_qty=4, received_qty=qty)
+        for po_line, qty in zip(po_lines, (0, 4), strict=True)
+    )
+    pg_db.add_all([scanned_line, counted_line])
+    pg_db.flush()
+    # Three accepted scans, one damaged and one case GTIN that must not count.
+    pg_db.add_all(
+        InvReceivingScanEvent(
+            shipment_id=shipment.id, shipment_line_id=line_id, scanned_code="x", code_type="ean13", scan_result=result
+        )
+        for line_id, result in (
+            (scanned_line.id, "ok"),
+            (scanned_line.id, "match"),
+            (scanned_line.id, "ok"),
+            (scanned_line.id, "damaged"),
+            (None, CASE_GTIN_SCAN_RESULT),
+        )
+    )
+
+    result = post_receipt(pg_db, shipment, user_id=None)
+
+    assert (result.lines, result.received_qty, result.discrepancies) == (2, Decimal("7"), 1)
+    assert result.touched == {(location_id, scanned_variant), (location_id, counted_variant)}
+    balances = {
+        row.variant_id: (row.on_hand_qty, row.reserved_qty, row.available_qty)
+        for row in pg_db.execute(
+            select(InvStockBalance.variant_id, InvStockBalance.on_hand_qty, InvStockBalance.reserved_qty, InvStockBalance.available_qty).where(
+                InvStockBalance.location_id == location_id
+            )
+        )
+    }
+    assert balances == {scanned_variant: (5, 1, 4), counted_variant: (4, 0, 4)}
+    movements = pg_db.execute(
+        select(InvStockMovement.id, InvStockMovement.variant_id, InvStockMovement.qty, InvStockMovement.movement_type)
+        .where(InvStockMovement.source_doc_type == "inbound_shipment", InvStockMovement.source_doc_id == str(shipment.id))
+        .order_by(InvStockMovement.id)
+    ).all()
+    assert [(row.variant_id, row.qty, row.movement_type) for row in movements] == [
+        (scanned_variant, 3, "receipt"),
+        (counted_variant, 4, "receipt"),
+    ]
+    assert [row.id for row in movements] == result.movement_ids
+    layers = pg_db.execute(
+        select(InvValuationLayer.movement_id, InvValuationLayer.unit_cost, InvValuationLayer.remaining_cost)
+        .where(InvValuationLayer.movement_id.in_(result.movement_ids))
+        .order_by(InvValuationLayer.movement_id)
+    ).all()
+    assert [(row.unit_cost, row.remaining_cost) for row in layers] == [(Decimal("12.5"), Decimal("37.5")), (4, 16)]
+    assert pg_db.scalars(select(ProcPurchaseOrderLine.received_qty).where(ProcPurchaseOrderLine.po_id == po.id).order_by(ProcPurchaseOrderLine.id)).all() == [4, 5]
+    lines = pg_db.execute(
+        select(InvInboundShipmentLine.received_qty, InvInboundShipmentLine.discrepancy_qty)
+        .where(InvInboundShipmentLine.shipment_id == shipment.id)
+        .order_by(InvInboundShipmentLine.id)
+    ).all()
+    assert lines == [(3, -1), (4, 0)]
+    reports = pg_db.execute(
+        select(InvDiscrepancyReport.shipment_line_id, InvDiscrepancyReport.issue_type, InvDiscrepancyReport.received_qty).where(
+            InvDiscrepancyReport.shipment_id == shipment.id
+        )
+    ).all()
+    assert reports == [(scanned_line.id, "short_receipt", 3)]
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import numpy as np
+
+from app.services.replenishment import lookup, plan_replenishment, scope_keys
+
+
+def test_lookup_matches_packed_scopes_and_defaults_to_zero() -> None:
+    table_keys = scope_keys(np.array([2, 1]), np.array([10, 10]))
+    keys = scope_keys(np.array([1, 2, 3]), np.array([10, 10, 10]))
+
+    values = lookup(keys, table_keys, np.array([5.0, 7.0]))
+
+    assert values.tolist() == [7.0, 5.0, 0.0]
+
+
+def test_plan_orders_up_to_max_in_reorder_multiples() -> None:
+    plan = plan_replenishment(
+        on_hand=np.array([4.0, 50.0, 10.0]),
+        incoming=np.array([0.0, 0.0, 0.0]),
+        daily_demand=np.array([1.0, 1.0, 2.0]),
+        lead_time_days=np.array([2.0, 2.0, 3.0]),
+        min_qty=np.array([5.0, 5.0, 5.0]),
+        max_qty=np.array([20.0, 20.0, 30.0]),
+        reorder_qty=np.array([0.0, 0.0, 12.0]),
+    )
+
+    # Scope 0: 4 - 2 = 2 <= 5 -> order up to 20. Scope 1: well stocked.
+    # Scope 2: 10 - 6 = 4 <= 5 -> shortfall 26, rounded up to packs of 12.
+    assert plan.suggested_qty.tolist() == [18.0, 0.0, 36.0]
+    assert plan.lead_time_demand.tolist() == [2.0, 2.0, 6.0]
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import threading
+
+from app.db.replica import ReplicaHealth
+
+
+class _ProbedHealth(ReplicaHealth):
+    def __init__(self, lags: list[float | None], **kwargs) -> None:
+        super().__init__(bind=object(), max_lag_seconds=5.0, **kwargs)
+        self.lags = lags
+
+    def probe(self) -> float | None:
+        return self.lags.pop(0)
+
+
+def test_without_replica_reads_go_to_primary() -> None:
+    assert ReplicaHealth(None, max_lag_seconds=5.0).is_usable() is False
+
+
+def test_lagging_or_unreachable_replica_falls_back() -> None:
+    health = _ProbedHealth([0.0, 12.0, None], interval=0)
+    assert health.is_usable() is True
+    assert health.is_usable() is False
+    assert health.is_usable() is False
+
+
+def test_verdict_is_cached_between_probes() -> None:
+    health = _ProbedHealth([0.0, 99.0], interval=60)
+    assert health.is_usable() is True
+    assert health.is_usable() is True
+    assert health.lags == [99.0]
+
+
+def test_requests_keep_the_last_verdict_while_a_probe_is_running() -> None:
+    started, release = threading.Event(), threading.Event()
+
+    class _SlowHealth(_ProbedHealth):
+        def probe(self) -> float | None:
+            started.set()
+            release.wait(5)
+            return super().probe()
+
+    health = _SlowHealth([99.0], interval=0)
+    prober = threading.Thread(target=health.is_usable)
+    prober.start()
+    assert started.wait(5)
+
+    assert health.is_usable() is False  # answered from the cached verdict, no second probe
+    assert health.lags == [99.0]
+    release.set()
+    prober.join(5)
+    assert health.lags == [] and health.lag_seconds == 99.0
@@ -0,0 +1,299 @@
+from __future__ import annotations
+
+import threading
+from decimal import Decimal
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.db.session import engine
+from app.models.integration import IntStoreChannel, IntStoreConnection, IntSyncQueue
+from app.models.inventory import InvLot, InvStockBalance, InvStockMovement
+from app.models.sales import SalesOrder, SalesOrderLine
+from app.services.reservation import consume_orders, enqueue_stock_pushes, release_orders, reserve_orders
+from app.tasks import wgr as wgr_tasks
+
+
+def _order(db: Session, catalog, number: str, *quantities: tuple[int, int]) -> int:
+    order = SalesOrder(
+        company_id=catalog.company_id,
+        order_number=number,
+        channel_type="web",
+        status="confirmed",
+        warehouse_location_id=catalog.warehouse_id,
+    )
+    db.add(order)
+    db.flush()
+    db.add_all(
+        SalesOrderLine(order_id=order.id, variant_id=variant_id, name_snapshot="x", quantity=qty, unit_price=10, line_total=10 * qty)
+        for variant_id, qty in quantities
+    )
+    db.flush()
+    return order.id
+
+
+def _balance(db: Session, catalog, variant_id: int, on_hand: int, reserved: int = 0) -> InvStockBalance:
+    balance = InvStockBalance(
+        company_id=catalog.company_id,
+        location_id=catalog.warehouse_id,
+        variant_id=variant_id,
+        on_hand_qty=on_hand,
+        reserved_qty=reserved,
+        available_qty=on_hand - reserved,
+    )
+    db.add(balance)
+    db.flush()
+    return balance
+
+
+def _quantities(db: Session, balance_id: int) -> tuple[Decimal, Decimal, Decimal]:
+    row = db.execute(
+        select(InvStockBalance.on_hand_qty, InvStockBalance.reserved_qty, InvStockBalance.available_qty).where(
+            InvStockBalance.id == balance_id
+        )
+    ).one()
+    return tuple(Decimal(value) for value in row)
+
+
+def _line_qty(db: Session, order_id: int, column):
+    return db.scalar(select(column).where(SalesOrderLine.order_id == order_id))
+
+
+def test_reserve_grants_oldest_first_and_reports_the_short(pg_db: Session, pg_catalog) -> None:
+    variant_id = pg_catalog.variant_ids[0]
+    balance = _balance(pg_db, pg_catalog, variant_id, on_hand=5)
+    first = _order(pg_db, pg_catalog, "SO-R-1", (variant_id, 3))
+    second = _order(pg_db, pg_catalog, "SO-R-2", (variant_id, 4))
+
+    result = reserve_orders(pg_db, [first, second])
+
+    assert result.reserved_lines == 2
+    assert result.short == {second: Decimal("2")}
+    assert result.variant_ids == {variant_id}
+    assert _quantities(pg_db, balance.id) == (5, 5, 0)
+    assert _line_qty(pg_db, first, SalesOrderLine.reserved_qty) == 3
+    assert _line_qty(pg_db, second, SalesOrderLine.reserved_qty) == 2
+    # Nothing left to grant: a second pass reserves nothing and stays short.
+    assert reserve_orders(pg_db, [second]).short == {second: Decimal("2")}
+
+
+def test_release_returns_the_reservation_and_never_more_than_is_reserved(pg_db: Session, pg_catalog) -> None:
+    variant_id = pg_catalog.variant_ids[0]
+    balance = _balance(pg_db, pg_catalog, variant_id, on_hand=5)
+    first = _order(pg_db, pg_catalog, "SO-R-1", (variant_id, 3))
+    second = _order(pg_db, pg_catalog, "SO-R-2", (variant_id, 2))
+    reserve_orders(pg_db, [first, second])
+
+    assert release_orders(pg_db, [second]) == {variant_id}
+    assert _quantities(pg_db, balance.id) == (5, 3, 2)
+    assert _line_qty(pg_db, second, SalesOrderLine.reserved_qty) == 0
+
+    # The balance lost part of the reservation elsewhere: release clamps instead of skipping.
+    pg_db.get(InvStockBalance, balance.id).reserved_qty = 1
+    pg_db.flush()
+    release_orders(pg_db, [first])
+    assert _quantities(pg_db, balance.id) == (5, 0, 3)
+    assert _line_qty(pg_db, first, SalesOrderLine.reserved_qty) == 0
+
+
+def test_consume_ships_reserved_and_unreserved_quantity(pg_db: Session, pg_catalog) -> None:
+    variant_id = pg_catalog.variant_ids[0]
+    balance = _balance(pg_db, pg_catalog, variant_id, on_hand=10)
+    order_id = _order(pg_db, pg_catalog, "SO-C-1", (variant_id, 4))
+    reserve_orders(pg_db, [order_id])
+    # Ordered quantity grew after the reservation: the extra unit comes off available.
+    line = pg_db.scalar(select(SalesOrderLine).where(SalesOrderLine.order_id == order_id))
+    line.quantity = 5
+    pg_db.flush()
+
+    assert consume_orders(pg_db, [order_id]) == {variant_id}
+
+    assert _quantities(pg_db, balance.id) == (5, 0, 5)
+    assert _line_qty(pg_db, order_id, SalesOrderLine.shipped_qty) == 5
+    movements = pg_db.execute(
+        select(InvStockMovement.movement_type, InvStockMovement.source_location_id, InvStockMovement.qty).where(
+            InvStockMovement.source_doc_type == "sales_order", InvStockMovement.source_doc_id == str(order_id)
+        )
+    ).all()
+    assert movements == [("sale", pg_catalog.warehouse_id, 5)]
+
+
+def test_consume_ships_from_the_warehouse_bins_in_pick_order(pg_db: Session, pg_catalog) -> None:
+    variant_id = pg_catalog.variant_ids[0]
+    lot = InvLot(variant_id=variant_id, lot_number="L1", expiry_date="2027-01-31")
+    pg_db.add(lot)
+    pg_db.flush()
+    for lot_id, qty in ((None, 5), (lot.id, 2)):
+        pg_db.add(
+            InvStockBalance(
+                company_id=pg_catalog.company_id,
+                location_id=pg_catalog.bin_id,
+                variant_id=variant_id,
+                lot_id=lot_id,
+                on_hand_qty=qty,
+                reserved_qty=0,
+                available_qty=qty,
+            )
+        )
+    order_id = _order(pg_db, pg_catalog, "SO-C-3", (variant_id, 4))
+    reserve_orders(pg_db, [order_id])
+
+    consume_orders(pg_db, [order_id])
+
+    movements = pg_db.execute(
+        select(InvStockMovement.source_location_id, InvStockMovement.lot_id, InvStockMovement.qty)
+        .where(InvStockMovement.source_doc_type == "sales_order", InvStockMovement.source_doc_id == str(order_id))
+        .order_by(InvStockMovement.id)
+    ).all()
+    assert movements == [(pg_catalog.bin_id, lot.id, 2), (pg_catalog.bin_id, None, 2)]
+    left = dict(pg_db.execute(select(InvStockBalance.lot_id, InvStockBalance.on_hand_qty).where(InvStockBalance.variant_id == variant_id)).all())
+    assert left == {lot.id: 0, None: 3}
+
+
+def test_consume_without_a_balance_row_writes_no_movement(pg_db: Session, pg_catalog) -> None:
+    stocked, unstocked = pg_catalog.variant_ids
+    _balance(pg_db, pg_catalog, stocked, on_hand=2)
+    order_id = _order(pg_db, pg_catalog, "SO-C-2", (stocked, 1), (unstocked, 1))
+
+    assert consume_orders(pg_db, [order_id]) == {stocked}
+
+    shipped = pg_db.scalars(select(SalesOrderLine.shipped_qty).where(SalesOrderLine.order_id == order_id)).all()
+    assert shipped == [1, 1]
+    variants = pg_db.scalars(
+        select(InvStockMovement.variant_id).where(
+            InvStockMovement.source_doc_type == "sales_order", InvStockMovement.source_doc_id == str(order_id)
+        )
+    ).all()
+    assert variants == [stocked]
+
+
+def _stores(db: Session, catalog, location_id: int) -> dict[str, int]:
+    """A Woo and a WGR connection on one channel; WGR books its stock at location_id (the channel id)."""
+    channel = IntStoreChannel(id=location_id, company_id=catalog.company_id, name="Shop", channel_type="web", base_url="https://shop.test")
+    db.add(channel)
+    db.flush()
+    connections = {
+        provider: IntStoreConnection(
+            store_channel_id=channel.id, provider=provider, api_base_url="https://api.test", consumer_key="k", consumer_secret="s"
+        )
+        for provider in ("woocommerce", "wgr")
+    }
+    db.add_all(connections.values())
+    db.flush()
+    return {provider: connection.id for provider, connection in connections.items()}
+
+
+def _queued(db: Session, connection_id: int) -> list[dict]:
+    return db.scalars(
+        select(IntSyncQueue.payload).where(IntSyncQueue.store_connection_id == connection_id).order_by(IntSyncQueue.id)
+    ).all()
+
+
+def test_stock_pushes_go_to_woo_and_wgr_stores(pg_db: Session, pg_catalog) -> None:
+    variant_id = pg_catalog.variant_ids[0]
+    _balance(pg_db, pg_catalog, variant_id, on_hand=7, reserved=2)
+    pg_db.add(
+        InvStockBalance(
+            company_id=pg_catalog.company_id,
+            location_id=pg_catalog.bin_id,
+            variant_id=variant_id,
+            on_hand_qty=4,
+            reserved_qty=1,
+            available_qty=3,
+        )
+    )
+    connections = _stores(pg_db, pg_catalog, pg_catalog.bin_id)
+
+    enqueue_stock_pushes(pg_db, {variant_id})
+    sku = f"TEST-{pg_catalog.company_id}-0"
+    # Woo sells the total; WGR only holds its own location.
+    assert _queued(pg_db, connections["woocommerce"]) == [{"sku": sku, "qty": 8, "variant_id": variant_id}]
+    assert _queued(pg_db, connections["wgr"]) == [{"sku": sku, "qty": 3, "variant_id": variant_id}]
+
+    enqueue_stock_pushes(pg_db, {variant_id}, providers=("woocommerce",))
+    assert len(_queued(pg_db, connections["woocommerce"])) == 2
+    assert len(_queued(pg_db, connections["wgr"])) == 1
+
+
+def test_wgr_push_then_poll_leaves_balances_unchanged(pg_db: Session, pg_catalog, monkeypatch) -> None:
+    variant_id = pg_catalog.variant_ids[0]
+    warehouse = _balance(pg_db, pg_catalog, variant_id, on_hand=10, reserved=0)
+    store = InvStockBalance(
+        company_id=pg_catalog.company_id,
+        location_id=pg_catalog.bin_id,
+        variant_id=variant_id,
+        on_hand_qty=4,
+        reserved_qty=1,
+        available_qty=3,
+    )
+    pg_db.add(store)
+    connections = _stores(pg_db, pg_catalog, pg_catalog.bin_id)
+    pg_db.flush()
+    balance_ids = (warehouse.id, store.id)  # the tasks close the session they were handed
+    wgr_stock: dict[str, int] = {}
+
+    class _WGR:
+        def __init__(self, *args) -> None:
+            pass
+
+        async def set_stock(self, sku: str, qty: int) -> bool:
+            wgr_stock[sku] = qty
+            return True
+
+        async def get_stock(self, updated_from=None) -> list[dict]:
+            return [{"articleNumber": sku, "stock": qty} for sku, qty in wgr_stock.items()]
+
+    monkeypatch.setattr(wgr_tasks, "SessionLocal", lambda: pg_db)
+    monkeypatch.setattr(wgr_tasks, "WGRClient", _WGR)
+
+    for _ in range(2):
+        enqueue_stock_pushes(pg_db, {variant_id}, providers=("wgr",))
+        wgr_tasks.push_stock()
+        wgr_tasks.poll_stock()
+
+    assert wgr_stock == {f"TEST-{pg_catalog.company_id}-0": 3}
+    assert _quantities(pg_db, balance_ids[0]) == (10, 0, 10)
+    assert _quantities(pg_db, balance_ids[1]) == (4, 1, 3)
+    assert not pg_db.scalars(select(InvStockMovement.id).where(InvStockMovement.variant_id == variant_id)).all()
+    assert len(_queued(pg_db, connections["woocommerce"])) == 2  # the polls still refresh Woo
+
+
+def test_concurrent_reservers_never_oversell_a_balance(pg_committed_catalog) -> None:
+    catalog = pg_committed_catalog
+    variant_id = catalog.variant_ids[0]
+    with Session(engine) as db:
+        balance_id = _balance(db, catalog, variant_id, on_hand=5).id
+        order_ids = [_order(db, catalog, f"SO-X-{n}", (variant_id, 4)) for n in range(2)]
+        db.commit()
+
+    barrier = threading.Barrier(2)
+    results = {}
+    errors = []
+
+    def reserve(order_id: int) -> None:
+        try:
+            with Session(engine) as db:
+                barrier.wait(timeout=10)
+                results[order_id] = reserve_orders(db, [order_id])
+                db.commit()
+        except Exception as exc:  # surfaced by the assert below
+            errors.append(exc)
+
+    try:
+        threads = [threading.Thread(target=reserve, args=(order_id,)) for order_id in order_ids]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=30)
+
+        assert errors == []
+        # Whichever locked the balance first got 4; the other got the last unit.
+        assert sorted(sum(results[order_id].short.values(), Decimal("0")) for order_id in order_ids) == [0, 3]
+        with Session(engine) as db:
+            assert _quantities(db, balance_id) == (5, 5, 0)
+    finally:
+        with Session(engine) as db:
+            db.execute(delete(SalesOrderLine).where(SalesOrderLine.order_id.in_(order_ids)))
+            db.execute(delete(SalesOrder).where(SalesOrder.id.in_(order_ids)))
+            db.execute(delete(InvStockBalance).where(InvStockBalance.id == balance_id))
+            db.commit()
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from datetime import timedelta
+
+from sqlalchemy import create_engine, func, select, update
+from sqlalchemy.orm import Session
+
+from app.models.sales import SalesDailyRollup, SalesOrder, SalesOrderLine
+from app.services.sales_rollup import local_today, sync_sales_rollup, total_units, units_by_variant, velocity
+
+
+def test_velocity_sums_each_window_from_the_rollup() -> None:
+    engine = create_engine("sqlite://")
+    SalesDailyRollup.__table__.create(engine)
+    db = Session(engine)
+    today = local_today()
+    db.add_all(
+        SalesDailyRollup(sales_date=today - timedelta(days=age), channel_type=channel, variant_id=variant_id, units=units, revenue=0, order_lines=1)
+        for age, channel, variant_id, units in [
+            (0, "web", 1, 2),
+            (6, "wgr", 1, 5),
+            (7, "web", 1, 3),
+            (29, "web", 1, 10),
+            (89, "web", 1, 100),
+            (90, "web", 1, 1000),
+            (3, "web", 2, 7),
+        ]
+    )
+    db.commit()
+
+    rows = velocity(db)
+    assert [row["variant_id"] for row in rows] == [1, 2]
+    assert [(window["days"], window["units"]) for window in rows[0]["windows"]] == [(7, 7.0), (30, 20.0), (90, 120.0)]
+    assert rows[0]["windows"][0]["per_day"] == 1.0
+
+    web = velocity(db, variant_ids=[1], channel="web")
+    assert [window["units"] for window in web[0]["windows"]] == [2.0, 15.0, 115.0]
+    assert sorted(units_by_variant(db, 7)) == [(1, 7.0), (2, 7.0)]
+    assert total_units(db, 30) == 27.0
+
+
+def test_sync_counts_an_order_once_across_cancel_and_reopen(pg_db: Session, pg_catalog) -> None:
+    variant_id = pg_catalog.variant_ids[0]
+    order = SalesOrder(company_id=pg_catalog.company_id, order_number="SO-ROLLUP-1", channel_type="web", status="confirmed")
+    pg_db.add(order)
+    pg_db.flush()
+    pg_db.add(SalesOrderLine(order_id=order.id, variant_id=variant_id, name_snapshot="x", quantity=3, unit_price=10, line_total=30))
+
+    def rollup() -> tuple:
+        row = pg_db.execute(
+            select(func.sum(SalesDailyRollup.units), func.sum(SalesDailyRollup.order_lines)).where(
+                SalesDailyRollup.variant_id == variant_id
+            )
+        ).one()
+        return float(row[0] or 0), int(row[1] or 0)
+
+    assert sync_sales_rollup(pg_db, [order.id]) == {"added": 1, "removed": 0}
+    assert sync_sales_rollup(pg_db, [order.id]) == {"added": 0, "removed": 0}
+    assert rollup() == (3.0, 1)
+
+    pg_db.execute(update(SalesOrder).where(SalesOrder.id == order.id).values(status="cancelled"))
+    assert sync_sales_rollup(pg_db, [order.id]) == {"added": 0, "removed": 1}
+    assert sync_sales_rollup(pg_db, [order.id]) == {"added": 0, "removed": 0}
+    assert rollup() == (0.0, 0)
+
+    pg_db.execute(update(SalesOrder).where(SalesOrder.id == order.id).values(status="processing"))
+    assert sync_sales_rollup(pg_db, [order.id]) == {"added": 1, "removed": 0}
+    assert rollup() == (3.0, 1)
+    assert pg_db.scalar(select(SalesOrder.in_sales_rollup).where(SalesOrder.id == order.id)) is True
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.inventory import InvReplenishmentRule, InvStockAlert, InvStockBalance
+from app.services.stock_alerts import LOW_STOCK, AlertScope, evaluate_touched, sync_alerts
+
+
+def test_alert_scope_breaches_strictly_below_the_threshold() -> None:
+    assert AlertScope(1, 1, 1, threshold=5, current=4.99).breached
+    assert not AlertScope(1, 1, 1, threshold=5, current=5).breached
+
+
+def _alerts(db: Session, catalog) -> dict:
+    rows = db.execute(
+        select(InvStockAlert.location_id, InvStockAlert.variant_id, InvStockAlert.status, InvStockAlert.current_value)
+        .where(InvStockAlert.company_id == catalog.company_id)
+        .order_by(InvStockAlert.id)
+    )
+    return {(row.location_id, row.variant_id, row.status): row.current_value for row in rows}
+
+
+def _setup(db: Session, catalog) -> dict[tuple[int, int], InvStockBalance]:
+    """Rules with min 5 on three pairs; the bin pair already has an alert and stock again."""
+    first, second = catalog.variant_ids
+    on_hand = {(catalog.warehouse_id, first): 2, (catalog.warehouse_id, second): 10, (catalog.bin_id, first): 10}
+    balances = {}
+    for (location_id, variant_id), qty in on_hand.items():
+        db.add(
+            InvReplenishmentRule(
+                company_id=catalog.company_id,
+                location_id=location_id,
+                variant_id=variant_id,
+                min_qty=5,
+                max_qty=20,
+                reorder_qty=0,
+            )
+        )
+        balances[location_id, variant_id] = InvStockBalance(
+            company_id=catalog.company_id,
+            location_id=location_id,
+            variant_id=variant_id,
+            on_hand_qty=qty,
+            reserved_qty=0,
+            available_qty=qty,
+        )
+    db.add_all(balances.values())
+    for location_id, variant_id in ((catalog.warehouse_id, second), (catalog.bin_id, first)):
+        db.add(
+            InvStockAlert(
+                company_id=catalog.company_id,
+                location_id=location_id,
+                variant_id=variant_id,
+                alert_type=LOW_STOCK,
+                threshold_value=5,
+                current_value=1,
+            )
+        )
+    db.flush()
+    return balances
+
+
+def test_evaluate_touched_raises_keeps_and_clears_alerts_for_touched_pairs_only(pg_db: Session, pg_catalog) -> None:
+    first, second = pg_catalog.variant_ids
+    warehouse, bin_id = pg_catalog.warehouse_id, pg_catalog.bin_id
+    balances = _setup(pg_db, pg_catalog)
+
+    # (bin, second) has no rule and is ignored; (bin, first) is not touched and keeps its alert.
+    result = evaluate_touched(pg_db, [(warehouse, first), (warehouse, second), (bin_id, second)])
+
+    assert result == {"opened": 1, "updated": 0, "resolved": 1}
+    assert _alerts(pg_db, pg_catalog) == {
+        (warehouse, second, "resolved"): 1,
+        (bin_id, first, "open"): 1,
+        (warehouse, first, "open"): 2,
+    }
+
+    # Still short: the open alert is kept and refreshed, not duplicated.
+    balances[warehouse, first].on_hand_qty = 3
+    assert evaluate_touched(pg_db, [(warehouse, first)]) == {"opened": 0, "updated": 1, "resolved": 0}
+    assert evaluate_touched(pg_db, [(warehouse, first)]) == {"opened": 0, "updated": 0, "resolved": 0}
+    assert _alerts(pg_db, pg_catalog)[warehouse, first, "open"] == 3
+
+    balances[warehouse, first].on_hand_qty = 5
+    assert evaluate_touched(pg_db, [(warehouse, first)]) == {"opened": 0, "updated": 0, "resolved": 1}
+    assert (warehouse, first, "resolved") in _alerts(pg_db, pg_catalog)
+    assert (bin_id, first, "open") in _alerts(pg_db, pg_catalog)
+
+
+def test_sync_alerts_full_scan_resolves_scopes_that_were_not_evaluated(pg_db: Session, pg_catalog) -> None:
+    first, second = pg_catalog.variant_ids
+    warehouse, bin_id = pg_catalog.warehouse_id, pg_catalog.bin_id
+    _setup(pg_db, pg_catalog)
+    kept = AlertScope(pg_catalog.company_id, warehouse, second, threshold=5, current=4)
+
+    sync_alerts(pg_db, [kept])
+    assert _alerts(pg_db, pg_catalog) == {(warehouse, second, "open"): 4, (bin_id, first, "open"): 1}
+
+    sync_alerts(pg_db, [kept], full_scan=True)
+    assert _alerts(pg_db, pg_catalog) == {(warehouse, second, "open"): 4, (bin_id, first, "resolved"): 1}
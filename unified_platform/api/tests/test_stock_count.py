@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.core import CoreAuditEvent
+from app.models.inventory import InvCountLine, InvCountSession, InvLot, InvStockBalance, InvStockMovement
+from app.services.stock_count import close_count_session
+from app.tasks import inventory as inventory_tasks
+
+
+def _count_session(db: Session, catalog) -> tuple[InvCountSession, dict]:
+    """Four count lines at the warehouse, in id order:
+    unchanged balance, balance counted down, new lot with no balance, zero count with no balance."""
+    first, second = catalog.variant_ids
+    lots = [InvLot(variant_id=variant_id, lot_number=f"L{variant_id}") for variant_id in (first, second)]
+    db.add_all(lots)
+    db.flush()
+    db.add_all(
+        InvStockBalance(
+            company_id=catalog.company_id,
+            location_id=catalog.warehouse_id,
+            variant_id=variant_id,
+            on_hand_qty=qty,
+            reserved_qty=1,
+            available_qty=qty - 1,
+        )
+        for variant_id, qty in ((second, 2), (first, 5))
+    )
+    session = InvCountSession(company_id=catalog.company_id, location_id=catalog.warehouse_id, status="in_progress")
+    db.add(session)
+    db.flush()
+    scopes = {
+        "unchanged": (second, None, 2),
+        "counted_down": (first, None, 3),
+        "new_lot": (first, lots[0].id, 4),
+        "zero": (second, lots[1].id, 0),
+    }
+    for variant_id, lot_id, counted in scopes.values():
+        db.add(
+            InvCountLine(
+                session_id=session.id, variant_id=variant_id, lot_id=lot_id, expected_qty=0, counted_qty=counted, diff_qty=counted
+            )
+        )
+        db.flush()
+    return session, scopes
+
+
+def _balances(db: Session, location_id: int) -> dict:
+    return {
+        (row.variant_id, row.lot_id): (row.on_hand_qty, row.available_qty)
+        for row in db.execute(
+            select(InvStockBalance.variant_id, InvStockBalance.lot_id, InvStockBalance.on_hand_qty, InvStockBalance.available_qty).where(
+                InvStockBalance.location_id == location_id
+            )
+        )
+    }
+
+
+def test_close_writes_diff_movements_and_balances_across_chunks(pg_db: Session, pg_catalog) -> None:
+    session, scopes = _count_session(pg_db, pg_catalog)
+    progress = []
+
+    result = close_count_session(
+        pg_db, session=session, user_id=None, progress=lambda done, total: progress.append((done, total)), chunk_size=2
+    )
+
+    # Two chunks of two line ids; the balance update falls in the first, the insert in the second.
+    assert progress == [(2, 4), (4, 4)]
+    assert result == {"lines": 4, "adjusted": 2}
+    assert session.status == "closed"
+    movements = pg_db.execute(
+        select(InvStockMovement.movement_type, InvStockMovement.variant_id, InvStockMovement.lot_id, InvStockMovement.qty)
+        .where(InvStockMovement.source_doc_type == "count_session", InvStockMovement.source_doc_id == str(session.id))
+        .order_by(InvStockMovement.id)
+    ).all()
+    first, _ = pg_catalog.variant_ids
+    assert movements == [
+        ("count_adjustment", first, None, -2),
+        ("count_adjustment", first, scopes["new_lot"][1], 4),
+    ]
+    assert _balances(pg_db, pg_catalog.warehouse_id) == {
+        scopes["unchanged"][:2]: (2, 1),
+        scopes["counted_down"][:2]: (3, 2),
+        scopes["new_lot"][:2]: (4, 4),
+    }
+
+
+def test_background_close_writes_the_same_audit_event(pg_db: Session, pg_catalog, monkeypatch) -> None:
+    session, _ = _count_session(pg_db, pg_catalog)
+    session.status = "closing"
+    pg_db.flush()
+    session_id = session.id  # the task closes the session it was handed
+    monkeypatch.setattr(inventory_tasks, "SessionLocal", lambda: pg_db)
+    monkeypatch.setattr(inventory_tasks.close_count_session, "update_state", lambda **kwargs: None)
+
+    assert inventory_tasks.close_count_session(session_id, None)["status"] == "closed"
+
+    event = pg_db.scalar(
+        select(CoreAuditEvent).where(CoreAuditEvent.entity_type == "inv_count_session", CoreAuditEvent.entity_id == str(session_id))
+    )
+    assert event.action == "close"
+    assert event.before_jsonb == {"status": "in_progress"}
+    assert event.after_jsonb == {"status": "closed", "lines": 4, "adjusted": 2}
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.orm import Session
+
+from app.db.session import engine
+from app.models.inventory import InvLot, InvStockBalance, InvStockMovement, InvStockSnapshot, InvStockSnapshotRun
+from app.services.stock_snapshot import stock_as_of, take_snapshot, thin_snapshots
+
+
+def _balance(db: Session, catalog, variant_id: int, location_id: int, qty: int, lot_id: int | None = None) -> None:
+    db.add(
+        InvStockBalance(
+            company_id=catalog.company_id,
+            location_id=location_id,
+            variant_id=variant_id,
+            lot_id=lot_id,
+            on_hand_qty=qty,
+            reserved_qty=0,
+            available_qty=qty,
+        )
+    )
+
+
+def _move(db: Session, catalog, variant_id: int, qty: int, at: datetime, *, source: int | None = None, dest: int | None = None) -> None:
+    db.add(
+        InvStockMovement(
+            company_id=catalog.company_id,
+            movement_type="transfer" if source and dest else "adjustment",
+            source_location_id=source,
+            dest_location_id=dest,
+            variant_id=variant_id,
+            qty=qty,
+            moved_at=at,
+        )
+    )
+
+
+def test_take_snapshot_sums_non_zero_on_hand_per_variant_and_location(pg_db: Session, pg_catalog) -> None:
+    first, second = pg_catalog.variant_ids
+    lot = InvLot(variant_id=first, lot_number="S1")
+    pg_db.add(lot)
+    pg_db.flush()
+    _balance(pg_db, pg_catalog, first, pg_catalog.warehouse_id, 3)
+    _balance(pg_db, pg_catalog, first, pg_catalog.warehouse_id, 2, lot.id)
+    _balance(pg_db, pg_catalog, second, pg_catalog.bin_id, 0)
+    pg_db.flush()
+    started = pg_db.scalar(select(func.now()))
+
+    run = take_snapshot(pg_db)
+
+    # The database clock, not the worker's: a statement time within this transaction.
+    assert started <= run.snapshot_at <= pg_db.scalar(select(func.clock_timestamp()))
+    rows = pg_db.execute(
+        select(InvStockSnapshot.variant_id, InvStockSnapshot.location_id, InvStockSnapshot.on_hand_qty).where(
+            InvStockSnapshot.run_id == run.id, InvStockSnapshot.variant_id.in_(pg_catalog.variant_ids)
+        )
+    ).all()
+    assert rows == [(first, pg_catalog.warehouse_id, 5)]
+    assert run.row_count == pg_db.scalar(select(func.count()).select_from(InvStockSnapshot).where(InvStockSnapshot.run_id == run.id))
+
+
+def test_take_snapshot_reads_balances_in_one_repeatable_read_snapshot(pg_committed_catalog) -> None:
+    with Session(engine) as db:
+        run = take_snapshot(db)
+        assert db.scalar(text("SHOW transaction_isolation")) == "repeatable read"
+        assert run.snapshot_at <= db.scalar(select(func.statement_timestamp()))
+        db.rollback()
+
+
+def test_thin_snapshots_keeps_the_first_run_of_each_month_past_retention(pg_db: Session, pg_catalog) -> None:
+    now = datetime(2001, 9, 1, tzinfo=UTC)
+    stamps = [
+        datetime(2001, 3, 1, tzinfo=UTC),
+        datetime(2001, 3, 2, tzinfo=UTC),
+        datetime(2001, 3, 3, tzinfo=UTC),
+        datetime(2001, 4, 1, 6, tzinfo=UTC),
+        now - timedelta(days=10),
+        now - timedelta(days=9),
+    ]
+    runs = [InvStockSnapshotRun(snapshot_at=stamp) for stamp in stamps]
+    for run in runs:
+        pg_db.add(run)
+        pg_db.flush()
+
+    assert thin_snapshots(pg_db, now=now) == 2
+
+    kept = pg_db.scalars(
+        select(InvStockSnapshotRun.snapshot_at).where(InvStockSnapshotRun.id.in_([run.id for run in runs])).order_by(InvStockSnapshotRun.id)
+    ).all()
+    assert kept == [stamps[0], stamps[3], stamps[4], stamps[5]]
+
+
+def test_stock_as_of_replays_movements_after_the_latest_snapshot(pg_db: Session, pg_catalog) -> None:
+    variant_id = pg_catalog.variant_ids[0]
+    warehouse, bin_id = pg_catalog.warehouse_id, pg_catalog.bin_id
+    snapshot_at = datetime(2026, 10, 10, 12, tzinfo=UTC)
+    hour = timedelta(hours=1)
+    _move(pg_db, pg_catalog, variant_id, 10, snapshot_at - 2 * hour, dest=warehouse)
+    _balance(pg_db, pg_catalog, variant_id, warehouse, 10)
+    pg_db.flush()
+    take_snapshot(pg_db, at=snapshot_at)
+    _move(pg_db, pg_catalog, variant_id, 4, snapshot_at + hour, source=warehouse, dest=bin_id)
+    _move(pg_db, pg_catalog, variant_id, 1, snapshot_at + 2 * hour, source=bin_id)
+    _move(pg_db, pg_catalog, variant_id, 7, snapshot_at + 3 * hour, dest=warehouse)
+    pg_db.flush()
+
+    result = stock_as_of(pg_db, variant_id=variant_id, at=snapshot_at + 2 * hour)
+    assert result["snapshot_at"] == snapshot_at.isoformat()
+    assert result["replayed_deltas"] == 3  # a transfer counts on both sides
+    assert result["locations"] == [{"location_id": warehouse, "on_hand_qty": 6}, {"location_id": bin_id, "on_hand_qty": 3}]
+
+    # Before the snapshot the whole ledger up to `at` is replayed.
+    earlier = stock_as_of(pg_db, variant_id=variant_id, at=snapshot_at - hour)
+    assert (earlier["snapshot_at"], earlier["replayed_deltas"]) == (None, 1)
+    assert earlier["locations"] == [{"location_id": warehouse, "on_hand_qty": 10}]
+
+    # A location filter replays that location only, and reports it even when it holds nothing.
+    filtered = stock_as_of(pg_db, variant_id=variant_id, at=snapshot_at + 3 * hour, location_id=warehouse)
+    assert (filtered["replayed_deltas"], filtered["locations"]) == (2, [{"location_id": warehouse, "on_hand_qty": 13}])
+    before_transfer = stock_as_of(pg_db, variant_id=variant_id, at=snapshot_at, location_id=bin_id)
+    assert before_transfer["locations"] == [{"location_id": bin_id, "on_hand_qty": 0}]
+
+
+def test_stock_as_of_replays_a_movement_committed_after_the_snapshot_it_predates(pg_committed_catalog) -> None:
+    catalog = pg_committed_catalog
+    variant_id, warehouse = catalog.variant_ids[0], catalog.warehouse_id
+    with Session(engine) as writer, Session(engine) as db:
+        # Stamped and written before the snapshot, committed after it.
+        moved_at = datetime.now(UTC)
+        _move(writer, catalog, variant_id, 5, moved_at, dest=warehouse)
+        _balance(writer, catalog, variant_id, warehouse, 5)
+        writer.flush()
+        run = take_snapshot(db)
+        db.commit()
+        writer.commit()
+        try:
+            assert moved_at < run.snapshot_at
+            result = stock_as_of(db, variant_id=variant_id, at=run.snapshot_at + timedelta(seconds=1))
+            assert result["snapshot_at"] == run.snapshot_at.isoformat()
+            assert (result["replayed_deltas"], result["locations"]) == (1, [{"location_id": warehouse, "on_hand_qty": 5}])
+        finally:
+            db.rollback()
+            db.execute(delete(InvStockSnapshotRun).where(InvStockSnapshotRun.id == run.id))
+            db.execute(delete(InvStockMovement).where(InvStockMovement.variant_id == variant_id))
+            db.execute(delete(InvStockBalance).where(InvStockBalance.variant_id == variant_id))
+            db.commit()
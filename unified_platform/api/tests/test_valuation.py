@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+from collections import deque
+from decimal import Decimal
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models.inventory import InvValuationLayer, InvValuationSummary
+from app.services.valuation import OpenLayer, ValuationMove, apply_valuation, consume_fifo
+
+
+def test_consume_fifo_takes_oldest_layers_first() -> None:
+    layers = deque(
+        [
+            OpenLayer(id=1, remaining_qty=Decimal("10"), remaining_cost=Decimal("100")),
+            OpenLayer(id=2, remaining_qty=Decimal("10"), remaining_cost=Decimal("150")),
+        ]
+    )
+    consumed_qty, consumed_cost, touched = consume_fifo(layers, Decimal("15"))
+
+    assert consumed_qty == Decimal("15")
+    assert consumed_cost == Decimal("175")
+    assert [layer.id for layer in touched] == [1, 2]
+    assert [layer.id for layer in layers] == [2]
+    assert layers[0].remaining_qty == Decimal("5")
+    assert layers[0].remaining_cost == Decimal("75")
+
+
+def test_consume_fifo_stops_when_stock_runs_out() -> None:
+    layers = deque([OpenLayer(id=1, remaining_qty=Decimal("3"), remaining_cost=Decimal("30"))])
+    consumed_qty, consumed_cost, _ = consume_fifo(layers, Decimal("5"))
+
+    assert consumed_qty == Decimal("3")
+    assert consumed_cost == Decimal("30")
+    assert not layers
+
+
+def _summary(db: Session, variant_id: int, location_id: int) -> tuple:
+    return db.execute(
+        select(
+            InvValuationSummary.qty_on_hand,
+            InvValuationSummary.fifo_value,
+            InvValuationSummary.wac_value,
+            InvValuationSummary.last_unit_cost,
+        ).where(InvValuationSummary.variant_id == variant_id, InvValuationSummary.location_id == location_id)
+    ).one()
+
+
+def test_apply_valuation_upserts_one_summary_per_scope(pg_db: Session, pg_catalog) -> None:
+    variant_id, location_id = pg_catalog.variant_ids[0], pg_catalog.warehouse_id
+
+    apply_valuation(pg_db, [ValuationMove(1, variant_id, location_id, Decimal("10"), Decimal("10"))])
+    apply_valuation(
+        pg_db,
+        [
+            ValuationMove(2, variant_id, location_id, Decimal("10"), Decimal("16")),
+            ValuationMove(3, variant_id, location_id, Decimal("-15")),
+        ],
+    )
+
+    # FIFO: 5 left of the 16.00 layer; WAC: 20 at 13.00, 15 out, 5 x 13.00 left.
+    assert _summary(pg_db, variant_id, location_id) == (5, 80, 65, 16)
+    rows = pg_db.scalar(
+        select(func.count()).select_from(InvValuationSummary).where(InvValuationSummary.variant_id == variant_id)
+    )
+    assert rows == 1
+    remaining = pg_db.execute(
+        select(InvValuationLayer.remaining_qty, InvValuationLayer.remaining_cost)
+        .where(InvValuationLayer.variant_id == variant_id, InvValuationLayer.qty_in > 0)
+        .order_by(InvValuationLayer.id)
+    ).all()
+    assert remaining == [(0, 0), (5, 80)]
+
+
+def test_wac_carries_the_last_unit_cost_through_negative_stock(pg_db: Session, pg_catalog) -> None:
+    variant_id, location_id = pg_catalog.variant_ids[0], pg_catalog.warehouse_id
+    moves = iter(range(1, 100))
+
+    def move(qty: str, cost: str | None = None) -> Decimal:
+        return apply_valuation(
+            pg_db, [ValuationMove(next(moves), variant_id, location_id, Decimal(qty), Decimal(cost) if cost else None)]
+        )[0]
+
+    move("10", "10")
+    move("10", "12")
+    assert move("-22") == Decimal("11")
+    assert _summary(pg_db, variant_id, location_id)[2] == Decimal("-22")
+    assert move("-1") == Decimal("11")
+    assert _summary(pg_db, variant_id, location_id)[0::2] == (-3, Decimal("-33"))
+    # The receipt settles the 3 owed units at its own cost; only the other 2 open a FIFO layer.
+    move("5", "14")
+    assert _summary(pg_db, variant_id, location_id)[:3] == (2, Decimal("28"), Decimal("28"))
+    layer = pg_db.execute(
+        select(InvValuationLayer.remaining_qty, InvValuationLayer.remaining_cost)
+        .where(InvValuationLayer.variant_id == variant_id, InvValuationLayer.location_id == location_id)
+        .order_by(InvValuationLayer.id.desc())
+        .limit(1)
+    ).one()
+    assert layer == (2, Decimal("28"))
+    # The next issue consumes that layer, not units that were already shipped.
+    assert move("-2") == Decimal("14")
+    assert _summary(pg_db, variant_id, location_id)[:3] == (0, Decimal("0"), Decimal("0"))
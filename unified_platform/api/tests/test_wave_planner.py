@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.inventory import InvLot, InvStockBalance
+from app.models.sales import SalesOrder, SalesOrderLine
+from app.services.order_transitions import transition_orders
+from app.services.reservation import reserve_orders
+from app.services.stock_locations import parse_expiry
+from app.services.wave_planner import StockSlot, WaveLine, load_wave, path_key, plan_wave
+
+
+def test_path_key_sorts_location_codes_naturally() -> None:
+    assert sorted(["A-2-10", "A-2-9", "B-1-1", "a-10-1"], key=path_key) == ["A-2-9", "A-2-10", "a-10-1", "B-1-1"]
+
+
+def test_plan_allocates_earliest_expiry_first_and_orders_the_path() -> None:
+    lines = [
+        WaveLine(order_id=20, warehouse_id=1, variant_id=7, qty=Decimal("4")),
+        WaveLine(order_id=10, warehouse_id=1, variant_id=7, qty=Decimal("3")),
+        WaveLine(order_id=10, warehouse_id=1, variant_id=8, qty=Decimal("2")),
+    ]
+    stock = [
+        StockSlot(1, 7, location_id=101, location_code="A-1-10", lot_id=None, expiry_date=None, qty=Decimal("10")),
+        StockSlot(1, 7, location_id=102, location_code="C-1-1", lot_id=5, expiry_date=date(2027, 1, 1), qty=Decimal("5")),
+        StockSlot(1, 8, location_id=103, location_code="A-1-2", lot_id=None, expiry_date=None, qty=Decimal("1")),
+    ]
+
+    plan = plan_wave(lines, stock)
+
+    assert plan.slots == {10: 1, 20: 2}
+    assert [(p.location_code, p.variant_id, p.qty, p.puts) for p in plan.picks] == [
+        ("A-1-2", 8, Decimal("1"), {1: Decimal("1")}),
+        ("A-1-10", 7, Decimal("2"), {2: Decimal("2")}),
+        ("C-1-1", 7, Decimal("5"), {1: Decimal("3"), 2: Decimal("2")}),
+    ]
+    assert plan.shortages == {(10, 8): Decimal("1")}
+
+
+def test_expiry_dates_order_by_date_not_by_text() -> None:
+    lines = [WaveLine(order_id=1, warehouse_id=1, variant_id=7, qty=Decimal("1"))]
+    stock = [
+        StockSlot(1, 7, location_id=101, location_code="A-1-1", lot_id=1, expiry_date=date(2027, 10, 1), qty=Decimal("1")),
+        StockSlot(1, 7, location_id=102, location_code="B-1-1", lot_id=2, expiry_date=date(2027, 9, 1), qty=Decimal("1")),
+    ]
+
+    assert [pick.lot_id for pick in plan_wave(lines, stock).picks] == [2]
+    assert parse_expiry("2027-09-01T00:00:00") == date(2027, 9, 1)
+    assert parse_expiry("soon") is None
+
+
+def test_held_stock_comes_off_the_front_of_the_pick_order() -> None:
+    lines = [WaveLine(order_id=1, warehouse_id=1, variant_id=7, qty=Decimal("4"))]
+    stock = [
+        StockSlot(1, 7, location_id=101, location_code="A-1-1", lot_id=None, expiry_date=None, qty=Decimal("3")),
+        StockSlot(1, 7, location_id=102, location_code="A-1-2", lot_id=None, expiry_date=None, qty=Decimal("3")),
+    ]
+
+    plan = plan_wave(lines, stock, {(1, 7): Decimal("4")})
+
+    assert [(pick.location_code, pick.qty) for pick in plan.picks] == [("A-1-2", Decimal("2"))]
+    assert plan.shortages == {(1, 7): Decimal("2")}
+
+
+def test_wave_plans_around_other_orders_and_records_the_pick(pg_db: Session, pg_catalog) -> None:
+    variant_id = pg_catalog.variant_ids[0]
+    lot = InvLot(variant_id=variant_id, lot_number="L1", expiry_date="2027-01-31")
+    pg_db.add(lot)
+    pg_db.flush()
+    # Bin stock below the warehouse: 2 of an expiring lot, 5 untracked.
+    pg_db.add_all(
+        InvStockBalance(
+            company_id=pg_catalog.company_id,
+            location_id=pg_catalog.bin_id,
+            variant_id=variant_id,
+            lot_id=lot_id,
+            on_hand_qty=qty,
+            reserved_qty=0,
+            available_qty=qty,
+        )
+        for lot_id, qty in ((lot.id, 2), (None, 5))
+    )
+    orders = []
+    for number, qty in (("SO-W-1", 3), ("SO-W-2", 3)):
+        order = SalesOrder(
+            company_id=pg_catalog.company_id,
+            order_number=number,
+            channel_type="web",
+            status="confirmed",
+            warehouse_location_id=pg_catalog.warehouse_id,
+        )
+        pg_db.add(order)
+        pg_db.flush()
+        pg_db.add(SalesOrderLine(order_id=order.id, variant_id=variant_id, name_snapshot="x", quantity=qty, unit_price=1, line_total=qty))
+        orders.append(order.id)
+    first, second = orders
+
+    # Reservation sees the bins' stock and takes the expiring lot first.
+    assert reserve_orders(pg_db, orders).short == {}
+    reserved = dict(pg_db.execute(select(InvStockBalance.lot_id, InvStockBalance.reserved_qty).where(InvStockBalance.variant_id == variant_id)).all())
+    assert reserved == {lot.id: 2, None: 4}
+
+    # Planning only the second order leaves the first order's 3 units alone.
+    lines, stock, held, rejected = load_wave(pg_db, [second])
+    assert held == {(pg_catalog.warehouse_id, variant_id): Decimal("3")}
+    plan = plan_wave(lines, stock, held)
+    assert [(pick.lot_id, pick.qty) for pick in plan.picks] == [(None, Decimal("3"))]
+    assert plan.shortages == {}
+
+    transition_orders(pg_db, [first], "pick", user_id=None, short={(first, variant_id): Decimal("1")})
+    assert pg_db.scalar(select(SalesOrderLine.picked_qty).where(SalesOrderLine.order_id == first)) == 2
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from collections import defaultdict
+
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.ws.bridge import RedisBridge
+from app.ws.manager import WSManager
+
+
+class _Broker:
+    """In-memory stand-in for the Redis pub/sub and INCR calls the bridge makes."""
+
+    def __init__(self) -> None:
+        self.subscribers: dict[str, list[asyncio.Queue]] = defaultdict(list)
+        self.counters: dict[str, int] = defaultdict(int)
+        self.publishes = 0
+        self.clients = 0
+        self.down = False
+
+    def client(self) -> _Client:
+        self.clients += 1
+        return _Client(self)
+
+
+class _PubSub:
+    def __init__(self, broker: _Broker) -> None:
+        self.broker = broker
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    async def subscribe(self, channel: str) -> None:
+        if self.broker.down:
+            raise RedisConnectionError("Redis is down")
+        self.broker.subscribers[channel].append(self.queue)
+
+    async def listen(self):
+        while True:
+            yield await self.queue.get()
+
+    async def aclose(self) -> None:
+        pass
+
+
+class _Client:
+    def __init__(self, broker: _Broker) -> None:
+        self.broker = broker
+
+    def pubsub(self) -> _PubSub:
+        return _PubSub(self.broker)
+
+    async def publish(self, channel: str, data: str) -> None:
+        self.broker.publishes += 1
+        for queue in self.broker.subscribers[channel]:
+            queue.put_nowait({"type": "message", "data": data})
+
+    async def incr(self, key: str) -> int:
+        self.broker.counters[key] += 1
+        return self.broker.counters[key]
+
+    async def aclose(self) -> None:
+        pass
+
+
+class _Socket:
+    def __init__(self) -> None:
+        self.sent: list[dict] = []
+
+    async def accept(self) -> None:
+        pass
+
+    async def send_text(self, text: str) -> None:
+        self.sent.append(json.loads(text))
+
+
+def _manager(broker: _Broker) -> WSManager:
+    manager = WSManager()
+    manager.bridge = RedisBridge(manager, "redis://unused", flush_interval=0.01, client_factory=broker.client)
+    return manager
+
+
+def test_worker_publish_reaches_sockets_of_every_api_process() -> None:
+    async def scenario() -> tuple[list[dict], list[dict], int]:
+        broker = _Broker()
+        api_a, api_b, worker = _manager(broker), _manager(broker), _manager(broker)
+        socket_a, socket_b = _Socket(), _Socket()
+        await api_a.bridge.start()
+        await api_b.bridge.start()
+        await api_a.connect("warehouse", socket_a)
+        await api_b.connect("warehouse", socket_b)
+
+        # The worker never starts its bridge and holds no sockets.
+        await worker.broadcast("warehouse", {"event": "label_printed", "order_id": 1})
+        # Started bridges coalesce a burst into one PUBLISH.
+        for order_id in range(2, 12):
+            await api_a.broadcast("warehouse", {"event": "label_printed", "order_id": order_id})
+        await asyncio.sleep(0.05)
+
+        await api_a.bridge.stop()
+        await api_b.bridge.stop()
+        return socket_a.sent, socket_b.sent, broker.publishes
+
+    sent_a, sent_b, publishes = asyncio.run(scenario())
+    assert [payload["order_id"] for payload in sent_a] == list(range(1, 12))
+    assert sent_b == sent_a
+    assert publishes == 2
+
+
+def test_api_process_delivers_locally_until_a_failed_start_is_retried() -> None:
+    async def scenario() -> None:
+        broker = _Broker()
+        broker.down = True
+        api, worker = _manager(broker), _manager(broker)
+        socket = _Socket()
+        await api.connect("warehouse", socket)
+
+        assert not await api.bridge.start_or_retry(retry_interval=0.01)
+        await api.broadcast("warehouse", {"event": "order_ready", "order_id": 1})
+        assert await api.bridge.incr("ws:seq:1") is None
+        await asyncio.sleep(0.01)
+        # Local delivery, and no client per message while the bridge is down.
+        assert [payload["order_id"] for payload in socket.sent] == [1]
+        assert (broker.clients, broker.publishes) == (1, 0)
+
+        broker.down = False
+        await asyncio.sleep(0.05)
+        assert api.bridge.running and not api.bridge.local_only
+        # Now subscribed, so a message published elsewhere reaches this process's sockets.
+        await worker.broadcast("warehouse", {"event": "order_ready", "order_id": 2})
+        await api.broadcast("warehouse", {"event": "order_ready", "order_id": 3})
+        await asyncio.sleep(0.05)
+        await api.bridge.stop()
+        assert [payload["order_id"] for payload in socket.sent] == [1, 2, 3]
+
+    asyncio.run(scenario())
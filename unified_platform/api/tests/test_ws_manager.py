@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+from app.ws.manager import WSManager
+
+
+class _Socket:
+    def __init__(self, delay: float = 0.0) -> None:
+        self.delay = delay
+        self.sent: list[dict] = []
+        self.closed_with: int | None = None
+
+    async def accept(self) -> None:
+        pass
+
+    async def send_text(self, text: str) -> None:
+        await asyncio.sleep(self.delay)
+        self.sent.append(json.loads(text))
+
+    async def close(self, code: int) -> None:
+        self.closed_with = code
+
+
+def test_slow_socket_does_not_delay_the_others() -> None:
+    async def scenario() -> tuple[_Socket, _Socket]:
+        manager = WSManager(queue_size=10, send_timeout=5)
+        fast, slow = _Socket(), _Socket(delay=1.0)
+        await manager.connect("warehouse", fast)
+        await manager.connect("warehouse", slow)
+        for order_id in range(3):
+            await manager.deliver("warehouse", {"order_id": order_id})
+        await asyncio.sleep(0.05)
+        return fast, slow
+
+    fast, slow = asyncio.run(scenario())
+    assert [payload["order_id"] for payload in fast.sent] == [0, 1, 2]
+    assert slow.sent == []
+
+
+def test_full_outbox_drops_oldest_then_disconnects() -> None:
+    async def scenario() -> tuple[WSManager, _Socket]:
+        manager = WSManager(queue_size=3, send_timeout=5)
+        socket = _Socket(delay=0.01)
+        await manager.connect("warehouse", socket)
+        for order_id in range(5):  # 3 fit, the last 2 push out orders 0 and 1
+            await manager.deliver("warehouse", {"order_id": order_id})
+        await asyncio.sleep(0.2)
+        assert socket.sent == [{"event": "messages_dropped", "count": 2}, {"order_id": 2}, {"order_id": 3}, {"order_id": 4}]
+
+        for order_id in range(5, 12):
+            await manager.deliver("warehouse", {"order_id": order_id})
+        await asyncio.sleep(0)
+        return manager, socket
+
+    manager, socket = asyncio.run(scenario())
+    assert "warehouse" not in manager.channels
+    assert socket.closed_with == 1013
+
+
+def test_stalled_send_times_out_and_disconnects() -> None:
+    async def scenario() -> tuple[WSManager, _Socket]:
+        manager = WSManager(queue_size=10, send_timeout=0.05)
+        socket = _Socket(delay=10)
+        await manager.connect("warehouse", socket)
+        await manager.deliver("warehouse", {"order_id": 1})
+        await asyncio.sleep(0.2)
+        return manager, socket
+
+    manager, socket = asyncio.run(scenario())
+    assert "warehouse" not in manager.channels
+    assert socket.closed_with == 1013
@@ -12,6 +12,8 @@ type DashboardKpis = {
   low_stock_alerts_open: number;
   stock_value_fifo: number;
   stock_value_wac: number;
+  units_sold_7d: number;
+  units_sold_30d: number;
 };
 
 type SyncStatus = {
@@ -32,7 +34,9 @@ async function loadKpis(): Promise<DashboardKpis> {
       inbound_shipments_active: 0,
       low_stock_alerts_open: 0,
       stock_value_fifo: 0,
-      stock_value_wac: 0
+      stock_value_wac: 0,
+      units_sold_7d: 0,
+      units_sold_30d: 0
     };
   }
   try {
@@ -46,7 +50,9 @@ async function loadKpis(): Promise<DashboardKpis> {
       inbound_shipments_active: 0,
       low_stock_alerts_open: 0,
       stock_value_fifo: 0,
-      stock_value_wac: 0
+      stock_value_wac: 0,
+      units_sold_7d: 0,
+      units_sold_30d: 0
     };
   }
 }
@@ -82,6 +88,8 @@ export default async function DashboardPage() {
         <KpiCard label="Low Stock Alerts" value={kpis.low_stock_alerts_open} />
         <KpiCard label="FIFO Value" value={`${kpis.stock_value_fifo.toFixed(2)} SEK`} />
         <KpiCard label="WAC Value" value={`${kpis.stock_value_wac.toFixed(2)} SEK`} />
+        <KpiCard label="Units Sold 7d" value={kpis.units_sold_7d} />
+        <KpiCard label="Units Sold 30d" value={kpis.units_sold_30d} />
         <KpiCard label="Sync Queue Pending" value={syncStatus.pending} />
         <KpiCard label="Sync Failures" value={syncStatus.failed} />
       </div>